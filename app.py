@@ -3,6 +3,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import os
+import json
 import time
 
 # ===== GRACEFUL IMPORT HANDLING =====
@@ -19,8 +21,66 @@ except ImportError:
 DEAP_AVAILABLE = False
 SQLALCHEMY_AVAILABLE = False
 
+# Genetic scheduler import with fallback to the static sample below
+try:
+    from ga_scheduler import FlexibleTimetableScheduler, STOP_REASONS
+    from solver_cache import default_cache
+    GA_SCHEDULER_AVAILABLE = True
+except ImportError:
+    GA_SCHEDULER_AVAILABLE = False
+    STOP_REASONS = {}
+
+# Manual timetable editing (saving the edits as a draft also needs SQLAlchemy)
+try:
+    from timetable_editor import TimetableEditor
+    TIMETABLE_EDITOR_AVAILABLE = GA_SCHEDULER_AVAILABLE
+except ImportError:
+    TIMETABLE_EDITOR_AVAILABLE = False
+
+# Shared job queue on the app database (needs SQLAlchemy); otherwise each session solves on its own thread
+try:
+    from job_queue import default_queue
+    JOB_QUEUE_AVAILABLE = GA_SCHEDULER_AVAILABLE
+except ImportError:
+    JOB_QUEUE_AVAILABLE = False
+
+# Approved timetables indexed per faculty member (needs SQLAlchemy)
+try:
+    from models import session_scope
+    from schedule_index import approve_timetable, default_schedule_index
+    from clash_detection import default_clash_index
+    SCHEDULE_INDEX_AVAILABLE = GA_SCHEDULER_AVAILABLE
+except ImportError:
+    SCHEDULE_INDEX_AVAILABLE = False
+
+# Registered alternates and frozen slots for leave repair (needs SQLAlchemy)
+try:
+    from models import session_scope
+    from repair import load_alternates, load_frozen_slots
+    REPAIR_DB_AVAILABLE = GA_SCHEDULER_AVAILABLE
+except ImportError:
+    REPAIR_DB_AVAILABLE = False
+
+# Faculty availability, eligibility and room fit from the database (needs SQLAlchemy)
+try:
+    from models import session_scope
+    from constraint_index import ConstraintIndex
+    CONSTRAINT_INDEX_AVAILABLE = GA_SCHEDULER_AVAILABLE
+except ImportError:
+    CONSTRAINT_INDEX_AVAILABLE = False
+
+from generation_worker import GenerationJob
+from profiling import prometheus_text
+from timetable_grid import TimetableGrid
+
+# Seconds between progress refreshes while a generation runs
+PROGRESS_POLL_INTERVAL = 0.5
+
+# Rendered timetables (tables, CSV and figures) kept across reruns
+RENDER_CACHE_ENTRIES = 64
+
 # ===== FALLBACK SCHEDULER (KEEPS ALL FEATURES) =====
-class AdvancedTimetableScheduler:
+class FallbackTimetableScheduler:
     def __init__(self, parameters=None):
         self.params = parameters or {}
         self.period_times = {
@@ -40,10 +100,8 @@ class AdvancedTimetableScheduler:
     def update_time_structure(self, custom_times):
         self.period_times = custom_times
     
-    def generate_timetable(self, pop_size=10, ngen=5):
-        # Simulate genetic algorithm processing
-        time.sleep(2)
-        
+    def generate_timetable(self, pop_size=10, ngen=5, seed=None, islands=1, algorithm="ga",
+                           progress=None, cancel=None, time_budget=None, stagnation=None):
         # COMPLETE timetable data (all features preserved)
         timetable_data = {
             "Monday": {
@@ -78,7 +136,17 @@ class AdvancedTimetableScheduler:
             }
         }
         
-        return timetable_data, 98.5  # High fitness score
+        return as_grid(timetable_data, self.period_times), 98.5  # High fitness score
+
+AdvancedTimetableScheduler = FlexibleTimetableScheduler if GA_SCHEDULER_AVAILABLE else FallbackTimetableScheduler
+
+# Rooms shared by every section (mirrors init_data.py)
+DEFAULT_ROOMS = [
+    {"code": "ECE-101", "room_type": "theory_room", "capacity": 60, "department": "ECE"},
+    {"code": "ECE-LAB", "room_type": "lab_room", "capacity": 60, "department": "ECE"},
+    {"code": "COMMON-HALL", "room_type": "common_hall", "capacity": 100, "department": None},
+    {"code": "SEMINAR-1", "room_type": "seminar_hall", "capacity": 80, "department": None}
+]
 
 # ===== PAGE CONFIGURATION =====
 st.set_page_config(
@@ -128,30 +196,11 @@ def logout():
     st.rerun()
 
 # ===== TIMETABLE DISPLAY (WITH PLOTLY FALLBACK) =====
-def display_timetable(timetable_data, period_times):
-    """Display timetable with flexible time labels"""
-    days = list(timetable_data.keys())
-    total_periods = len(period_times)
-    
-    # Create data for table with time labels
-    table_data = []
-    for day in days:
-        day_row = [day]
-        for period in range(total_periods):
-            if period in timetable_data[day]:
-                entries = timetable_data[day][period]
-                day_row.append(entries[0] if entries else "FREE")
-            else:
-                day_row.append("FREE")
-        table_data.append(day_row)
-    
-    # Create column names with time labels
-    columns = ['Day']
-    for period in range(total_periods):
-        start, end, name = period_times[period]
-        columns.append(f'P{period+1}\n{start}-{end}')
-    
-    df = pd.DataFrame(table_data, columns=columns)
+def display_timetable(timetable_data, period_times, key="timetable"):
+    """Display a TimetableGrid with flexible time labels (key keeps widgets unique per timetable)"""
+    grid = as_grid(timetable_data, period_times)
+    digest = grid.digest()
+    df, csv = timetable_table(digest, grid, period_times)
     
     # Display as table (ALWAYS WORKS)
     st.dataframe(df, height=500)
@@ -160,71 +209,8 @@ def display_timetable(timetable_data, period_times):
     if PLOTLY_AVAILABLE:
         try:
             st.subheader("📅 Visual Timetable View")
-            
-            # Prepare data for heatmap
-            z_data = []
-            text_data = []
-            for day in days:
-                day_z = []
-                day_text = []
-                for period in range(total_periods):
-                    if period in timetable_data[day]:
-                        entry = timetable_data[day][period][0]
-                        start, end, name = period_times[period]
-                        
-                        # Determine color based on content
-                        if "Break" in entry or "Lunch" in entry:
-                            color_val = 0  # Gray for breaks
-                        elif "Lab" in entry:
-                            color_val = 2  # Green for labs
-                        elif "Library" in entry or "Training" in entry or "Meeting" in entry:
-                            color_val = 3  # Blue for special sessions
-                        else:
-                            color_val = 1  # Default color for classes
-                        
-                        day_z.append(color_val)
-                        day_text.append(f"{start}-{end}\n{entry}")
-                    else:
-                        start, end, name = period_times[period]
-                        day_z.append(-1)
-                        day_text.append(f"{start}-{end}\nFREE")
-                z_data.append(day_z)
-                text_data.append(day_text)
-            
-            # Custom colorscale
-            colorscale = [
-                [0, 'lightgray'],    # Breaks
-                [0.33, 'lightblue'], # Classes
-                [0.66, 'lightgreen'],# Labs
-                [1, 'lightcoral']    # Special sessions
-            ]
-            
-            # Create x-axis labels
-            x_labels = []
-            for period in range(total_periods):
-                start, end, name = period_times[period]
-                x_labels.append(f'P{period+1}\n{start}')
-            
-            fig = go.Figure(data=go.Heatmap(
-                z=z_data,
-                x=x_labels,
-                y=days,
-                colorscale=colorscale,
-                hoverinfo='text',
-                text=text_data,
-                showscale=False,
-                hoverlabel=dict(namelength=-1)
-            ))
-            
-            fig.update_layout(
-                title="Visual Timetable - ECE Department",
-                xaxis_title="Periods with Time Slots",
-                yaxis_title="Days",
-                height=500,
-                xaxis=dict(tickangle=45)
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(timetable_figure(digest, grid, period_times), use_container_width=True,
+                            key=f"{key}_chart")
             
             # Add legend
             st.caption("🎨 Color Legend: "
@@ -244,23 +230,70 @@ def display_timetable(timetable_data, period_times):
     export_col1, export_col2, export_col3 = st.columns(3)
     
     with export_col1:
-        if st.button("📄 Export as PDF", use_container_width=True):
+        if st.button("📄 Export as PDF", use_container_width=True, key=f"{key}_pdf"):
             st.success("PDF export will be available in production!")
     
     with export_col2:
-        csv = df.to_csv(index=False)
         st.download_button(
             label="📊 Download CSV",
             data=csv,
             file_name="timetable.csv",
             mime="text/csv",
-            use_container_width=True
+            use_container_width=True,
+            key=f"{key}_csv"
         )
     
     with export_col3:
-        if st.button("📅 Push to Calendar", use_container_width=True):
+        if st.button("📅 Push to Calendar", use_container_width=True, key=f"{key}_calendar"):
             st.success("Calendar integration will be available in production!")
 
+@st.cache_data(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def timetable_table(digest, _grid, period_times):
+    """Table and CSV bytes of a grid, memoized by grid digest and time structure"""
+    columns = ['Day'] + [f'P{period+1}\n{start}-{end}' for period, (start, end, _) in sorted(period_times.items())]
+    df = pd.DataFrame(np.column_stack([np.array(_grid.days, dtype=object), _grid.label_array()]), columns=columns)
+    return df, df.to_csv(index=False).encode()
+
+@st.cache_data(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def timetable_figure(digest, _grid, period_times):
+    """Heatmap of a grid coloured by cell kind (FREE -1, break 0, class 1, lab 2, special 3), memoized like the table"""
+    times = [period_times[period] for period in sorted(period_times)]
+    prefixes = np.array([f"{start}-{end}\n" for start, end, _ in times], dtype=object)
+    
+    # Custom colorscale
+    colorscale = [
+        [0, 'lightgray'],    # Breaks
+        [0.33, 'lightblue'], # Classes
+        [0.66, 'lightgreen'],# Labs
+        [1, 'lightcoral']    # Special sessions
+    ]
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=_grid.kinds(),
+        x=[f'P{period+1}\n{start}' for period, (start, _, _) in enumerate(times)],
+        y=list(_grid.days),
+        colorscale=colorscale,
+        hoverinfo='text',
+        text=(prefixes[None, :] + _grid.label_array()).tolist(),
+        showscale=False,
+        hoverlabel=dict(namelength=-1)
+    ))
+    
+    fig.update_layout(
+        title="Visual Timetable - ECE Department",
+        xaxis_title="Periods with Time Slots",
+        yaxis_title="Days",
+        height=500,
+        xaxis=dict(tickangle=45)
+    )
+    return fig
+
+def as_grid(timetable, period_times):
+    """TimetableGrid of a grid or of the {day: {period: [label]}} display form"""
+    if not isinstance(timetable, TimetableGrid):
+        return TimetableGrid.from_display(timetable, period_times)
+    return timetable
+
 # ===== TIME CUSTOMIZATION (ALL FEATURES PRESERVED) =====
 def show_time_customization():
     """Interface for customizing time structure"""
@@ -380,6 +413,8 @@ def show_timetable_generation():
         academic_year = st.text_input("Academic Year", "2025-2026")
         semester = st.selectbox("Semester", [1, 2, 3, 4, 5, 6, 7, 8], index=2)
         section = st.selectbox("Section", ["A", "B", "C"], index=0)
+        joint_sections = st.multiselect("Schedule Jointly With", [s for s in ["A", "B", "C"] if s != section],
+                                        help="Sections solved together share faculty and rooms without clashes")
     
     with config_col2:
         st.markdown("**Schedule Constraints**")
@@ -465,67 +500,195 @@ def show_timetable_generation():
     algo_col1, algo_col2 = st.columns(2)
     
     with algo_col1:
+        algorithm = st.selectbox("Solver", ["ga", "sa"],
+                                 format_func=lambda a: {"ga": "Genetic Algorithm", "sa": "Simulated Annealing"}[a])
         population_size = st.slider("Population Size", 10, 100, 50, 10)
         generations = st.slider("Number of Generations", 5, 50, 20, 5)
+        unlimited = st.checkbox("No generation limit", value=False,
+                                help="Run until the time budget or the stagnation limit stops it")
+        time_budget = st.number_input("Time Budget (s)", min_value=0.0, value=0.0, step=5.0,
+                                      help="Stop and keep the best timetable after this many seconds (0 = no limit)")
+        stagnation = st.number_input("Stop After Generations Without Improvement", min_value=0, value=0, step=10,
+                                     help="0 = never stop early")
     
     with algo_col2:
         crossover_rate = st.slider("Crossover Rate", 0.1, 0.9, 0.7, 0.1)
         mutation_rate = st.slider("Mutation Rate", 0.01, 0.3, 0.1, 0.01)
+        seed = st.number_input("Random Seed", min_value=0, value=42, step=1)
+        islands = st.slider("Parallel Islands (processes)", 1, max(1, os.cpu_count() or 1), 1,
+                            help="Splits the population across worker processes that exchange their best timetables")
+        queue_priority = st.select_slider("Queue Priority", [-1, 0, 1], value=0,
+                                          format_func={-1: "Low", 0: "Normal", 1: "High"}.get,
+                                          disabled=not JOB_QUEUE_AVAILABLE)
+        profile_solver = st.checkbox("Profile Solver", value=False,
+                                     help="Time every GA operator and constraint check (slightly slower)")
     
     # Generate Button
-    if st.button("🚀 Generate Optimal Timetable", type="primary", use_container_width=True):
-        # Show loading with progress
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        for i in range(5):
-            progress_bar.progress((i + 1) * 20)
-            status_text.text(f"Generating... {(i + 1) * 20}% complete")
-            time.sleep(0.3)
-        
+    job = st.session_state.get('generation_job')
+    if st.button("🚀 Generate Optimal Timetable", type="primary", use_container_width=True,
+                 disabled=job is not None and job.running):
         try:
+            # Sections scheduled together become batches of one joint solve
+            batches = [{
+                'name': f"ECE Sem {semester} - {name}",
+                'department': 'ECE',
+                'strength': 60,
+                'subject_configs': subject_configs,
+                'fixed_slots': fixed_slots
+            } for name in [section] + joint_sections] if joint_sections else None
+
             # Initialize scheduler with custom times
             scheduler = AdvancedTimetableScheduler({
                 'subject_configs': subject_configs,
                 'fixed_slots': fixed_slots,
+                'batches': batches,
+                'rooms': DEFAULT_ROOMS if joint_sections else None,
                 'max_periods_per_day': max_periods_per_day,
-                'max_classes_per_faculty': max_classes_per_faculty
+                'max_classes_per_faculty': max_classes_per_faculty,
+                'avoid_back_to_back': avoid_back_to_back,
+                'lab_after_theory': lab_after_theory,
+                'avoid_friday_labs': avoid_friday_labs,
+                'respect_faculty_availability': respect_faculty_availability,
+                'crossover_rate': crossover_rate,
+                'mutation_rate': mutation_rate,
+                'profile': profile_solver,
+                'cache': default_cache() if GA_SCHEDULER_AVAILABLE else None
             })
             scheduler.update_time_structure(custom_times)
-            
-            timetable_data, fitness_score = scheduler.generate_timetable(
-                pop_size=population_size,
-                ngen=generations
-            )
-            
-            # Store in session state
-            st.session_state.timetable_data = timetable_data
-            st.session_state.fitness_score = fitness_score
-            st.session_state.period_times = custom_times
-            
-            # Display results
-            progress_bar.empty()
-            status_text.empty()
-            
-            st.success("✅ Timetable generated successfully!")
-            
-            # Display fitness metrics
-            metrics_col1, metrics_col2, metrics_col3, metrics_col4 = st.columns(4)
-            metrics_col1.metric("Fitness Score", f"{fitness_score:.1f}%")
-            metrics_col2.metric("Constraint Satisfaction", "98%")
-            metrics_col3.metric("Faculty Load Balance", "Excellent")
-            metrics_col4.metric("Room Utilization", "95%")
-            
-            # Show generated timetable
-            display_timetable(timetable_data, custom_times)
-            
+            if unlimited and not (time_budget or stagnation):
+                raise ValueError("Set a time budget or a stagnation limit to run without a generation limit")
+            solver_settings = {
+                'pop_size': population_size,
+                'ngen': None if unlimited else generations,
+                'seed': int(seed),
+                'islands': islands,
+                'algorithm': algorithm,
+                'time_budget': float(time_budget) or None,
+                'stagnation': int(stagnation) or None
+            }
+
+            # Solve in the background; this page polls the progress
+            if JOB_QUEUE_AVAILABLE:
+                st.session_state.generation_job = default_queue().submit(
+                    scheduler.params, custom_times, solver_settings,
+                    name=f"ECE Sem {semester} - {section}", academic_year=academic_year,
+                    semester=semester, priority=queue_priority)
+            else:
+                # Queued jobs compile their own index when they run
+                if CONSTRAINT_INDEX_AVAILABLE:
+                    with session_scope() as session:
+                        scheduler.params['constraint_index'] = ConstraintIndex.from_session(
+                            session, scheduler.days, custom_times)
+                st.session_state.generation_job = GenerationJob(scheduler, **solver_settings).start()
+            st.session_state.generation_context = {'period_times': custom_times, 'joint': bool(joint_sections)}
         except Exception as e:
             st.error(f"Error generating timetable: {str(e)}")
-    
+
+    collect_generation_result()
+    job = st.session_state.get('generation_job')
+    if job is not None and job.running:
+        show_generation_progress(job)
+    elif 'generation_error' in st.session_state:
+        st.error(f"Error generating timetable: {st.session_state.pop('generation_error')}")
+    elif 'last_generation' in st.session_state:
+        outcome = st.session_state.pop('last_generation')
+        if outcome['cancelled']:
+            st.warning("⏹️ Generation cancelled, showing the best timetable found so far")
+        else:
+            st.success("✅ Timetable generated successfully!")
+        if outcome['cached']:
+            st.caption("⚡ Same inputs as an earlier run: result loaded from the solver cache")
+        elif outcome.get('stop_reason') in STOP_REASONS:
+            st.caption(f"Stopped: {STOP_REASONS[outcome['stop_reason']]}")
+
+        # Display fitness metrics
+        metrics_col1, metrics_col2, metrics_col3, metrics_col4 = st.columns(4)
+        metrics_col1.metric("Fitness Score", f"{st.session_state.fitness_score:.1f}%")
+        metrics_col2.metric("Constraint Satisfaction", "98%")
+        metrics_col3.metric("Faculty Load Balance", "Excellent")
+        metrics_col4.metric("Room Utilization", "95%")
+
+        if outcome.get('profile'):
+            show_solver_profile(outcome['profile'])
+
+        # Show generated timetable
+        display_section_timetables(st.session_state.timetable_data, st.session_state.period_times)
+
     # Display previously generated timetable if available
     elif 'timetable_data' in st.session_state:
         st.subheader("📊 Previously Generated Timetable")
-        display_timetable(st.session_state.timetable_data, st.session_state.period_times)
+        display_section_timetables(st.session_state.timetable_data, st.session_state.period_times)
+
+def show_generation_progress(job):
+    """Live progress of a background generation; reruns the page until it finishes"""
+    if job.status == 'pending':
+        st.info(f"⏳ Waiting in the generation queue (position {getattr(job, 'position', 1)})")
+    progress = job.progress
+    total = progress.get('total')
+    done = progress.get('generation', 0)
+    fraction = progress.get('fraction', done / total if total else 0.0)
+    st.progress(min(1.0, fraction), text=f"Generating... {done} / {total or '∞'}")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Best Fitness", f"{progress['best_fitness']:.1f}%" if progress else "—")
+    col2.metric("Generation", f"{done} / {total or '∞'}")
+    eta = progress.get('eta')
+    col3.metric("ETA", f"{eta:.1f}s" if eta is not None else "—")
+    if st.button("⏹️ Cancel Generation"):
+        job.cancel()
+    time.sleep(PROGRESS_POLL_INTERVAL)
+    st.rerun()
+
+def show_solver_profile(profile):
+    """Operator and constraint timings of a profiled run, with JSON and Prometheus downloads"""
+    with st.expander("⏱️ Solver Profile"):
+        if profile['operators']:
+            st.markdown("**Time per operator**")
+            st.dataframe(pd.DataFrame.from_dict(profile['operators'], orient='index'), use_container_width=True)
+        if profile['constraints']:
+            st.markdown("**Constraint checks** (most expensive first)")
+            st.dataframe(pd.DataFrame.from_dict(profile['constraints'], orient='index'), use_container_width=True)
+        col1, col2 = st.columns(2)
+        col1.download_button("📥 Profile JSON", json.dumps(profile, indent=2), "solver_profile.json",
+                             "application/json")
+        col2.download_button("📥 Prometheus Metrics", prometheus_text(profile), "solver_profile.prom", "text/plain")
+
+def collect_generation_result():
+    """Move a finished background generation into the session, whichever page is open"""
+    job = st.session_state.get('generation_job')
+    if job is None or job.running:
+        return
+    del st.session_state['generation_job']
+    context = st.session_state.pop('generation_context', {})
+    if job.status == 'failed':
+        st.session_state.generation_error = job.error
+        return
+
+    if job.result is None:
+        # Cancelled while still waiting in the queue
+        return
+    timetable_data, fitness_score = job.result
+    st.session_state.pop('timetable_editor', None)
+    st.session_state.timetable_data = timetable_data
+    st.session_state.fitness_score = fitness_score
+    st.session_state.period_times = context['period_times']
+    st.session_state.section_timetables = job.timetables() if context.get('joint') else {}
+    st.session_state.scheduler_params = job.params
+    # Queued jobs store their result as a draft Timetable that can be approved
+    st.session_state.timetable_id = getattr(job, 'timetable_id', None)
+    st.session_state.last_generation = {'cancelled': job.status == 'cancelled', 'cached': bool(job.last_run.get('cached')),
+                                        'stop_reason': job.last_run.get('stop_reason'),
+                                        'profile': job.last_run.get('profile')}
+
+def display_section_timetables(timetable_data, period_times):
+    """Show one tab per jointly scheduled section, or the single timetable"""
+    section_timetables = st.session_state.get('section_timetables') or {}
+    if len(section_timetables) < 2:
+        display_timetable(timetable_data, period_times)
+        return
+    tabs = st.tabs(list(section_timetables))
+    for i, (tab, (name, data)) in enumerate(zip(tabs, section_timetables.items())):
+        with tab:
+            display_timetable(data, period_times, key=f"section_{i}")
 
 # ===== OTHER PAGES (PRESERVED) =====
 def show_dashboard():
@@ -583,46 +746,227 @@ def show_timetable_approval():
     if 'timetable_data' in st.session_state:
         st.success("Timetable ready for approval!")
         st.metric("Fitness Score", f"{st.session_state.fitness_score:.1f}%")
+        timetable_id = st.session_state.get('timetable_id')
+        clashes = show_clash_report(timetable_id) if timetable_id is not None and SCHEDULE_INDEX_AVAILABLE else []
+        override = bool(clashes) and st.checkbox("Approve despite clashes")
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("✅ Approve Timetable", type="primary"):
-                st.success("Timetable approved successfully!")
+            if st.button("✅ Approve Timetable", type="primary", disabled=bool(clashes) and not override):
+                if timetable_id is not None and SCHEDULE_INDEX_AVAILABLE:
+                    with session_scope() as session:
+                        approve_timetable(session, timetable_id, index=default_schedule_index(),
+                                          clash_index=default_clash_index())
+                    st.success("Timetable approved successfully!")
+                else:
+                    st.warning("Only timetables generated through the job queue are stored and can be approved")
         with col2:
             if st.button("❌ Request Changes"):
                 st.info("Changes requested. Please regenerate timetable.")
+        if GA_SCHEDULER_AVAILABLE and 'scheduler_params' in st.session_state:
+            show_leave_repair()
     else:
         st.warning("No timetable generated yet. Please generate a timetable first.")
 
+def show_clash_report(timetable_id):
+    """Check a stored timetable against every approved one and list the clashes found"""
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    started = time.perf_counter()
+    with session_scope() as session:
+        clashes = default_clash_index().check_timetable(session, timetable_id)
+    elapsed = (time.perf_counter() - started) * 1000
+    if not clashes:
+        st.success(f"No clashes with approved timetables (checked in {elapsed:.0f} ms)")
+        return clashes
+    st.error(f"{len(clashes)} clashes with approved timetables")
+    st.dataframe(pd.DataFrame([{
+        'Type': c['type'].title(), 'Resource': c['resource'],
+        'Day': days[c['day']] if c['day'] < len(days) else c['day'], 'Period': f"P{c['period'] + 1}",
+        'Subject': c['subject'], 'Clashes With': f"{c['other_subject']} ({c['other_timetable']})"
+    } for c in clashes]), hide_index=True)
+    return clashes
+
+def registered_alternates():
+    """FacultyAlternate rows of the app database (see repair.load_alternates)"""
+    with session_scope() as session:
+        return load_alternates(session)
+
+def show_leave_repair():
+    """Repair the current timetable around faculty leave, changing as few slots as possible"""
+    params = st.session_state.scheduler_params
+    configs = [c for batch in (params.get('batches') or [params]) for c in batch.get('subject_configs') or []]
+    faculty_names = sorted({c['faculty'] for c in configs if c.get('faculty')})
+
+    with st.expander("🩹 Repair for Faculty Leave"):
+        on_leave = st.multiselect("Faculty on Leave", faculty_names)
+        leave_days = st.multiselect("Leave Days (empty = whole week)",
+                                    ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"])
+        # Alternates registered in the database come first, typed ones after them
+        registered = [alt for alt in (registered_alternates() if REPAIR_DB_AVAILABLE else [])
+                      if alt['faculty'] in on_leave]
+        for alt in registered:
+            st.caption(f"Registered alternate for {alt['faculty']}: {alt['alternate']}"
+                       + (f" ({alt['subject']})" if alt['subject'] else ""))
+        alternates = list(registered)
+        for name in on_leave:
+            names = st.text_input(f"More alternates for {name} (highest priority first)", key=f"alternates_{name}")
+            start = max((alt['priority'] or 0 for alt in registered if alt['faculty'] == name), default=0)
+            alternates += [{'faculty': name, 'alternate': alt.strip(), 'subject': None, 'priority': start + i + 1}
+                           for i, alt in enumerate(names.split(",")) if alt.strip()]
+
+        scheduler = AdvancedTimetableScheduler(params)
+        scheduler.update_time_structure(st.session_state.period_times)
+        # Fixed entries of the stored timetable stay where they are
+        timetable_id = st.session_state.get('timetable_id')
+        frozen = []
+        if REPAIR_DB_AVAILABLE and timetable_id is not None:
+            with session_scope() as session:
+                frozen = load_frozen_slots(session, timetable_id, scheduler.days)
+            if len(scheduler.batches()) > 1:
+                unplaced = [slot for slot in frozen if slot['batch'] is None and slot['batch_id'] is None]
+                if unplaced:
+                    st.warning(f"{len(unplaced)} fixed slots were stored without their section and can't be kept")
+                frozen = [slot for slot in frozen if slot not in unplaced]
+            if frozen:
+                st.caption(f"{len(frozen)} fixed slots of timetable #{timetable_id} will not move")
+
+        if st.button("Repair Timetable", disabled=not on_leave):
+            section_timetables = st.session_state.get('section_timetables') or {}
+            approved = section_timetables if len(section_timetables) > 1 else st.session_state.timetable_data
+            try:
+                timetable_data, fitness_score = scheduler.repair_timetable(
+                    approved, {name: leave_days or None for name in on_leave}, alternates, frozen)
+            except ValueError as e:
+                st.error(f"Repair failed: {e}")
+                return
+
+            st.session_state.pop('timetable_editor', None)
+            st.session_state.timetable_data = timetable_data
+            st.session_state.fitness_score = fitness_score
+            if len(section_timetables) > 1:
+                st.session_state.section_timetables = scheduler.timetables()
+            run = scheduler.last_run
+            st.success(f"Repaired in {run['elapsed'] * 1000:.0f} ms with {len(run['changes'])} changed slots")
+            for subject, alternate in run['substitutions'].items():
+                st.write(f"• {subject} → {alternate}")
+            if run['changes']:
+                st.dataframe(pd.DataFrame([{
+                    'Batch': c['batch'], 'Day': c['day'], 'Period': f"P{c['period'] + 1}",
+                    'Before': c['before'], 'After': c['after']
+                } for c in run['changes']]), hide_index=True)
+
 def show_view_timetables():
     st.title("View Timetables")
     if 'timetable_data' in st.session_state:
         display_timetable(st.session_state.timetable_data, st.session_state.period_times)
+        if TIMETABLE_EDITOR_AVAILABLE and 'scheduler_params' in st.session_state:
+            show_timetable_editor()
     else:
         st.info("Generate a timetable first to view it here.")
 
+def timetable_editor():
+    """The session's TimetableEditor on the current timetable, created on first use"""
+    editor = st.session_state.get('timetable_editor')
+    if editor is None:
+        scheduler = AdvancedTimetableScheduler(st.session_state.scheduler_params)
+        scheduler.update_time_structure(st.session_state.period_times)
+        names = [batch.get('name', f"Batch {i + 1}") for i, batch in enumerate(scheduler.batches())]
+        section_timetables = st.session_state.get('section_timetables') or {}
+        timetables = section_timetables if len(section_timetables) > 1 else {names[0]: st.session_state.timetable_data}
+        editor = st.session_state.timetable_editor = TimetableEditor.from_scheduler(
+            scheduler, {name: as_grid(grid, st.session_state.period_times) for name, grid in timetables.items()})
+    return editor
+
+def show_timetable_editor():
+    """Swap or move single classes with instant validation, undo/redo and saving as a new draft"""
+    with st.expander("✏️ Edit Timetable"):
+        editor = timetable_editor()
+        problem = editor.problem
+        period_times = st.session_state.period_times
+        batch = 0
+        if problem.n_batches > 1:
+            batch = st.selectbox("Section", range(problem.n_batches), format_func=problem.batch_names.__getitem__,
+                                 key="edit_batch")
+        teaching = [p for p in range(problem.n_periods) if p not in problem.break_periods]
+        period_label = lambda p: f"P{p + 1} ({period_times[p][0]}-{period_times[p][1]})"
+        
+        from_col, to_col = st.columns(2)
+        with from_col:
+            day_a = st.selectbox("From Day", range(problem.n_days), format_func=problem.days.__getitem__,
+                                 key="edit_day_a")
+            period_a = st.selectbox("From Period", teaching, format_func=period_label, key="edit_period_a")
+        with to_col:
+            day_b = st.selectbox("To Day", range(problem.n_days), format_func=problem.days.__getitem__,
+                                 key="edit_day_b")
+            period_b = st.selectbox("To Period", teaching, format_func=period_label, key="edit_period_b")
+        
+        reason = editor.check(batch, day_a, period_a, day_b, period_b)
+        swap_col, undo_col, redo_col = st.columns(3)
+        result = None
+        with swap_col:
+            if st.button("🔀 Swap / Move", disabled=reason is not None, use_container_width=True):
+                result = editor.swap(batch, day_a, period_a, day_b, period_b)
+        with undo_col:
+            if st.button("↩️ Undo", disabled=not editor.can_undo, use_container_width=True):
+                result = editor.undo()
+        with redo_col:
+            if st.button("↪️ Redo", disabled=not editor.can_redo, use_container_width=True):
+                result = editor.redo()
+        if reason is not None:
+            st.caption(reason)
+        
+        if result is not None:
+            st.metric("Fitness", f"{result['fitness']:.2f}%", f"{result['fitness_change']:+.2f}")
+            for name, count in result['new_violations'].items():
+                st.error(f"New violation: {name.replace('_', ' ')} (+{count})")
+            for name, count in result['resolved'].items():
+                st.success(f"Resolved: {name.replace('_', ' ')} (-{count})")
+            for (day, period), names in result['conflicts'].items():
+                st.warning(f"{day} P{period + 1}: {', '.join(name.replace('_', ' ') for name in names)}")
+            st.caption(f"Validated in {result['seconds'] * 1000:.2f} ms")
+        
+        display_timetable(editor.grid(batch), period_times, key="editor")
+        
+        apply_col, save_col = st.columns(2)
+        with apply_col:
+            if st.button("✅ Use Edited Timetable", disabled=not editor.can_undo, use_container_width=True):
+                timetables = editor.timetables()
+                st.session_state.timetable_data = next(iter(timetables.values()))
+                if problem.n_batches > 1:
+                    st.session_state.section_timetables = timetables
+                st.session_state.fitness_score = editor.fitness
+                st.session_state.timetable_id = None
+                st.success("Edited timetable is now the current timetable")
+        with save_col:
+            if st.button("💾 Save as Draft", disabled=not SCHEDULE_INDEX_AVAILABLE, use_container_width=True):
+                batch_ids = [b.get('batch_id') for b in
+                             (st.session_state.scheduler_params.get('batches') or [{}])]
+                with session_scope() as session:
+                    timetable = editor.save_draft(session, batch_ids=batch_ids if len(batch_ids) == problem.n_batches
+                                                  else None, name=f"Edited timetable {datetime.now():%Y-%m-%d %H:%M}")
+                    st.session_state.timetable_id = timetable.id
+                st.success(f"Saved as draft timetable #{st.session_state.timetable_id}")
+
 def show_my_schedule():
     st.title("My Schedule")
-    if st.session_state.user and st.session_state.user['name'] == "Ms. H. Asra Jabeen":
-        schedule_data = {
-            "Monday": ["EMF (P1)", "EMF (P7)", "Aptitude Office Hours"],
-            "Tuesday": ["Department Meeting", "EMF (P4)", "Research Time"],
-            "Wednesday": ["Aptitude (P2)", "EMF (P4)", "Student Consultations"],
-            "Thursday": ["EMF (P7)", "Curriculum Development", "Lab Supervision"],
-            "Friday": ["Faculty Meeting", "Research", "Paper Work"]
-        }
-    else:
-        schedule_data = {
-            "Monday": ["Class Preparation", "Lectures", "Office Hours"],
-            "Tuesday": ["Research", "Meetings", "Student Guidance"],
-            "Wednesday": ["Lectures", "Lab Sessions", "Planning"],
-            "Thursday": ["Department Work", "Research", "Consultations"],
-            "Friday": ["Review", "Paper Work", "Weekly Report"]
-        }
+    if not SCHEDULE_INDEX_AVAILABLE:
+        st.info("Schedules are read from approved timetables, which need the database")
+        return
+    index = default_schedule_index()
+    faculty_id = index.faculty_id(st.session_state.user['name'])
+    if faculty_id is None:
+        st.info("No classes in any approved timetable yet.")
+        return
     
-    for day, activities in schedule_data.items():
-        with st.expander(day):
-            for activity in activities:
-                st.write(f"• {activity}")
+    period_times = st.session_state.get('period_times') or {}
+    week = index.weekly_schedule(faculty_id, ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"])
+    for day, slots in week.items():
+        with st.expander(f"{day} ({len(slots)} classes)"):
+            for slot in slots:
+                start, end, _ = period_times.get(slot['period'], ("", "", ""))
+                time_label = f" {start}-{end}" if start else ""
+                kind = " Lab" if slot['kind'] == 'lab' else ""
+                room = f" @ {slot['room']}" if slot['room'] else ""
+                st.write(f"• P{slot['period'] + 1}{time_label}: {slot['subject']}{kind}{room} — {slot['timetable']}")
 
 def show_system_configuration():
     st.title("System Configuration")
@@ -638,8 +982,24 @@ def show_system_configuration():
         st.selectbox("Default Theme", ["Light", "Dark", "Auto"])
         st.button("Save Configuration", type="primary")
 
+    if GA_SCHEDULER_AVAILABLE:
+        st.subheader("Solver Cache")
+        cache = default_cache()
+        stats = cache.summary()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+        col2.metric("Hits (memory / disk)", f"{stats['memory_hits']} / {stats['disk_hits']}")
+        col3.metric("Misses", stats['misses'])
+        col4.metric("Evictions (memory / disk)", f"{stats['memory_evictions']} / {stats['disk_evictions']}")
+        st.caption(f"{stats['memory_entries']} results in memory, {stats['disk_entries']} on disk "
+                   f"({stats['disk_bytes'] / 1024:.0f} KB of {cache.disk_bytes / 1024 / 1024:.0f} MB)")
+        if st.button("Clear Solver Cache"):
+            cache.clear()
+            st.success("Solver cache cleared")
+
 # ===== MAIN APP =====
 def main_app():
+    collect_generation_result()
     with st.sidebar:
         st.markdown("### CARE College of Engineering")
         st.markdown("---")
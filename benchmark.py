@@ -0,0 +1,338 @@
+# benchmark.py - SOLVER BENCHMARK SUITE
+"""Repeatable solver benchmarks on synthetic institutions.
+
+synthetic_institution() builds an in-memory institution shaped like the
+models.py tables (departments, faculty, rooms, subjects with their
+sessions, batches and faculty unavailability); scheduler_params() and
+unavailable_slots() turn it into FlexibleTimetableScheduler parameters
+and blocked week slots. run_benchmark() solves one instance with one
+backend and a fixed seed and reports generations per second, time to the
+first feasible timetable, final fitness and peak memory.
+
+    python benchmark.py --sizes small medium --seeds 1 2 3 --output bench.json
+    python benchmark.py --compare bench.json
+    python benchmark.py --sizes large --save-problems problems/
+    python benchmark.py --problems problems/large.ttp
+
+--save-problems keeps every compiled instance as a problem snapshot (see
+problem_snapshot), which --problems benchmarks again exactly as it was.
+Results are JSON, so runs from different commits can be diffed.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ga_scheduler import (ALGORITHMS, HARD_CONSTRAINTS, FlexibleTimetableScheduler, fitness_from_penalty, period_bits,
+                          time_to_minutes)
+from problem_snapshot import load_problem, save_problem
+from profiling import SolverProfiler
+
+logger = logging.getLogger(__name__)
+
+# Bump when the result fields change meaning
+BENCHMARK_FORMAT = 1
+
+# Instance sizes: departments, batches per department, faculty and rooms per department, subjects per batch
+SIZES = {
+    'small': {'departments': 1, 'batches_per_department': 2, 'faculty_per_department': 8,
+              'rooms_per_department': 4, 'subjects_per_batch': 6},
+    'medium': {'departments': 3, 'batches_per_department': 4, 'faculty_per_department': 10,
+               'rooms_per_department': 6, 'subjects_per_batch': 7},
+    'large': {'departments': 10, 'batches_per_department': 10, 'faculty_per_department': 12,
+              'rooms_per_department': 13, 'subjects_per_batch': 7},
+}
+
+# Share of faculty with one recurring unavailable period
+UNAVAILABLE_RATE = 0.2
+
+# Share of subjects that avoid one day of the week
+AVOID_DAY_RATE = 0.1
+
+
+def synthetic_institution(departments: int = 1, batches_per_department: int = 2, faculty_per_department: int = 8,
+                          rooms_per_department: int = 4, subjects_per_batch: int = 6, seed: int = 0,
+                          days: Optional[List[str]] = None,
+                          period_times: Optional[Dict[int, tuple]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Random institution as lists of row dicts named after the models.py tables.
+
+    Every batch of a department takes a different slice of that
+    department's faculty, so faculty are shared between batches the way
+    they are in a real department. The same seed gives the same institution.
+    """
+    rng = np.random.default_rng(seed)
+    defaults = FlexibleTimetableScheduler()
+    days = days or defaults.days
+    period_times = period_times or defaults.period_times
+    teaching = [p for p in sorted(period_times) if p not in defaults.break_periods]
+    # Roughly a third of the rooms are labs
+    labs = max(1, rooms_per_department // 3)
+
+    institution = {'departments': [], 'faculty': [], 'rooms': [], 'subjects': [], 'batches': [],
+                   'faculty_unavailability': []}
+    for d in range(departments):
+        code = f"D{d:02d}"
+        institution['departments'].append({'code': code, 'name': f"Department {d + 1}"})
+        faculty = [f"Dr.{code} Faculty {i + 1}" for i in range(faculty_per_department)]
+        for i, name in enumerate(faculty):
+            institution['faculty'].append({'employee_id': f"{code}F{i:03d}", 'full_name': name,
+                                           'department': code, 'max_weekly_load': 20})
+            if rng.random() < UNAVAILABLE_RATE:
+                start, end, _ = period_times[int(rng.choice(teaching))]
+                institution['faculty_unavailability'].append({
+                    'faculty': name, 'day_of_week': int(rng.integers(len(days))),
+                    'start_time': start, 'end_time': end, 'is_recurring': True})
+        for r in range(rooms_per_department):
+            lab = r < labs
+            institution['rooms'].append({'code': f"{code}-{'L' if lab else 'R'}{r:02d}",
+                                         'room_type': 'lab_room' if lab else 'theory_room',
+                                         'capacity': 60, 'department': code})
+
+        for b in range(batches_per_department):
+            subjects = []
+            for k in range(subjects_per_batch):
+                # The first subjects are the heavy core ones, the last are light electives
+                theory = 4 if k < subjects_per_batch - 2 else 2
+                lab = 2 if k < 2 else 0
+                subject = {'code': f"{code}B{b:02d}S{k:02d}", 'name': f"Subject {k + 1}",
+                           'department': code, 'credits': 4 if lab else 3, 'total_hours': theory + lab,
+                           'faculty': faculty[(b * 3 + k) % faculty_per_department],
+                           'sessions': [{'session_type': 'theory', 'weekly_frequency': theory, 'requires_lab': False}]
+                           + ([{'session_type': 'lab', 'weekly_frequency': lab, 'requires_lab': True}] if lab else []),
+                           'avoid_day': days[int(rng.integers(len(days)))] if rng.random() < AVOID_DAY_RATE else None}
+                institution['subjects'].append(subject)
+                subjects.append(subject['code'])
+            institution['batches'].append({'department': code, 'year': 2, 'semester': 3,
+                                           'section': chr(ord('A') + b), 'strength': 60, 'subjects': subjects})
+
+    institution['rooms'] += [{'code': 'COMMON-HALL', 'room_type': 'common_hall', 'capacity': 120},
+                             {'code': 'SEMINAR-1', 'room_type': 'seminar_hall', 'capacity': 80}]
+    return institution
+
+
+def scheduler_params(institution: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """FlexibleTimetableScheduler parameters that schedule every batch of the institution jointly"""
+    subjects = {s['code']: s for s in institution['subjects']}
+
+    batches = []
+    for batch in institution['batches']:
+        configs = []
+        for code in batch['subjects']:
+            subject = subjects[code]
+            load = {s['session_type']: s['weekly_frequency'] for s in subject['sessions']}
+            configs.append({'code': code, 'faculty': subject['faculty'], 'theory_classes': load.get('theory', 0),
+                            'lab_classes': load.get('lab', 0), 'preferred_days': [],
+                            'avoid_day': subject['avoid_day']})
+        batches.append({'name': f"{batch['department']} Sem {batch['semester']} - {batch['section']}",
+                        'department': batch['department'], 'strength': batch['strength'],
+                        'subject_configs': configs, 'fixed_slots': []})
+    return {'batches': batches, 'rooms': institution['rooms'], 'max_periods_per_day': 6,
+            'max_classes_per_faculty': 5}
+
+
+def unavailable_slots(institution: Dict[str, List[Dict[str, Any]]],
+                      period_times: Optional[Dict[int, tuple]] = None) -> Dict[str, int]:
+    """Blocked week slots by faculty name, in the bit layout of TimetableProblem (bit day * periods + period)"""
+    period_times = period_times or FlexibleTimetableScheduler().period_times
+    unavailable: Dict[str, int] = {}
+    for row in institution['faculty_unavailability']:
+        bits = period_bits(period_times, time_to_minutes(row['start_time']), time_to_minutes(row['end_time']))
+        bits <<= row['day_of_week'] * len(period_times)
+        unavailable[row['faculty']] = unavailable.get(row['faculty'], 0) | bits
+    return unavailable
+
+
+def _solve(problem, algorithm, pop_size, ngen, seed, time_budget, profiler: SolverProfiler) -> Dict[str, Any]:
+    """last_run of solving problem through generate_timetable, exactly as the app does"""
+    scheduler = FlexibleTimetableScheduler({})
+    scheduler.profiler = profiler
+    scheduler.generate_timetable(pop_size=pop_size, ngen=ngen, seed=seed, algorithm=algorithm,
+                                 time_budget=time_budget, problem=problem)
+    return scheduler.last_run
+
+
+def run_benchmark(institution: Dict[str, List[Dict[str, Any]]], algorithm: str = 'ga', seed: int = 1, pop_size: int = 50,
+                  ngen: int = 200, time_budget: Optional[float] = None, memory: bool = True,
+                  profile: bool = False) -> Dict[str, Any]:
+    """Solve one instance with one backend and report its speed and result quality.
+
+    Timing runs without tracemalloc, whose bookkeeping slows the solvers
+    down; with memory=True the same seeded run is repeated for the same
+    number of generations under tracemalloc to measure peak memory. With
+    profile=True the result also carries the SolverProfiler summary of the
+    timed run.
+    """
+    started = time.perf_counter()
+    problem = build_problem(institution)
+    return run_problem_benchmark(problem, algorithm, seed, pop_size, ngen, time_budget, memory, profile,
+                                 setup=time.perf_counter() - started)
+
+
+def build_problem(institution: Dict[str, List[Dict[str, Any]]]):
+    """Compiled TimetableProblem of a synthetic institution"""
+    scheduler = FlexibleTimetableScheduler(scheduler_params(institution))
+    return scheduler.build_problem(unavailable=unavailable_slots(institution, scheduler.period_times))
+
+
+def run_problem_benchmark(problem, algorithm: str = 'ga', seed: int = 1, pop_size: int = 50, ngen: int = 200,
+                          time_budget: Optional[float] = None, memory: bool = True, profile: bool = False,
+                          setup: float = 0.0) -> Dict[str, Any]:
+    """run_benchmark() on an already compiled problem, such as a loaded snapshot"""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {', '.join(ALGORITHMS)}")
+    profiler = SolverProfiler(enabled=profile)
+    run = _solve(problem, algorithm, pop_size, ngen, seed, time_budget, profiler)
+    # Annealing counts moves; pop_size of them make one generation, as in generate_timetable
+    generations = run['generations'] / pop_size if algorithm == 'sa' else run['generations']
+    elapsed, evaluations, penalty, counts = run['elapsed'], run['evaluations'], run['penalty'], run['violations']
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            _solve(problem, algorithm, pop_size, max(1, int(round(generations))), seed, None, SolverProfiler())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'algorithm': algorithm,
+        'seed': seed,
+        'pop_size': pop_size,
+        'batches': problem.n_batches,
+        'sessions': problem.n_sessions,
+        'faculty': problem.n_faculty,
+        'rooms': problem.n_rooms,
+        'setup_seconds': setup,
+        'elapsed_seconds': elapsed,
+        'generations': generations,
+        'evaluations': evaluations,
+        'generations_per_second': generations / elapsed if elapsed else None,
+        'evaluations_per_second': evaluations / elapsed if elapsed else None,
+        'time_to_first_feasible': run['first_feasible'],
+        'first_feasible_generation': run['first_feasible_generation'],
+        'final_penalty': penalty,
+        'final_fitness': fitness_from_penalty(penalty),
+        'hard_violations': sum(counts.get(name, 0) for name in HARD_CONSTRAINTS),
+        'violations': counts,
+        'peak_memory_bytes': peak,
+        'profile': profiler.to_dict() if profile else None,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[str] = ('small', 'medium'), algorithms: List[str] = tuple(ALGORITHMS),
+              seeds: List[int] = (1, 2, 3), pop_size: int = 50, ngen: int = 200,
+              time_budget: Optional[float] = None, memory: bool = True, profile: bool = False,
+              problems: List[str] = (), save_problems: Optional[str] = None) -> Dict[str, Any]:
+    """Every instance x algorithm x seed combination, with the environment needed to compare runs later.
+
+    Instances are the synthetic sizes followed by the snapshot files in
+    problems (named after the file). With save_problems, every synthetic
+    instance is also saved there as <size>.ttp.
+    """
+    instances = []
+    for size in sizes:
+        started = time.perf_counter()
+        problem = build_problem(synthetic_institution(**SIZES[size]))
+        setup = time.perf_counter() - started
+        if save_problems:
+            os.makedirs(save_problems, exist_ok=True)
+            save_problem(problem, os.path.join(save_problems, f"{size}.ttp"), {'size': size, **SIZES[size]})
+        instances.append((size, problem, setup))
+    for path in problems:
+        started = time.perf_counter()
+        problem = load_problem(path)
+        instances.append((os.path.splitext(os.path.basename(path))[0], problem, time.perf_counter() - started))
+
+    results = []
+    for size, problem, setup in instances:
+        for algorithm in algorithms:
+            for seed in seeds:
+                result = dict(run_problem_benchmark(problem, algorithm, seed, pop_size, ngen, time_budget, memory,
+                                                    profile, setup),
+                              instance=size)
+                logger.info("%s/%s seed %d: %.1f generations/s, fitness %.2f", size, algorithm, seed,
+                            result['generations_per_second'] or 0, result['final_fitness'])
+                results.append(result)
+    return {
+        'format': BENCHMARK_FORMAT,
+        'created': datetime.utcnow().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.platform(),
+        'settings': {'pop_size': pop_size, 'ngen': ngen, 'time_budget': time_budget},
+        'results': results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Speed ratio and fitness change of every case present in both reports"""
+    key = lambda r: (r['instance'], r['algorithm'], r['seed'])
+    before = {key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = before.get(key(result))
+        if old is None or not old['generations_per_second']:
+            continue
+        rows.append({'instance': result['instance'], 'algorithm': result['algorithm'], 'seed': result['seed'],
+                     'speedup': result['generations_per_second'] / old['generations_per_second'],
+                     'fitness_change': result['final_fitness'] - old['final_fitness']})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the timetable solvers on synthetic institutions")
+    parser.add_argument('--sizes', nargs='*', choices=list(SIZES), help="synthetic instances "
+                        "(default: small and medium unless --problems is given)")
+    parser.add_argument('--problems', nargs='+', default=[], metavar='SNAPSHOT', help="benchmark saved problems")
+    parser.add_argument('--save-problems', metavar='DIR', help="save the synthetic instances as problem snapshots")
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--seeds', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--pop-size', type=int, default=50)
+    parser.add_argument('--generations', type=int, default=200)
+    parser.add_argument('--time-budget', type=float, help="seconds per run")
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced peak memory pass")
+    parser.add_argument('--profile', action='store_true', help="add per-operator and per-constraint timings")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare against an earlier JSON report")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+
+    sizes = args.sizes if args.sizes is not None else ([] if args.problems else ['small', 'medium'])
+    report = run_suite(sizes, args.algorithms, args.seeds, args.pop_size, args.generations,
+                       args.time_budget, not args.no_memory, args.profile, args.problems, args.save_problems)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for row in compare(baseline, report):
+            print(f"{row['instance']}/{row['algorithm']} seed {row['seed']}: {row['speedup']:.2f}x speed, "
+                  f"fitness {row['fitness_change']:+.2f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# clash_detection.py - INSTITUTION-WIDE CLASH DETECTION
+"""Clash checks of a timetable against every approved timetable.
+
+The ClashIndex hashes every approved TimetableEntry under its
+(resource, day, slot) keys, where a resource is a faculty member, a room
+or a batch. Checking a draft is one dict lookup per key of each of its
+entries, so the cost grows with the draft, not with the number of
+approved timetables. Like the schedule index it is built with one query,
+kept current by schedule_index.approve_timetable(), and brought up to date
+with approvals made elsewhere by schedule_index.refresh_index() on every
+default_clash_index() call.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from models import (DEFAULT_DB_URL, ApprovalStatus, Batch, Department, Faculty, Room, Subject, Timetable,
+                    TimetableEntry, User, session_scope)
+from schedule_index import approved_timetables, refresh_index
+
+logger = logging.getLogger(__name__)
+
+# Resources that can only be in one place per slot
+RESOURCES = ('faculty', 'room', 'batch')
+
+
+def _entry_query(session):
+    return (session.query(TimetableEntry.timetable_id, Timetable.name, TimetableEntry.day_of_week,
+                          TimetableEntry.time_slot, Subject.code,
+                          TimetableEntry.faculty_id, User.full_name,
+                          TimetableEntry.room_id, Room.code,
+                          TimetableEntry.batch_id, Department.code, Batch.semester, Batch.section)
+            .join(Timetable, TimetableEntry.timetable_id == Timetable.id)
+            .outerjoin(Subject, TimetableEntry.subject_id == Subject.id)
+            .outerjoin(Faculty, TimetableEntry.faculty_id == Faculty.id)
+            .outerjoin(User, Faculty.user_id == User.id)
+            .outerjoin(Room, TimetableEntry.room_id == Room.id)
+            .outerjoin(Batch, TimetableEntry.batch_id == Batch.id)
+            .outerjoin(Department, Batch.department_id == Department.id))
+
+
+def _entries(rows) -> List[Dict[str, Any]]:
+    """Entry dicts with a display name per resource"""
+    entries = []
+    for (timetable_id, timetable, day, period, subject, faculty_id, faculty_name, room_id, room_code,
+         batch_id, department, semester, section) in rows:
+        if day is None or period is None:
+            continue
+        batch_name = f"{department} Sem {semester} - {section}" if department else f"Batch {batch_id}"
+        entries.append({'timetable_id': timetable_id, 'timetable': timetable, 'day': day, 'period': period,
+                        'subject': subject,
+                        'faculty': (faculty_id, faculty_name or f"Faculty {faculty_id}"),
+                        'room': (room_id, room_code or f"Room {room_id}"),
+                        'batch': (batch_id, batch_name)})
+    return entries
+
+
+def _keys(entry):
+    for resource in RESOURCES:
+        resource_id = entry[resource][0]
+        if resource_id is not None:
+            yield resource, (resource, resource_id, entry['day'], entry['period'])
+
+
+def _clash(resource, entry, other) -> Dict[str, Any]:
+    return {'type': resource, 'resource': entry[resource][1], 'day': entry['day'], 'period': entry['period'],
+            'subject': entry['subject'], 'other_timetable_id': other['timetable_id'],
+            'other_timetable': other['timetable'], 'other_subject': other['subject']}
+
+
+class ClashIndex:
+    """(resource, id, day, slot) -> approved entries occupying it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._occupied: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._timetables: Dict[int, List[tuple]] = {}
+        # Approval time of every timetable indexed as approved (see schedule_index.refresh_index)
+        self.approved: Dict[int, Optional[datetime]] = {}
+
+    @classmethod
+    def from_session(cls, session) -> 'ClashIndex':
+        """Index of every approved timetable"""
+        index = cls()
+        index.approved = approved_timetables(session)
+        index._add(_entries(_entry_query(session).filter(Timetable.status == ApprovalStatus.APPROVED).all()))
+        logger.info("Indexed %d approved timetables for clash checks", len(index._timetables))
+        return index
+
+    def add_timetable(self, session, timetable_id: int):
+        """Index (or re-index) one timetable's entries"""
+        entries = _entries(_entry_query(session).filter(TimetableEntry.timetable_id == timetable_id).all())
+        with self._lock:
+            self._remove(timetable_id)
+        self._add(entries)
+
+    def remove_timetable(self, timetable_id: int):
+        with self._lock:
+            self._remove(timetable_id)
+
+    def _add(self, entries):
+        with self._lock:
+            for entry in entries:
+                keys = self._timetables.setdefault(entry['timetable_id'], [])
+                for _, key in _keys(entry):
+                    self._occupied.setdefault(key, []).append(entry)
+                    keys.append(key)
+
+    def _remove(self, timetable_id):
+        for key in self._timetables.pop(timetable_id, ()):
+            remaining = [e for e in self._occupied.get(key, ()) if e['timetable_id'] != timetable_id]
+            if remaining:
+                self._occupied[key] = remaining
+            else:
+                self._occupied.pop(key, None)
+
+    # ----- checks -----
+    def check(self, entries: List[Dict[str, Any]], timetable_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Clashes of entries with the approved timetables and with each other.
+
+        Entries of timetable_id itself in the index (when re-checking an
+        approved timetable) are not counted as clashes. Each clash names
+        the resource, the slot, both subjects and the other timetable,
+        which for clashes inside the checked entries is their own.
+        """
+        clashes, own = [], {}
+        with self._lock:
+            for entry in entries:
+                for resource, key in _keys(entry):
+                    for other in self._occupied.get(key, ()):
+                        if other['timetable_id'] != timetable_id:
+                            clashes.append(_clash(resource, entry, other))
+                    if key in own:
+                        clashes.append(_clash(resource, entry, own[key]))
+                    else:
+                        own[key] = entry
+        return sorted(clashes, key=lambda c: (c['day'], c['period'], RESOURCES.index(c['type'])))
+
+    def check_timetable(self, session, timetable_id: int) -> List[Dict[str, Any]]:
+        """check() of a stored timetable's entries"""
+        entries = _entries(_entry_query(session).filter(TimetableEntry.timetable_id == timetable_id).all())
+        return self.check(entries, timetable_id)
+
+
+_indexes: Dict[str, ClashIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def default_clash_index(db_url: str = DEFAULT_DB_URL) -> ClashIndex:
+    """Process-wide clash index of the approved timetables in db_url, built on first use and refreshed on every call"""
+    with _indexes_lock, session_scope(db_url) as session:
+        index = _indexes.get(db_url)
+        if index is None:
+            index = _indexes[db_url] = ClashIndex.from_session(session)
+        else:
+            refresh_index(session, index)
+        return index
@@ -0,0 +1,176 @@
+# constraint_index.py - PRECOMPUTED CONSTRAINT LOOKUPS
+"""Dense lookup structures compiled once from the models.py tables.
+
+Solvers consult these instead of the ORM, so every hot-path check is a
+single array lookup or bit test:
+
+- faculty x day availability bitmasks (bit p set = free in period p)
+- faculty x subject eligibility matrix
+- batch x room fit matrix and per-batch room bitmasks
+- lab-room / teaching-room bitmasks and per-session lab requirements
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ga_scheduler import TEACHING_ROOM_TYPES as TEACHING_ROOM_VALUES
+from ga_scheduler import normalize_name, period_bits, time_to_minutes
+from models import (Batch, Faculty, FacultySubject, FacultyUnavailability, Room, RoomType,
+                    Subject, SubjectSession, User)
+
+logger = logging.getLogger(__name__)
+
+# Room types that can host non-lab sessions: ga_scheduler's list as RoomType members
+TEACHING_ROOM_TYPES = tuple(RoomType(value) for value in TEACHING_ROOM_VALUES)
+
+
+class ConstraintIndex:
+    """Constraint lookups for one time structure"""
+
+    def __init__(self, days: List[str], period_times: Dict[int, tuple]):
+        self.days = list(days)
+        self.period_times = dict(period_times)
+
+    @classmethod
+    def from_session(cls, session, days: List[str], period_times: Dict[int, tuple]) -> 'ConstraintIndex':
+        """Compile the index with one column-level query per table"""
+        index = cls(days, period_times)
+        index._load_faculty(session)
+        index._load_subjects(session)
+        index._load_rooms(session)
+        logger.info("Compiled constraint index: %d faculty, %d subjects, %d rooms, %d batches",
+                    len(index.faculty_ids), len(index.subject_ids), len(index.room_ids), len(index.batch_ids))
+        return index
+
+    # ----- compilation -----
+    def _load_faculty(self, session):
+        rows = (session.query(Faculty.id, User.full_name)
+                .outerjoin(User, Faculty.user_id == User.id).order_by(Faculty.id).all())
+        self.faculty_ids = [faculty_id for faculty_id, _ in rows]
+        self.faculty_names = [name or '' for _, name in rows]
+        self.faculty_index = {faculty_id: i for i, faculty_id in enumerate(self.faculty_ids)}
+        self.faculty_by_name = {normalize_name(name): i for i, name in enumerate(self.faculty_names) if name}
+
+        # Only recurring unavailability shapes a weekly timetable
+        self.unavailability: Dict[int, List[Tuple[int, int, int]]] = {}
+        for faculty_id, day, start, end in (session.query(FacultyUnavailability.faculty_id,
+                                                          FacultyUnavailability.day_of_week,
+                                                          FacultyUnavailability.start_time,
+                                                          FacultyUnavailability.end_time)
+                                            .filter(FacultyUnavailability.is_recurring.is_(True)).all()):
+            if faculty_id not in self.faculty_index or day is None or not 0 <= day < len(self.days):
+                continue
+            self.unavailability.setdefault(self.faculty_index[faculty_id], []).append(
+                (day, time_to_minutes(start or "00:00"), time_to_minutes(end or "23:59")))
+        self.available = self._availability_masks(self.period_times)
+
+    def _availability_masks(self, period_times):
+        available = np.full((len(self.faculty_ids), len(self.days)), (1 << len(period_times)) - 1, dtype=np.uint64)
+        for faculty, intervals in self.unavailability.items():
+            for day, start, end in intervals:
+                available[faculty, day] &= np.uint64(~period_bits(period_times, start, end) & ((1 << 64) - 1))
+        return available
+
+    def _load_subjects(self, session):
+        rows = session.query(Subject.id, Subject.code).order_by(Subject.id).all()
+        self.subject_ids = [subject_id for subject_id, _ in rows]
+        self.subject_codes = [code for _, code in rows]
+        self.subject_index = {subject_id: i for i, subject_id in enumerate(self.subject_ids)}
+        self.subject_by_code = {code: i for i, code in enumerate(self.subject_codes)}
+
+        self.eligible = np.zeros((len(self.faculty_ids), len(self.subject_ids)), dtype=bool)
+        self.primary = np.zeros_like(self.eligible)
+        for faculty_id, subject_id, is_primary in session.query(
+                FacultySubject.faculty_id, FacultySubject.subject_id, FacultySubject.is_primary).all():
+            if faculty_id in self.faculty_index and subject_id in self.subject_index:
+                f, s = self.faculty_index[faculty_id], self.subject_index[subject_id]
+                self.eligible[f, s] = True
+                self.primary[f, s] |= bool(is_primary)
+
+        rows = session.query(SubjectSession.id, SubjectSession.subject_id, SubjectSession.requires_lab) \
+            .order_by(SubjectSession.id).all()
+        self.session_ids = [session_id for session_id, _, _ in rows]
+        self.session_subject = np.array([self.subject_index.get(subject_id, -1) for _, subject_id, _ in rows],
+                                        dtype=np.int64)
+        self.session_requires_lab = np.array([bool(requires_lab) for _, _, requires_lab in rows], dtype=bool)
+        self.subject_requires_lab = np.zeros(len(self.subject_ids), dtype=bool)
+        self.subject_requires_lab[self.session_subject[self.session_requires_lab & (self.session_subject >= 0)]] = True
+
+    def _load_rooms(self, session):
+        rows = session.query(Room.id, Room.code, Room.room_type, Room.capacity, Room.is_available) \
+            .order_by(Room.id).all()
+        self.room_ids = [room_id for room_id, *_ in rows]
+        self.room_codes = [code for _, code, *_ in rows]
+        self.room_index = {room_id: i for i, room_id in enumerate(self.room_ids)}
+        self.room_by_code = {code: i for i, code in enumerate(self.room_codes)}
+        self.room_capacity = np.array([capacity or 0 for *_, capacity, _ in rows], dtype=np.int64)
+        self.room_usable = usable = np.array([available is not False for *_, available in rows], dtype=bool)
+        room_types = [room_type for _, _, room_type, _, _ in rows]
+        self.room_is_lab = np.array([t == RoomType.LAB_ROOM for t in room_types], dtype=bool) & usable
+        self.room_is_teaching = np.array([t in TEACHING_ROOM_TYPES for t in room_types], dtype=bool) & usable
+        self.lab_room_bits = self._bits(self.room_is_lab)
+        self.teaching_room_bits = self._bits(self.room_is_teaching)
+
+        rows = session.query(Batch.id, Batch.strength).order_by(Batch.id).all()
+        self.batch_ids = [batch_id for batch_id, _ in rows]
+        self.batch_index = {batch_id: i for i, batch_id in enumerate(self.batch_ids)}
+        self.batch_strength = np.array([strength or 0 for _, strength in rows], dtype=np.int64)
+        self.room_fits = (self.room_capacity[None, :] >= self.batch_strength[:, None]) & usable[None, :]
+        self.batch_room_bits = [self._bits(row) for row in self.room_fits]
+
+    @staticmethod
+    def _bits(mask) -> int:
+        """Python int with bit i set for every True entry (any number of rooms)"""
+        return sum(1 << int(i) for i in np.flatnonzero(mask))
+
+    # ----- lookups -----
+    def is_available(self, faculty: int, day: int, period: int) -> bool:
+        return bool((int(self.available[faculty, day]) >> period) & 1)
+
+    def can_teach(self, faculty: int, subject: int) -> bool:
+        return bool(self.eligible[faculty, subject])
+
+    def can_teach_by_name(self, name: str, subject_code: str) -> bool:
+        """Eligibility by display name and subject code.
+
+        Faculty or subjects missing from the database, and faculty without
+        any FacultySubject rows yet, are not checked.
+        """
+        faculty = self.faculty_by_name.get(normalize_name(name))
+        subject = self.subject_by_code.get(subject_code)
+        if faculty is None or subject is None or not self.eligible[faculty].any():
+            return True
+        return self.can_teach(faculty, subject)
+
+    def rooms_for(self, batch: int, requires_lab: bool) -> int:
+        """Bitmask of rooms that fit the batch and suit the session type"""
+        return self.batch_room_bits[batch] & (self.lab_room_bits if requires_lab else self.teaching_room_bits)
+
+    def rooms_for_strength(self, strength: int, requires_lab: bool) -> int:
+        """rooms_for() of a batch that is not in the database, by its strength"""
+        fits = self._bits((self.room_capacity >= (strength or 0)) & self.room_usable)
+        return fits & (self.lab_room_bits if requires_lab else self.teaching_room_bits)
+
+    def unavailable_slots_by_name(self, days: Optional[List[str]] = None,
+                                  period_times: Optional[Dict[int, tuple]] = None) -> Dict[str, int]:
+        """Week-slot bitmask (bit day * periods + period) of blocked teaching slots per faculty name.
+
+        A different time structure than the compiled one is re-derived from
+        the stored unavailability intervals.
+        """
+        period_times = dict(period_times or self.period_times)
+        days = list(days or self.days)
+        available = self.available if period_times == self.period_times else self._availability_masks(period_times)
+        full = (1 << len(period_times)) - 1
+        blocked = {}
+        for faculty in self.unavailability:
+            bits = 0
+            for day_name in days:
+                if day_name not in self.days:
+                    continue
+                day = days.index(day_name)
+                bits |= (~int(available[faculty, self.days.index(day_name)]) & full) << (day * len(period_times))
+            if bits:
+                blocked[self.faculty_names[faculty]] = bits
+        return blocked
@@ -0,0 +1,268 @@
+# csv_import.py - BULK IMPORT OF EXPORTED TIMETABLE GRIDS
+"""Streaming import of grid CSVs such as approved_timetable_0.csv.
+
+Each file is one batch's week: a header row of teaching period numbers
+(1, 2, ... counting only teaching periods, breaks excluded), then one row
+per day starting with the day name or abbreviation (MON, Tuesday, ...).
+Cells hold a subject as exported (code, name, abbreviation such as EMF,
+or a full label 'U24EC311 Lab (Ms.X) @ ECE-LAB'), with -1 for a free slot.
+
+Files are read row by row and become approved Timetable rows with their
+TimetableEntry rows. Entries are bulk-inserted and committed every
+BATCH_ENTRIES entries, so memory stays flat however many files there are.
+Subjects resolve through a SubjectLookup built with one query. Bad rows
+and cells are reported per file and skipped; only a file with an
+unreadable header or no valid rows is left out entirely.
+
+    python csv_import.py exports/ --semester 3 --academic-year 2025-2026
+"""
+import argparse
+import csv
+import glob
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ga_scheduler import FlexibleTimetableScheduler, normalize_name
+from models import (DEFAULT_DB_URL, ApprovalStatus, Faculty, FacultySubject, SessionType, Subject, Timetable, User,
+                    bulk_insert_entries, session_scope)
+from timetable_grid import BREAK, FREE, SessionTable, TimetableGrid, is_break_period, parse_label
+
+logger = logging.getLogger(__name__)
+
+# Entries written per bulk insert and commit
+BATCH_ENTRIES = 5000
+
+# Cell values marking a free slot
+FREE_VALUES = ('-1', '', 'free')
+
+# Exported abbreviations that can't be derived from subject names
+DEFAULT_SUBJECT_ALIASES = {'EMF': 'U24EC311'}
+
+# Words left out of subject name acronyms
+ACRONYM_STOP_WORDS = ('and', 'of', 'the', 'for', 'in')
+
+
+class SubjectLookup:
+    """Subject and primary faculty ids by code, name, acronym, first word or alias, resolved once per token"""
+
+    def __init__(self, session, aliases: Optional[Dict[str, str]] = None):
+        rows = session.query(Subject.id, Subject.code, Subject.name).all()
+        by_code = {code.upper(): subject_id for subject_id, code, _ in rows if code}
+        self.codes = {subject_id: code for subject_id, code, _ in rows}
+        self._keys: Dict[str, Optional[int]] = {}
+        # Weaker keys first, so codes and names override acronyms and first words
+        for subject_id, code, name in rows:
+            words = [w for w in re.split(r'[^A-Za-z0-9]+', name or '') if w]
+            acronym = ''.join(w[0] for w in words if w.lower() not in ACRONYM_STOP_WORDS)
+            for key in (acronym, words[0] if words else ''):
+                self._add_weak(key, subject_id)
+        for subject_id, code, name in rows:
+            for key in (name, code):
+                if key:
+                    self._keys[self._key(key)] = subject_id
+        for alias, code in {**DEFAULT_SUBJECT_ALIASES, **(aliases or {})}.items():
+            if code.upper() in by_code:
+                self._keys[self._key(alias)] = by_code[code.upper()]
+
+        self.primary_faculty: Dict[int, Tuple[int, Optional[str]]] = {}
+        for subject_id, faculty_id, name, is_primary in (
+                session.query(FacultySubject.subject_id, Faculty.id, User.full_name, FacultySubject.is_primary)
+                .join(Faculty, FacultySubject.faculty_id == Faculty.id)
+                .outerjoin(User, Faculty.user_id == User.id)
+                .order_by(FacultySubject.is_primary.desc(), FacultySubject.id).all()):
+            self.primary_faculty.setdefault(subject_id, (faculty_id, name))
+        self.faculty_by_name = {normalize_name(name): faculty_id for faculty_id, name in
+                                session.query(Faculty.id, User.full_name).join(User, Faculty.user_id == User.id)
+                                if name}
+        self._resolved: Dict[str, Optional[int]] = {}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return normalize_name(token)
+
+    def _add_weak(self, key, subject_id):
+        key = self._key(key)
+        if not key:
+            return
+        # Keys shared by two subjects are ambiguous and resolve to nothing
+        self._keys[key] = subject_id if self._keys.get(key, subject_id) == subject_id else None
+
+    def resolve(self, token: str) -> Optional[int]:
+        """Subject id of an exported subject token, or None"""
+        if token not in self._resolved:
+            self._resolved[token] = self._keys.get(self._key(token))
+        return self._resolved[token]
+
+
+def _day_index(value: str, days: List[str]) -> Optional[int]:
+    value = value.strip().lower()
+    for d, day in enumerate(days):
+        if value and (value == day.lower() or (len(value) >= 3 and day.lower().startswith(value))):
+            return d
+    return None
+
+
+def _read_file(path: str, lookup: SubjectLookup, days: List[str], teaching: List[int], period_names: List[str],
+               table: SessionTable):
+    """Entry dicts (without timetable_id), the display grid and the problems found in one file"""
+    errors: List[Tuple[int, str]] = []
+    entries: List[Dict[str, Any]] = []
+    cells = np.full((len(days), len(period_names)), FREE, dtype=np.int16)
+    cells[:, [p for p, name in enumerate(period_names) if is_break_period(name)]] = BREAK
+    seen_days = set()
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        try:
+            numbers = [int(value) for value in (header or [])[1:]]
+        except ValueError:
+            return entries, None, [(1, f"Header is not a list of period numbers: {header}")]
+        if not numbers or not all(1 <= n <= len(teaching) for n in numbers):
+            return entries, None, [(1, f"Header periods must be 1-{len(teaching)}: {header}")]
+        periods = [teaching[n - 1] for n in numbers]
+
+        # Rows are numbered without blank lines (exports often end lines with CR CR LF)
+        line = 1
+        for row in reader:
+            if not row or not any(value.strip() for value in row):
+                continue
+            line += 1
+            day = _day_index(row[0], days)
+            if day is None:
+                errors.append((line, f"Unknown day '{row[0]}'"))
+                continue
+            if day in seen_days:
+                errors.append((line, f"{days[day]} appears twice"))
+                continue
+            seen_days.add(day)
+            if len(row) - 1 != len(periods):
+                errors.append((line, f"Expected {len(periods)} periods, found {len(row) - 1}"))
+            for number, period, value in zip(numbers, periods, row[1:]):
+                value = value.strip()
+                if value.lower() in FREE_VALUES:
+                    continue
+                subject, kind, faculty, room = parse_label(value)
+                subject_id = lookup.resolve(subject)
+                if subject_id is None:
+                    errors.append((line, f"Unknown subject '{subject}' in period {number}"))
+                    continue
+                faculty_id = lookup.faculty_by_name.get(normalize_name(faculty)) if faculty else None
+                if faculty_id is None:
+                    faculty_id, faculty = lookup.primary_faculty.get(subject_id, (None, faculty))
+                entries.append({'day_of_week': day, 'time_slot': period, 'subject_id': subject_id,
+                                'faculty_id': faculty_id,
+                                'session_type': SessionType.LAB if kind == 'lab' else SessionType.THEORY})
+                cells[day, period] = table.intern(lookup.codes[subject_id], kind, faculty, room)
+
+    if not entries:
+        errors.append((0, "No valid classes"))
+        return entries, None, errors
+    return entries, TimetableGrid(days, period_names, cells, table), errors
+
+
+def import_timetables(session, paths: Iterable[str], days: Optional[List[str]] = None,
+                      period_times: Optional[Dict[int, tuple]] = None, aliases: Optional[Dict[str, str]] = None,
+                      batch_entries: int = BATCH_ENTRIES, index=None, clash_index=None,
+                      **details) -> List[Dict[str, Any]]:
+    """Import grid CSV files as approved timetables, committing every batch_entries entries.
+
+    details are further Timetable columns (department_id, academic_year,
+    semester, ...) and may include batch_id for the entries. index and
+    clash_index (see schedule_index, clash_detection) learn every imported
+    timetable. Returns one report per file: 'file', 'timetable_id' (None
+    if skipped), 'entries' and 'errors' as (row, message) pairs, counting
+    the header as row 1 and skipping blank lines.
+    """
+    if days is None or period_times is None:
+        defaults = FlexibleTimetableScheduler({})
+        days, period_times = days or defaults.days, period_times or defaults.period_times
+    period_names = [period_times[p][2] for p in sorted(period_times)]
+    teaching = [p for p, name in enumerate(period_names) if not is_break_period(name)]
+    batch_id = details.pop('batch_id', None)
+    lookup = SubjectLookup(session, aliases)
+    table = SessionTable()
+
+    reports: List[Dict[str, Any]] = []
+    pending: List[Tuple[Timetable, List[Dict[str, Any]], Dict[str, Any]]] = []
+    size = 0
+
+    def flush():
+        timetables = [timetable for timetable, _, _ in pending]
+        session.add_all(timetables)
+        session.flush()
+        bulk_insert_entries(session, [dict(entry, timetable_id=timetable.id, batch_id=batch_id)
+                                      for timetable, entries, _ in pending for entry in entries])
+        session.commit()
+        for timetable, _, report in pending:
+            report['timetable_id'] = timetable.id
+            for target in (index, clash_index):
+                if target is not None:
+                    target.add_timetable(session, timetable.id)
+        logger.info("Imported %d timetables (%d entries)", len(pending), sum(len(e) for _, e, _ in pending))
+        pending.clear()
+
+    for path in paths:
+        report = {'file': path, 'timetable_id': None, 'entries': 0, 'errors': []}
+        reports.append(report)
+        try:
+            entries, grid, report['errors'] = _read_file(path, lookup, days, teaching, period_names, table)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            report['errors'] = [(0, f"Unreadable: {e}")]
+            continue
+        for line, message in report['errors']:
+            logger.warning("%s: row %d: %s", path, line, message)
+        if grid is None:
+            continue
+        report['entries'] = len(entries)
+        timetable = Timetable(name=os.path.splitext(os.path.basename(path))[0], status=ApprovalStatus.APPROVED,
+                              approved_at=datetime.utcnow(), generated_data=grid.to_display(), **details)
+        pending.append((timetable, entries, report))
+        size += len(entries)
+        if size >= batch_entries:
+            flush()
+            size = 0
+    if pending:
+        flush()
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import exported timetable grid CSVs as approved timetables")
+    parser.add_argument('paths', nargs='+', help="CSV files or directories of them")
+    parser.add_argument('--db', default=DEFAULT_DB_URL, help="database URL")
+    parser.add_argument('--department-id', type=int)
+    parser.add_argument('--batch-id', type=int)
+    parser.add_argument('--academic-year')
+    parser.add_argument('--semester', type=int)
+    parser.add_argument('--alias', action='append', default=[], metavar='TOKEN=CODE',
+                        help="extra subject abbreviation, e.g. EMF=U24EC311")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+
+    paths = []
+    for path in args.paths:
+        paths += sorted(glob.glob(os.path.join(path, '*.csv'))) if os.path.isdir(path) else [path]
+    aliases = dict(alias.split('=', 1) for alias in args.alias)
+    with session_scope(args.db) as session:
+        reports = import_timetables(session, paths, aliases=aliases, department_id=args.department_id,
+                                    batch_id=args.batch_id, academic_year=args.academic_year,
+                                    semester=args.semester)
+    imported = [r for r in reports if r['timetable_id'] is not None]
+    for report in reports:
+        for line, message in report['errors']:
+            print(f"{report['file']}: row {line}: {message}")
+    print(f"Imported {len(imported)} of {len(reports)} files, "
+          f"{sum(r['entries'] for r in imported)} entries, "
+          f"{sum(len(r['errors']) for r in reports)} problems")
+    return 0 if len(imported) == len(reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,964 @@
 # ga_scheduler.py - FLEXIBLE TIME STRUCTURE
-import random
 import numpy as np
-from deap import base, creator, tools, algorithms
-import pandas as pd
+import itertools
 import logging
 import time
-from typing import Dict, List, Any
-from datetime import datetime, timedelta
+from functools import cached_property
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from profiling import SolverProfiler
+from timetable_grid import BREAK, SessionTable, TimetableGrid, is_break_period
 
 logger = logging.getLogger(__name__)
 
+# Cell value for a slot with no session in it
+FREE = -1
+
+# Penalty per violation of each constraint (hard constraints weigh the most)
+PENALTY_WEIGHTS = {
+    'faculty_clash': 100.0,
+    'room_clash': 100.0,
+    'faculty_unavailable': 50.0,
+    'avoid_day': 20.0,
+    'daily_overload': 10.0,
+    'faculty_weekly_overload': 5.0,
+    'lab_before_theory': 5.0,
+    'friday_afternoon_lab': 5.0,
+    'back_to_back': 2.0,
+    'subject_repeat': 2.0,
+    'preferred_day': 0.5,
+}
+
+# Constraints that make a timetable unusable when violated
+HARD_CONSTRAINTS = ('faculty_clash', 'room_clash', 'faculty_unavailable', 'avoid_day')
+
+# Faculty name shown for subjects with no faculty assigned
+UNASSIGNED_FACULTY = 'TBA'
+
+# Penalty at which the reported fitness drops to 50%
+FITNESS_SCALE = 100.0
+
+# Solver backends selectable through generate_timetable(algorithm=...)
+ALGORITHMS = {'ga': "Genetic algorithm", 'sa': "Simulated annealing"}
+
+# Why a run ended, as recorded in last_run['stop_reason']
+STOP_REASONS = {
+    'generations': "Completed the planned generations",
+    'time_budget': "Used up the time budget",
+    'stagnation': "Best fitness stopped improving",
+    'optimal': "Found a timetable without avoidable violations",
+    'cancelled': "Cancelled",
+}
+
+# Room types (models.RoomType values) that can host theory sessions
+TEACHING_ROOM_TYPES = ('theory_room', 'common_hall', 'seminar_hall')
+
+# Periods starting at or after this time count as afternoon
+AFTERNOON_START = "13:00"
+
+
+def time_to_minutes(value: str) -> int:
+    """Convert an 'HH:MM' (or 'HH:MM:SS') string to minutes after midnight"""
+    hours, minutes = value.strip().split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def period_bits(period_times: Dict[int, tuple], start: int, end: int) -> int:
+    """Bitmask of the teaching periods overlapping [start, end) minutes"""
+    bits = 0
+    for period, (p_start, p_end, name) in period_times.items():
+        if is_break_period(name):
+            continue
+        if time_to_minutes(p_start) < end and start < time_to_minutes(p_end):
+            bits |= 1 << period
+    return bits
+
+
+def normalize_name(name: str) -> str:
+    """Key for matching faculty names typed in different styles ('Ms.H.Asra' vs 'Ms. H. Asra')"""
+    return ''.join(ch for ch in (name or '').lower() if ch.isalnum())
+
+
+def fitness_from_penalty(penalty):
+    """Map a penalty (0 = perfect) to the 0-100 fitness shown in the UI"""
+    return 100.0 * FITNESS_SCALE / (FITNESS_SCALE + penalty)
+
+
+class TimetableProblem:
+    """Dense, solver-ready view of one scheduling instance.
+
+    A timetable is an integer array of shape (batches, days, periods)
+    holding session ids, with FREE (-1) for empty cells. Per-session
+    arrays carry one extra sentinel entry at the end so that indexing
+    them with a whole timetable maps FREE cells to the sentinel.
+
+    Batches may come from several departments; faculty (matched by name)
+    and rooms are shared across all of them. Each batch is a dict with
+    'name', 'subject_configs', 'fixed_slots' and optionally 'department'
+    and 'strength'. Rooms are dicts with 'code', 'room_type' (a
+    models.RoomType value), 'capacity' and optionally 'department'.
+    With a constraint_index (see constraint_index) rooms it knows are
+    matched to batches through its room-fit and lab bitmasks.
+    """
+
+    def __init__(self, days: List[str], period_times: Dict[int, tuple],
+                 batches: List[Dict[str, Any]], max_periods_per_day: int = 6,
+                 max_classes_per_faculty: int = 5, constraints: Dict[str, bool] = None,
+                 faculty_unavailable: Dict[str, int] = None, rooms: List[Dict[str, Any]] = None,
+                 constraint_index=None):
+        self.days = list(days)
+        self.period_times = dict(period_times)
+        self.n_days = len(self.days)
+        self.n_periods = len(self.period_times)
+        self.n_slots = self.n_days * self.n_periods
+        self.n_batches = len(batches)
+        self.batch_names = [b.get('name', f"Batch {i + 1}") for i, b in enumerate(batches)]
+        self.shape = (self.n_batches, self.n_days, self.n_periods)
+        self.n_cells = self.n_batches * self.n_slots
+        self.max_periods_per_day = max_periods_per_day
+        self.max_classes_per_faculty = max_classes_per_faculty
+        self.constraints = {
+            'avoid_back_to_back': True,
+            'lab_after_theory': True,
+            'avoid_friday_labs': True,
+        }
+        self.constraints.update(constraints or {})
+
+        self.break_periods = [p for p in range(self.n_periods)
+                              if is_break_period(self.period_times[p][2])]
+        self._build_sessions(batches, rooms or [], constraint_index)
+        self._build_cells()
+        self._build_unavailability(faculty_unavailable or {})
+        self._pin_fixed_slots(batches)
+        self._build_movable()
+
+    # ----- construction -----
+    def _build_sessions(self, batches, rooms, index=None):
+        self.faculty_names: List[str] = []
+        faculty_index: Dict[str, int] = {}
+        self.group_keys: List[Tuple[int, str]] = []
+        sessions = []
+
+        for b, batch in enumerate(batches):
+            for config in batch.get('subject_configs', []):
+                faculty = config.get('faculty')
+                if not faculty:
+                    # Each unassigned subject gets its own placeholder, so they never clash with each other
+                    f = len(self.faculty_names)
+                    self.faculty_names.append(UNASSIGNED_FACULTY)
+                else:
+                    if faculty not in faculty_index:
+                        faculty_index[faculty] = len(self.faculty_names)
+                        self.faculty_names.append(faculty)
+                    f = faculty_index[faculty]
+                group = len(self.group_keys)
+                self.group_keys.append((b, config['code']))
+                avoid = config.get('avoid_day')
+                preferred = config.get('preferred_days') or self.days
+                for kind, count in (('theory', config.get('theory_classes', 0)),
+                                    ('lab', config.get('lab_classes', 0))):
+                    for _ in range(int(count)):
+                        sessions.append({
+                            'batch': b,
+                            'group': group,
+                            'subject': config['code'],
+                            'faculty': f,
+                            'kind': kind,
+                            'requested_room': config.get('lab_room' if kind == 'lab' else 'room'),
+                            'avoid_day': self.days.index(avoid) if avoid in self.days else -2,
+                            'preferred': [d in preferred for d in self.days],
+                        })
+
+        self.sessions = sessions
+        self.n_sessions = n = len(sessions)
+        self.n_faculty = len(self.faculty_names)
+        self.n_groups = len(self.group_keys)
+        self._assign_rooms(batches, rooms, index)
+
+        # Per-session arrays with a trailing sentinel for FREE cells
+        self.session_batch = np.array([s['batch'] for s in sessions] + [-1], dtype=np.int32)
+        self.session_group = np.array([s['group'] for s in sessions] + [self.n_groups], dtype=np.int32)
+        self.session_faculty = np.array([s['faculty'] for s in sessions] + [self.n_faculty], dtype=np.int32)
+        self.session_room = np.array([s['room'] for s in sessions] + [self.n_rooms], dtype=np.int32)
+        self.session_is_lab = np.array([s['kind'] == 'lab' for s in sessions] + [False])
+        self.session_is_theory = np.array([s['kind'] == 'theory' for s in sessions] + [False])
+        self.session_avoid_day = np.array([s['avoid_day'] for s in sessions] + [-2], dtype=np.int32)
+        self.session_preferred = np.array([s['preferred'] for s in sessions] + [[True] * self.n_days],
+                                          dtype=bool).reshape(n + 1, self.n_days)
+        # Sessions that only differ in which of their weekly classes they are share one display entry
+        self.session_table = SessionTable()
+        self.session_entry = np.array([self._session_entry(s) for s in sessions] + [FREE], dtype=np.int16)
+
+        # Theory sessions of a group have consecutive ids; labs look up their group's theory run
+        self.theory_sessions = np.flatnonzero(self.session_is_theory[:n])
+        theory_group = self.session_group[self.theory_sessions]
+        self.theory_run_start = np.flatnonzero(np.r_[True, theory_group[1:] != theory_group[:-1]]) \
+            if len(theory_group) else np.zeros(0, dtype=np.int64)
+        run_of_group = np.full(self.n_groups + 1, -1, dtype=np.int64)
+        run_of_group[theory_group[self.theory_run_start]] = np.arange(len(self.theory_run_start))
+        self.theory_run = run_of_group[theory_group]
+        labs = np.flatnonzero(self.session_is_lab[:n])
+        lab_run = run_of_group[self.session_group[labs]]
+        # Labs of subjects without any theory can't come before it
+        self.lab_sessions = labs[lab_run >= 0]
+        self.lab_run = lab_run[lab_run >= 0]
+
+        # Sessions are created batch by batch, so each batch owns a contiguous id range
+        self.batch_first_session = np.searchsorted(self.session_batch[:n], np.arange(self.n_batches))
+
+        # Weekly load can't be changed by placement, so it is a constant penalty
+        load = np.bincount(self.session_faculty[:n], minlength=self.n_faculty)
+        self.faculty_weekly_excess = int(np.clip(load - self.max_classes_per_faculty, 0, None).sum())
+
+    def _assign_rooms(self, batches, rooms, index=None):
+        """Give every (batch, subject, kind) one room, balancing weekly room load.
+
+        Labs need a lab room and theory a teaching room, with enough
+        capacity for the batch. A department's own rooms are preferred over
+        shared ones while they still have free periods. Sessions without a
+        suitable room get the sentinel room and are never in a room clash.
+        """
+        self.room_codes = [room['code'] for room in rooms if room.get('is_available', True)]
+        usable = [room for room in rooms if room.get('is_available', True)]
+        self.n_rooms = len(usable)
+        room_index = {code: i for i, code in enumerate(self.room_codes)}
+        weekly_periods = self.n_days * (self.n_periods - len(self.break_periods))
+        load = [0] * self.n_rooms
+
+        chosen, suitable = {}, {}
+        for s in self.sessions:
+            key = (s['group'], s['kind'])
+            if key not in chosen:
+                batch = batches[s['batch']]
+                if s['requested_room'] in room_index:
+                    chosen[key] = room_index[s['requested_room']]
+                else:
+                    if (s['batch'], s['kind']) not in suitable:
+                        suitable[s['batch'], s['kind']] = self._suitable_rooms(usable, s['kind'], batch, index)
+                    chosen[key] = self._pick_room(usable, load, suitable[s['batch'], s['kind']], batch,
+                                                  weekly_periods)
+                    if chosen[key] == self.n_rooms and usable:
+                        logger.warning("No %s room fits %s of %s", s['kind'], s['subject'],
+                                       batch.get('name', s['batch']))
+            s['room'] = chosen[key]
+            if s['room'] < self.n_rooms:
+                load[s['room']] += 1
+
+    @staticmethod
+    def _suitable_rooms(rooms, kind, batch, index=None) -> int:
+        """Bitmask over rooms of those big enough for the batch and of the right type for kind.
+
+        Rooms in the constraint index are answered by its bitmasks (by
+        batch_id, or by strength for batches not in the database); any
+        others are checked from their dicts.
+        """
+        strength = batch.get('strength') or 0
+        requires_lab = kind == 'lab'
+        fits = 0
+        if index is not None:
+            row = index.batch_index.get(batch.get('batch_id'))
+            fits = index.rooms_for(row, requires_lab) if row is not None \
+                else index.rooms_for_strength(strength, requires_lab)
+        bits = 0
+        for i, room in enumerate(rooms):
+            position = index.room_by_code.get(room['code']) if index is not None else None
+            if position is not None:
+                suitable = (fits >> position) & 1
+            else:
+                suitable = ((room.get('capacity') or 0) >= strength
+                            and ((room.get('room_type') == 'lab_room') if requires_lab
+                                 else room.get('room_type') in TEACHING_ROOM_TYPES))
+            if suitable:
+                bits |= 1 << i
+        return bits
+
+    def _pick_room(self, rooms, load, suitable, batch, weekly_periods):
+        own = batch.get('department')
+        candidates = [i for i, room in enumerate(rooms)
+                      if (suitable >> i) & 1 and (own is None or room.get('department') in (None, own))]
+        if not candidates:
+            return self.n_rooms
+        return min(candidates, key=lambda i: (load[i] >= weekly_periods,
+                                              rooms[i].get('department') != own or own is None,
+                                              load[i]))
+
+    def _session_entry(self, session):
+        room = self.room_codes[session['room']] if session['room'] < self.n_rooms else None
+        return self.session_table.intern(session['subject'], session['kind'],
+                                         self.faculty_names[session['faculty']], room)
+
+    def _build_cells(self):
+        cells = np.arange(self.n_cells)
+        self.cell_batch = cells // self.n_slots
+        self.cell_slot = cells % self.n_slots
+        self.cell_day = self.cell_slot // self.n_periods
+        self.cell_period = self.cell_slot % self.n_periods
+        self.cell_teaching = ~np.isin(self.cell_period, self.break_periods)
+
+        afternoon = np.array([time_to_minutes(self.period_times[p][0]) >= time_to_minutes(AFTERNOON_START)
+                              for p in range(self.n_periods)], dtype=bool)
+        friday = np.array([day == "Friday" for day in self.days], dtype=bool)
+        self.cell_friday_afternoon = friday[self.cell_day] & afternoon[self.cell_period]
+
+    def _build_unavailability(self, unavailable):
+        """Week-slot bitmask (bit day * periods + period) of the slots each faculty can't teach"""
+        by_key: Dict[str, int] = {}
+        for name, bits in unavailable.items():
+            by_key[normalize_name(name)] = by_key.get(normalize_name(name), 0) | bits
+        self.faculty_busy_bits = [by_key.get(normalize_name(name), 0) for name in self.faculty_names] + [0]
+        slots = np.arange(self.n_slots)
+        self.faculty_busy = np.array([[(bits >> slot) & 1 for slot in slots] for bits in self.faculty_busy_bits],
+                                     dtype=bool).reshape(self.n_faculty + 1, self.n_slots)
+
+    def cell_index(self, batch: int, day: int, period: int) -> int:
+        """Flat cell index of (batch, day, period)"""
+        return (batch * self.n_days + day) * self.n_periods + period
+
+    def _pin_fixed_slots(self, batches):
+        self.template = np.full(self.n_cells, FREE, dtype=np.int16)
+        self.pinned_cells: Dict[int, int] = {}
+        pinned_sessions = set()
+
+        for b, batch in enumerate(batches):
+            for slot in batch.get('fixed_slots', []):
+                day, period, subject = slot.get('day'), slot.get('period'), slot.get('subject')
+                if day not in self.days or period is None or not 0 <= period < self.n_periods:
+                    logger.warning("Ignoring fixed slot outside the time structure: %s", slot)
+                    continue
+                cell = self.cell_index(b, self.days.index(day), period)
+                if not self.cell_teaching[cell] or cell in self.pinned_cells:
+                    logger.warning("Ignoring fixed slot on a break or an already fixed cell: %s", slot)
+                    continue
+                candidates = [i for i, s in enumerate(self.sessions)
+                              if s['batch'] == b and s['subject'] == subject and i not in pinned_sessions]
+                if not candidates:
+                    logger.warning("No unscheduled session of %s left to fix: %s", subject, slot)
+                    continue
+                # Prefer pinning a theory session over a lab
+                candidates.sort(key=lambda i: self.sessions[i]['kind'] != 'theory')
+                self.pinned_cells[cell] = candidates[0]
+                pinned_sessions.add(candidates[0])
+                self.template[cell] = candidates[0]
+
+        self.pinned_sessions = np.array(sorted(pinned_sessions), dtype=np.int64)
+
+    def _build_movable(self):
+        """Lay out the free-to-move cells batch by batch with the sessions that fill them"""
+        pinned = np.zeros(self.n_cells, dtype=bool)
+        pinned[list(self.pinned_cells)] = True
+        movable_mask = self.cell_teaching & ~pinned
+
+        is_pinned = np.zeros(self.n_sessions, dtype=bool)
+        is_pinned[self.pinned_sessions] = True
+
+        cells, values, starts, lengths = [], [], [], []
+        for b in range(self.n_batches):
+            batch_cells = np.flatnonzero(movable_mask & (self.cell_batch == b))
+            batch_sessions = np.flatnonzero((self.session_batch[:-1] == b) & ~is_pinned)
+            if len(batch_sessions) > len(batch_cells):
+                raise ValueError(
+                    f"{self.batch_names[b]} needs {len(batch_sessions)} free teaching periods "
+                    f"but the time structure only has {len(batch_cells)}")
+            padding = np.full(len(batch_cells) - len(batch_sessions), FREE)
+            starts.append(sum(lengths))
+            lengths.append(len(batch_cells))
+            cells.append(batch_cells)
+            values.append(np.concatenate([batch_sessions, padding]))
+
+        self.movable_cells = np.concatenate(cells).astype(np.int64)
+        self.movable_values = np.concatenate(values).astype(np.int16)
+        self.movable_batch = self.cell_batch[self.movable_cells]
+        self.segment_start = np.array(starts, dtype=np.int64)
+        self.segment_length = np.array(lengths, dtype=np.int64)
+        self.n_movable = len(self.movable_cells)
+        self.movable_positions = np.arange(self.n_movable)
+
+    # ----- conversion -----
+    def random_population(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        """Random timetables that place every session exactly once"""
+        population = np.tile(self.template, (size, 1))
+        # Offsetting the random keys by batch keeps each permutation inside its batch
+        keys = rng.random((size, self.n_movable)) + self.movable_batch
+        order = np.argsort(keys, axis=1)
+        population[:, self.movable_cells] = self.movable_values[order]
+        return population.reshape((size,) + self.shape)
+
+    def to_grid(self, genome: np.ndarray, batch: int = 0) -> TimetableGrid:
+        """TimetableGrid of one batch of a timetable (sharing this problem's session table)"""
+        cells = self.session_entry[np.asarray(genome).reshape(self.shape)[batch]]
+        cells[:, self.break_periods] = BREAK
+        return TimetableGrid(self.days, [self.period_times[p][2] for p in range(self.n_periods)],
+                             cells, self.session_table)
+
+    def to_timetable(self, genome: np.ndarray, batch: int = 0) -> Dict[str, Dict[int, List[str]]]:
+        """Display form {day: {period: [label]}} of one batch of a timetable"""
+        return self.to_grid(genome, batch).to_display()
+
+
+class EvaluationContext:
+    """Arrays shared by the constraint terms while scoring one population"""
+
+    def __init__(self, problem: TimetableProblem, population: np.ndarray):
+        self.problem = problem
+        self.x = population.reshape(len(population), -1).astype(np.intp)
+        self.n = len(self.x)
+
+    @cached_property
+    def faculty(self) -> np.ndarray:
+        """Faculty of every cell (the sentinel faculty for FREE cells)"""
+        return self.problem.session_faculty[self.x]
+
+    @cached_property
+    def slots(self) -> np.ndarray:
+        """Week slot of every session (FREE cells land in the sentinel column)"""
+        slots = np.empty((self.n, self.problem.n_sessions + 1), dtype=np.intp)
+        slots[np.arange(self.n)[:, None], self.x] = self.problem.cell_slot
+        return slots
+
+    @cached_property
+    def faculty_load(self) -> np.ndarray:
+        """Classes per (individual, faculty, week slot), across all batches"""
+        return self._slot_counts(self.faculty, self.problem.n_faculty + 1)
+
+    @cached_property
+    def room_load(self) -> np.ndarray:
+        """Classes per (individual, room, week slot), across all batches"""
+        return self._slot_counts(self.problem.session_room[self.x], self.problem.n_rooms + 1)
+
+    def _slot_counts(self, resource, width):
+        p = self.problem
+        keys = np.arange(self.n)[:, None] * (width * p.n_slots) + resource * p.n_slots + p.cell_slot
+        return np.bincount(keys.ravel(), minlength=self.n * width * p.n_slots).reshape(self.n, width, p.n_slots)
+
+
+class FitnessEvaluator:
+    """Scores a whole population of timetables in one batched pass"""
+
+    def __init__(self, problem: TimetableProblem, weights: Dict[str, float] = None,
+                 profiler: Optional[SolverProfiler] = None):
+        self.problem = problem
+        self.profiler = profiler
+        self.weights = dict(PENALTY_WEIGHTS)
+        self.weights.update(weights or {})
+
+        # Only constraints that some timetable of this problem could violate are scored
+        self.terms = [('daily_overload', self._daily_overload),
+                      ('subject_repeat', self._subject_repeat)]
+        if (problem.session_avoid_day >= 0).any():
+            self.terms.append(('avoid_day', self._avoid_day))
+        if not problem.session_preferred.all():
+            self.terms.append(('preferred_day', self._preferred_day))
+        # A single batch can never double-book its own faculty or rooms
+        if problem.n_batches > 1:
+            self.terms.append(('faculty_clash', self._faculty_clash))
+            if problem.n_rooms:
+                self.terms.append(('room_clash', self._room_clash))
+        if problem.faculty_busy.any():
+            self.terms.append(('faculty_unavailable', self._faculty_unavailable))
+        if problem.constraints.get('avoid_back_to_back'):
+            self.terms.append(('back_to_back', self._back_to_back))
+        if problem.constraints.get('avoid_friday_labs') and problem.cell_friday_afternoon.any():
+            self.terms.append(('friday_afternoon_lab', self._friday_afternoon_lab))
+        if problem.constraints.get('lab_after_theory') and len(problem.lab_sessions):
+            self.terms.append(('lab_before_theory', self._lab_before_theory))
+
+        self.constant_penalty = self.weights['faculty_weekly_overload'] * problem.faculty_weekly_excess
+
+    def violations(self, population: np.ndarray) -> Dict[str, np.ndarray]:
+        """Violation counts per constraint, each of shape (individuals,)"""
+        ctx = EvaluationContext(self.problem, population)
+        profiler = self.profiler
+        if profiler is None or not profiler.enabled:
+            return {name: term(ctx) for name, term in self.terms}
+        # Arrays the terms share (faculty_load, slots) are charged to the first term that builds them
+        counts = {}
+        for name, term in self.terms:
+            started = time.perf_counter()
+            counts[name] = term(ctx)
+            profiler.record_constraint(name, ctx.n, time.perf_counter() - started, counts[name])
+        return counts
+
+    def evaluate(self, population: np.ndarray) -> np.ndarray:
+        """Weighted penalty of every individual (0 is a perfect timetable)"""
+        penalty = np.full(len(population), self.constant_penalty)
+        for name, counts in self.violations(population).items():
+            penalty += self.weights[name] * counts
+        return penalty
+
+    def breakdown(self, genome: np.ndarray) -> Dict[str, int]:
+        """Violation counts of a single timetable"""
+        counts = {name: int(v[0]) for name, v in self.violations(genome[None]).items()}
+        counts['faculty_weekly_overload'] = self.problem.faculty_weekly_excess
+        return counts
+
+    # ----- constraint terms -----
+    def _daily_overload(self, ctx):
+        p = self.problem
+        load = (ctx.x >= 0).reshape(ctx.n, p.n_batches, p.n_days, p.n_periods).sum(axis=3)
+        return np.clip(load - p.max_periods_per_day, 0, None).sum(axis=(1, 2))
+
+    def _avoid_day(self, ctx):
+        return (self.problem.session_avoid_day[ctx.x] == self.problem.cell_day).sum(axis=1)
+
+    def _preferred_day(self, ctx):
+        return (~self.problem.session_preferred[ctx.x, self.problem.cell_day]).sum(axis=1)
+
+    def _subject_repeat(self, ctx):
+        """Theory classes of one subject taught more than once on a day"""
+        p = self.problem
+        runs = len(p.theory_run_start)
+        days = ctx.slots[:, p.theory_sessions] // p.n_periods
+        keys = (np.arange(ctx.n)[:, None] * runs + p.theory_run) * p.n_days + days
+        counts = np.bincount(keys.ravel(), minlength=ctx.n * runs * p.n_days)
+        return np.clip(counts - 1, 0, None).reshape(ctx.n, -1).sum(axis=1)
+
+    def _faculty_clash(self, ctx):
+        return np.clip(ctx.faculty_load[:, :-1] - 1, 0, None).sum(axis=(1, 2))
+
+    def _room_clash(self, ctx):
+        return np.clip(ctx.room_load[:, :-1] - 1, 0, None).sum(axis=(1, 2))
+
+    def _faculty_unavailable(self, ctx):
+        return self.problem.faculty_busy[ctx.faculty, self.problem.cell_slot].sum(axis=1)
+
+    def _back_to_back(self, ctx):
+        """Faculty teaching in two adjacent periods of a day (breaks separate periods)"""
+        p = self.problem
+        if p.n_batches == 1:
+            # Within one batch this is just equal neighbours in the grid
+            grid = ctx.faculty.reshape(ctx.n, p.n_days, p.n_periods)
+            return ((grid[..., 1:] == grid[..., :-1]) & (grid[..., 1:] < p.n_faculty)).sum(axis=(1, 2))
+        busy = (ctx.faculty_load[:, :-1] > 0).reshape(ctx.n, p.n_faculty, p.n_days, p.n_periods)
+        return (busy[..., 1:] & busy[..., :-1]).sum(axis=(1, 2, 3))
+
+    def _friday_afternoon_lab(self, ctx):
+        return (self.problem.session_is_lab[ctx.x] & self.problem.cell_friday_afternoon).sum(axis=1)
+
+    def _lab_before_theory(self, ctx):
+        """Labs scheduled before the first theory class of their subject"""
+        p = self.problem
+        first = np.minimum.reduceat(ctx.slots[:, p.theory_sessions], p.theory_run_start, axis=1)
+        return (ctx.slots[:, p.lab_sessions] < first[:, p.lab_run]).sum(axis=1)
+
+
+class IncrementalEvaluator:
+    """Keeps one timetable's penalty up to date under swaps and moves.
+
+    Holds per-faculty/slot, per-room/slot, per-batch/day and per-subject/day
+    counters, so
+    a move only revisits the counters of the cells it touches instead of
+    re-scoring the whole timetable. The penalty always equals what
+    FitnessEvaluator.evaluate would return for the current timetable.
+    """
+
+    def __init__(self, evaluator: FitnessEvaluator, genome: np.ndarray):
+        p = self.problem = evaluator.problem
+        self.weights = evaluator.weights
+        self.constant_penalty = evaluator.constant_penalty
+        self.active = {name for name, _ in evaluator.terms}
+
+        # Plain lists index much faster than NumPy scalars in the per-move path
+        self._faculty = p.session_faculty.tolist()
+        self._room = p.session_room.tolist()
+        self._group = p.session_group.tolist()
+        self._is_lab = p.session_is_lab.tolist()
+        self._is_theory = p.session_is_theory.tolist()
+        self._avoid = p.session_avoid_day.tolist()
+        self._preferred = p.session_preferred.tolist()
+        self._cell_batch_day = (p.cell_batch * p.n_days + p.cell_day).tolist()
+        self._cell_day = p.cell_day.tolist()
+        self._cell_slot = p.cell_slot.tolist()
+        self._cell_period = p.cell_period.tolist()
+        self._friday_pm = p.cell_friday_afternoon.tolist()
+        self._busy_bits = p.faculty_busy_bits
+        self._has_theory = np.isin(np.arange(p.n_groups + 1), p.session_group[p.theory_sessions]).tolist()
+
+        groups = p.n_groups + 1
+        self.faculty_slot = [0] * ((p.n_faculty + 1) * p.n_slots)
+        self.room_slot = [0] * ((p.n_rooms + 1) * p.n_slots)
+        self.batch_day = [0] * (p.n_batches * p.n_days)
+        self.theory_day = [0] * (groups * p.n_days)
+        # Slots of each group's theory classes and labs, a handful each, so keeping
+        # the lab-before-theory count never walks the week
+        self.theory_slots = [[] for _ in range(groups)]
+        self.lab_slots = [[] for _ in range(groups)]
+        self.first_theory = [0] * groups
+        self.lab_early = [0] * groups
+        self.counts = {name: 0 for name in self.active}
+        self.counts.setdefault('daily_overload', 0)
+        self.counts.setdefault('subject_repeat', 0)
+
+        self.grid = [FREE] * p.n_cells
+        for cell, session in enumerate(np.asarray(genome).reshape(-1).tolist()):
+            if session >= 0:
+                self._place(cell, session)
+
+    @property
+    def penalty(self) -> float:
+        return self.constant_penalty + sum(self.weights[name] * count for name, count in self.counts.items())
+
+    @property
+    def genome(self) -> np.ndarray:
+        return np.array(self.grid, dtype=np.int16).reshape(self.problem.shape)
+
+    def violations(self) -> Dict[str, int]:
+        counts = dict(self.counts)
+        counts['faculty_weekly_overload'] = self.problem.faculty_weekly_excess
+        return counts
+
+    def swap(self, a: int, b: int) -> float:
+        """Exchange the contents of cells a and b (either may be FREE) and return the new penalty"""
+        self._swap(a, b)
+        return self.penalty
+
+    def delta_swap(self, a: int, b: int) -> float:
+        """Penalty change a swap of cells a and b would cause, leaving the timetable as it is"""
+        before = self.penalty
+        self._swap(a, b)
+        after = self.penalty
+        self._swap(a, b)
+        return after - before
+
+    def conflicted_cells(self) -> List[int]:
+        """Cells whose session breaks a hard constraint (clash, unavailability or avoided day)"""
+        return [cell for cell, session in enumerate(self.grid) if session >= 0 and self.cell_violations(cell)]
+
+    def cell_violations(self, cell: int) -> List[str]:
+        """Hard constraints the session in cell breaks (none for a FREE cell)"""
+        session = self.grid[cell]
+        if session < 0:
+            return []
+        p, active = self.problem, self.active
+        slot, faculty, room = self._cell_slot[cell], self._faculty[session], self._room[session]
+        checks = (('faculty_clash', self.faculty_slot[faculty * p.n_slots + slot] > 1),
+                  ('room_clash', room < p.n_rooms and self.room_slot[room * p.n_slots + slot] > 1),
+                  ('faculty_unavailable', (self._busy_bits[faculty] >> slot) & 1),
+                  ('avoid_day', self._avoid[session] == self._cell_day[cell]))
+        return [name for name, broken in checks if broken and name in active]
+
+    # ----- counter maintenance -----
+    def _swap(self, a, b):
+        first, second = self.grid[a], self.grid[b]
+        if a == b:
+            return
+        if first >= 0:
+            self._remove(a)
+        if second >= 0:
+            self._remove(b)
+        if second >= 0:
+            self._place(a, second)
+        if first >= 0:
+            self._place(b, first)
+
+    def _place(self, cell, session):
+        self.grid[cell] = session
+        self._update(cell, session, 1)
+
+    def _remove(self, cell):
+        session = self.grid[cell]
+        self._update(cell, session, -1)
+        self.grid[cell] = FREE
+
+    def _update(self, cell, session, sign):
+        """Add (sign=1) or withdraw (sign=-1) the contribution of session sitting in cell"""
+        p, counts, active = self.problem, self.counts, self.active
+        day, slot = self._cell_day[cell], self._cell_slot[cell]
+        faculty, group = self._faculty[session], self._group[session]
+
+        # An increment adds a violation once the counter is already at its limit,
+        # a decrement removes one only while the counter is above it
+        key = self._cell_batch_day[cell]
+        load = self.batch_day[key]
+        counts['daily_overload'] += sign * (load >= p.max_periods_per_day if sign > 0 else load > p.max_periods_per_day)
+        self.batch_day[key] = load + sign
+
+        key = faculty * p.n_slots + slot
+        booked = self.faculty_slot[key]
+        if 'faculty_clash' in active:
+            counts['faculty_clash'] += sign * (booked >= 1 if sign > 0 else booked > 1)
+        # Back-to-back pairs change only when the faculty starts or stops teaching in this slot
+        if 'back_to_back' in active and booked == (0 if sign > 0 else 1):
+            period = self._cell_period[cell]
+            if period > 0:
+                counts['back_to_back'] += sign * (self.faculty_slot[key - 1] > 0)
+            if period < p.n_periods - 1:
+                counts['back_to_back'] += sign * (self.faculty_slot[key + 1] > 0)
+        self.faculty_slot[key] = booked + sign
+
+        # Sessions without a room share the sentinel room and never clash over it
+        if 'room_clash' in active and self._room[session] < p.n_rooms:
+            key = self._room[session] * p.n_slots + slot
+            booked = self.room_slot[key]
+            counts['room_clash'] += sign * (booked >= 1 if sign > 0 else booked > 1)
+            self.room_slot[key] = booked + sign
+
+        if 'faculty_unavailable' in active and (self._busy_bits[faculty] >> slot) & 1:
+            counts['faculty_unavailable'] += sign
+        if 'avoid_day' in active and self._avoid[session] == day:
+            counts['avoid_day'] += sign
+        if 'preferred_day' in active and not self._preferred[session][day]:
+            counts['preferred_day'] += sign
+        if 'friday_afternoon_lab' in active and self._is_lab[session] and self._friday_pm[cell]:
+            counts['friday_afternoon_lab'] += sign
+
+        if self._is_theory[session]:
+            key = group * p.n_days + day
+            taught = self.theory_day[key]
+            counts['subject_repeat'] += sign * (taught >= 1 if sign > 0 else taught > 1)
+            self.theory_day[key] = taught + sign
+            self._track(self.theory_slots[group], slot, sign)
+            if 'lab_before_theory' in active and self._has_theory[group]:
+                self._recount_lab_before_theory(group)
+        elif self._is_lab[session]:
+            self._track(self.lab_slots[group], slot, sign)
+            if 'lab_before_theory' in active and self._has_theory[group] and slot < self.first_theory[group]:
+                counts['lab_before_theory'] += sign
+                self.lab_early[group] += sign
+
+    @staticmethod
+    def _track(slots, slot, sign):
+        if sign > 0:
+            slots.append(slot)
+        else:
+            slots.remove(slot)
+
+    def _recount_lab_before_theory(self, group):
+        """Labs before the group's first theory class, after that class may have moved"""
+        # While every theory class of a group is lifted out mid-move, no lab counts as early
+        first = min(self.theory_slots[group], default=0)
+        if first == self.first_theory[group]:
+            return
+        self.first_theory[group] = first
+        early = sum(slot < first for slot in self.lab_slots[group])
+        self.counts['lab_before_theory'] += early - self.lab_early[group]
+        self.lab_early[group] = early
+
+
+class GeneticEngine:
+    """Generational GA over a NumPy population of timetables"""
+
+    def __init__(self, problem: TimetableProblem, evaluator: FitnessEvaluator, pop_size: int,
+                 rng: np.random.Generator, crossover_rate: float = 0.7,
+                 mutation_rate: float = 0.1, tournament_size: int = 3, elite: int = 1,
+                 population: Optional[np.ndarray] = None):
+        self.problem = problem
+        self.evaluator = evaluator
+        self.rng = rng
+        if population is not None:
+            pop_size = len(population)
+        self.pop_size = max(2, pop_size + pop_size % 2)
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = mutation_rate
+        self.tournament_size = tournament_size
+        self.elite = min(elite, self.pop_size)
+        self.generation = 0
+
+        if population is None or len(population) != self.pop_size:
+            fresh = problem.random_population(self.pop_size, rng)
+            if population is not None:
+                fresh[:len(population)] = population
+            population = fresh
+        self.population = population
+        self.penalties = evaluator.evaluate(self.population)
+
+    @property
+    def best_index(self) -> int:
+        return int(np.argmin(self.penalties))
+
+    @property
+    def best_penalty(self) -> float:
+        return float(self.penalties.min())
+
+    @property
+    def best_genome(self) -> np.ndarray:
+        return self.population[self.best_index].copy()
+
+    def step(self):
+        """Advance the population by one generation"""
+        profiler = self.evaluator.profiler
+        if profiler is not None and profiler.enabled:
+            return self._profiled_step(profiler)
+        n = self.pop_size
+        elite = self.population[np.argsort(self.penalties)[:self.elite]]
+
+        parents = self.population[self._select(n)]
+        children = self._crossover(parents)
+        self._mutate(children)
+        children[:self.elite] = elite
+
+        self.population = children
+        self.penalties = self.evaluator.evaluate(children)
+        self.generation += 1
+
+    def _profiled_step(self, profiler: SolverProfiler):
+        """step() with every operator timed"""
+        clock = time.perf_counter
+        started = clock()
+        elite = self.population[np.argsort(self.penalties)[:self.elite]]
+        parents = self.population[self._select(self.pop_size)]
+        selected = clock()
+        children = self._crossover(parents)
+        crossed = clock()
+        self._mutate(children)
+        children[:self.elite] = elite
+        mutated = clock()
+
+        self.population = children
+        self.penalties = self.evaluator.evaluate(children)
+        self.generation += 1
+        profiler.record_generation({'selection': selected - started, 'crossover': crossed - selected,
+                                    'mutation': mutated - crossed, 'evaluation': clock() - mutated})
+
+    def run(self, generations: int, callback: Optional[Callable[['GeneticEngine'], bool]] = None):
+        """Evolve for up to `generations` (None for no limit), stopping early once callback(engine) returns True"""
+        for _ in (range(generations) if generations is not None else itertools.count()):
+            self.step()
+            if callback is not None and callback(self):
+                break
+
+    def emigrants(self, count: int) -> np.ndarray:
+        """Copies of the best individuals"""
+        return self.population[np.argsort(self.penalties)[:count]].copy()
+
+    def immigrate(self, genomes: np.ndarray):
+        """Replace the worst individuals with incoming ones"""
+        if not len(genomes):
+            return
+        worst = np.argsort(self.penalties)[::-1][:len(genomes)]
+        self.population[worst] = genomes[:len(worst)]
+        self.penalties[worst] = self.evaluator.evaluate(self.population[worst])
+
+    # ----- operators -----
+    def _select(self, count):
+        """Tournament selection"""
+        entrants = self.rng.integers(self.pop_size, size=(count, self.tournament_size))
+        winners = np.argmin(self.penalties[entrants], axis=1)
+        return entrants[np.arange(count), winners]
+
+    def _crossover(self, parents):
+        """Exchange whole days between parent pairs, then repair duplicates"""
+        p = self.problem
+        half = len(parents) // 2
+        first, second = parents[:half], parents[half:2 * half]
+        take = self.rng.random((half, p.n_batches, p.n_days, 1)) < 0.5
+        crossed = self.rng.random(half) < self.crossover_rate
+        take &= crossed[:, None, None, None]
+        children = np.concatenate([np.where(take, second, first), np.where(take, first, second)])
+        # Only crossed pairs can hold duplicated sessions
+        rows = np.flatnonzero(np.concatenate([crossed, crossed]))
+        if len(rows):
+            flat = children.reshape(len(children), -1)
+            repaired = flat[rows]
+            self._repair(repaired)
+            flat[rows] = repaired
+        return children
+
+    def _repair(self, x):
+        """Drop duplicated sessions and put missing ones into random free cells of their batch"""
+        p = self.problem
+        n = len(x)
+        rows = np.arange(n)[:, None]
+        movable = x[:, p.movable_cells]
+
+        # Of several copies of a session only the one that wins this write is kept
+        where = np.full((n, p.n_sessions + 1), -1, dtype=np.int64)
+        where[rows, movable] = p.movable_positions
+        movable[where[rows, movable] != p.movable_positions] = FREE
+
+        missing = where[:, :-1] < 0
+        missing[:, p.pinned_sessions] = False
+        miss_rows, miss_ids = np.nonzero(missing)
+        if len(miss_ids):
+            # Free cells first, in random order, within each batch segment
+            keys = np.where(movable < 0, self.rng.random(movable.shape), 1.0) + 2 * p.movable_batch
+            free_order = np.argsort(keys, axis=1)
+            # Rank of each missing session among the missing sessions of its batch
+            before = np.zeros((n, p.n_sessions + 1), dtype=np.int64)
+            np.cumsum(missing, axis=1, out=before[:, 1:])
+            batch = p.session_batch[miss_ids]
+            rank = before[miss_rows, miss_ids] - before[miss_rows, p.batch_first_session[batch]]
+            target = free_order[miss_rows, p.segment_start[batch] + rank]
+            movable[miss_rows, target] = miss_ids
+
+        x[:, p.movable_cells] = movable
+
+    def _mutate(self, children):
+        """Swap two movable cells of the same batch in a random subset of children"""
+        p = self.problem
+        x = children.reshape(len(children), -1)
+        rows = np.flatnonzero(self.rng.random(len(x)) < self.mutation_rate)
+        if not len(rows):
+            return
+        first = self.rng.integers(p.n_movable, size=len(rows))
+        batch = p.movable_batch[first]
+        second = p.segment_start[batch] + (self.rng.random(len(rows)) * p.segment_length[batch]).astype(np.int64)
+        a, b = p.movable_cells[first], p.movable_cells[second]
+        x[rows, a], x[rows, b] = x[rows, b], x[rows, a]
+
+
+def genome_from_timetables(problem: TimetableProblem, timetables: Dict[str, TimetableGrid]) -> np.ndarray:
+    """Session-id timetable matching grids keyed by batch name.
+
+    Pinned cells keep the problem's fixed sessions. Every other occupied
+    cell takes an unplaced session of the same subject and kind. Sessions
+    the grids do not account for go to the first free cells of their batch.
+    """
+    genome = problem.template.copy()
+    placed = np.zeros(problem.n_sessions, dtype=bool)
+    placed[problem.pinned_sessions] = True
+    pool: Dict[Tuple[int, str, str], List[int]] = {}
+    for i in reversed(range(problem.n_sessions)):
+        if not placed[i]:
+            s = problem.sessions[i]
+            pool.setdefault((s['batch'], s['subject'], s['kind']), []).append(i)
+
+    for b, name in enumerate(problem.batch_names):
+        grid = timetables.get(name)
+        if grid is None:
+            logger.warning("No approved timetable for %s, placing its sessions afresh", name)
+            continue
+        table = grid.sessions
+        for d, day in enumerate(problem.days):
+            row = grid.days.index(day) if day in grid.days else None
+            for period in range(problem.n_periods):
+                cell = problem.cell_index(b, d, period)
+                if row is None or not problem.cell_teaching[cell] or cell in problem.pinned_cells:
+                    continue
+                entry = grid.entry(row, period)
+                if entry < 0:
+                    continue
+                candidates = pool.get((b, table.subjects[entry], table.kinds[entry]))
+                if candidates:
+                    session = candidates.pop()
+                    genome[cell] = session
+                    placed[session] = True
+                else:
+                    logger.warning("Approved entry '%s' of %s on %s P%d matches no session",
+                                   table.label(entry), name, day, period + 1)
+
+    for b in range(problem.n_batches):
+        start, length = problem.segment_start[b], problem.segment_length[b]
+        free = [c for c in problem.movable_cells[start:start + length] if genome[c] == FREE]
+        missing = [i for i in range(problem.n_sessions)
+                   if problem.sessions[i]['batch'] == b and not placed[i]]
+        for cell, session in zip(free, missing):
+            genome[cell] = session
+    return genome.reshape(problem.shape)
+
+
 class FlexibleTimetableScheduler:
     def __init__(self, parameters: Dict[str, Any] = None):
         self.params = parameters or {}
         self.setup_parameters()
-    
+
     def setup_parameters(self):
         """Setup parameters with flexible time structure"""
         self.days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-        
+
         # Default time structure (can be customized)
         self.period_times = {
             0: ("09:00", "09:50", "1st Period"),
-            1: ("09:50", "10:40", "2nd Period"), 
+            1: ("09:50", "10:40", "2nd Period"),
             2: ("10:40", "10:55", "Morning Break"),
             3: ("10:55", "11:45", "3rd Period"),
             4: ("11:45", "12:35", "4th Period"),
@@ -33,112 +969,356 @@ class FlexibleTimetableScheduler:
             9: ("15:20", "16:10", "7th Period"),
             10: ("16:10", "17:00", "8th Period")
         }
-        
+
         # Fixed break periods (cannot have classes)
         self.break_periods = [2, 5, 8]  # Morning break, Lunch, Evening break
-        
-        # Sample timetable with 11 periods (including breaks)
-        self.sample_timetable = {
-            "Monday": {
-                0: ["EMF (Ms.H.Asra)"],
-                1: ["Signals (Ms.Rubitha)"],
-                2: ["Morning Break"],
-                3: ["EDC (Ms.Shantha)"],
-                4: ["PRP (Ms.Christina)"],
-                5: ["Lunch Break"],
-                6: ["DSD (Ms.Shiva)"],
-                7: ["EMF Tutorial"],
-                8: ["Evening Break"],
-                9: ["Signals Lab"],
-                10: ["Project Work"]
-            },
-            "Tuesday": {
-                0: ["Signals (Ms.Rubitha)"],
-                1: ["DSD (Ms.Shiva)"],
-                2: ["Morning Break"],
-                3: ["PRP (Ms.Christina)"],
-                4: ["EMF (Ms.H.Asra)"],
-                5: ["Lunch Break"],
-                6: ["EDC (Ms.Shantha)"],
-                7: ["Aptitude (Ms.Asra)"],
-                8: ["Evening Break"],
-                9: ["EDC Lab"],
-                10: ["Library"]
-            },
-            "Wednesday": {
-                0: ["DSD (Ms.Shiva)"],
-                1: ["Aptitude (Ms.Asra)"],
-                2: ["Morning Break"],
-                3: ["EDC (Ms.Shantha)"],
-                4: ["EMF (Ms.H.Asra)"],
-                5: ["Lunch Break"],
-                6: ["Signals (Ms.Rubitha)"],
-                7: ["PRP Tutorial"],
-                8: ["Evening Break"],
-                9: ["DSD Lab"],
-                10: ["Counseling"]
-            },
-            "Thursday": {
-                0: ["EDC (Ms.Shantha)"],
-                1: ["Comm. Training"],
-                2: ["Morning Break"],
-                3: ["Signals (Ms.Rubitha)"],
-                4: ["PRP (Ms.Christina)"],
-                5: ["Lunch Break"],
-                6: ["DSD (Ms.Shiva)"],
-                7: ["EMF (Ms.H.Asra)"],
-                8: ["Evening Break"],
-                9: ["Project Lab"],
-                10: ["Faculty Meeting"]
-            },
-            "Friday": {
-                0: ["EMF (Ms.H.Asra)"],
-                1: ["PRP (Ms.Christina)"],
-                2: ["Morning Break"],
-                3: ["DSD (Ms.Shiva)"],
-                4: ["Signals (Ms.Rubitha)"],
-                5: ["Lunch Break"],
-                6: ["EDC (Ms.Shantha)"],
-                7: ["Aptitude Session"],
-                8: ["Evening Break"],
-                9: ["Signals Lab"],
-                10: ["Weekly Review"]
-            }
-        }
-        
+
+        # Default ECE subjects with their weekly theory/lab load
         self.subjects = [
-            {'code': 'U24EC311', 'name': 'Electromagnetic Fields', 'faculty': 'Ms.H.Asra Jabeen'},
-            {'code': 'U24EC323', 'name': 'Signals and Systems', 'faculty': 'Ms.K.Rubitha'},
-            {'code': 'U24EC333', 'name': 'Electronics Devices and Circuits', 'faculty': 'Ms.B.ShanthaSheela'},
-            {'code': 'U24EC343', 'name': 'Digital System Design', 'faculty': 'Mrs.M.Shiva Shankari'},
-            {'code': 'U24MA331', 'name': 'Probability and Random Process', 'faculty': 'Ms.Christina Merline'},
-            {'code': 'APTITUDE', 'name': 'Aptitude & Communication', 'faculty': 'Ms.H.Asra Jabeen'},
-            {'code': 'LIBRARY', 'name': 'Library/Counseling', 'faculty': 'Mentors'}
+            {'code': 'U24EC311', 'name': 'Electromagnetic Fields', 'faculty': 'Ms.H.Asra Jabeen', 'theory': 4, 'lab': 2},
+            {'code': 'U24EC323', 'name': 'Signals and Systems', 'faculty': 'Ms.K.Rubitha', 'theory': 4, 'lab': 2},
+            {'code': 'U24EC333', 'name': 'Electronics Devices and Circuits', 'faculty': 'Ms.B.ShanthaSheela', 'theory': 4, 'lab': 2},
+            {'code': 'U24EC343', 'name': 'Digital System Design', 'faculty': 'Mrs.M.Shiva Shankari', 'theory': 4, 'lab': 2},
+            {'code': 'U24MA331', 'name': 'Probability and Random Process', 'faculty': 'Ms.Christina Merline', 'theory': 5, 'lab': 0},
+            {'code': 'APTITUDE', 'name': 'Aptitude & Communication', 'faculty': 'Ms.H.Asra Jabeen', 'theory': 1, 'lab': 0},
+            {'code': 'LIBRARY', 'name': 'Library/Counseling', 'faculty': 'Mentors', 'theory': 1, 'lab': 0}
         ]
-    
+
+        self.problem: Optional[TimetableProblem] = None
+        self.best_genome: Optional[np.ndarray] = None
+        self.last_run: Dict[str, Any] = {}
+        # Switch on with the 'profile' parameter or by setting profiler.enabled, even mid-run
+        self.profiler = SolverProfiler(enabled=bool(self.params.get('profile')))
+
     def update_time_structure(self, new_times):
         """Update the time structure with custom times"""
         self.period_times = new_times
-    
-    def generate_timetable(self, pop_size=10, ngen=5):
-        """Generate timetable with flexible time structure"""
-        time.sleep(1)  # Short delay
-        
-        fitness = 998.5  # High fitness score
-        
-        # Ensure breaks are always in the right periods
-        timetable_with_breaks = {}
-        for day in self.days:
-            timetable_with_breaks[day] = {}
-            for period in range(len(self.period_times)):
-                if period in self.break_periods:
-                    # Force breaks in the specified periods
-                    timetable_with_breaks[day][period] = [self.period_times[period][2]]
-                else:
-                    # Copy the sample timetable content for other periods
-                    timetable_with_breaks[day][period] = self.sample_timetable[day].get(period, ["FREE"])
-        
-        return timetable_with_breaks, fitness
+        self.break_periods = [p for p, (_, _, name) in new_times.items() if is_break_period(name)]
+
+    def default_subject_configs(self):
+        """Subject configs for the built-in ECE section"""
+        return [{'code': s['code'], 'theory_classes': s['theory'], 'lab_classes': s['lab'],
+                 'preferred_days': [], 'avoid_day': None, 'faculty': s['faculty']}
+                for s in self.subjects]
+
+    def batches(self) -> List[Dict[str, Any]]:
+        """Batch dicts to schedule: 'batches' if given, otherwise the single configured section"""
+        return self.params.get('batches') or [{
+            'name': self.params.get('batch_name', 'ECE'),
+            'subject_configs': self.params.get('subject_configs') or self.default_subject_configs(),
+            'fixed_slots': self.params.get('fixed_slots', []),
+        }]
+
+    def build_problem(self, batches: List[Dict[str, Any]] = None,
+                      unavailable: Dict[str, int] = None) -> TimetableProblem:
+        """Compile the scheduler parameters into a TimetableProblem.
+
+        A 'batches' list (see TimetableProblem) schedules every listed batch
+        together with shared faculty and 'rooms'; otherwise the single
+        section described by 'subject_configs'/'fixed_slots' is scheduled.
+        If the parameters carry a 'constraint_index' (see constraint_index)
+        faculty unavailability is taken from it and subject assignments are
+        checked against its eligibility matrix, and rooms are matched to
+        batches through its room-fit bitmasks. Week-slot bitmasks by
+        faculty name in 'faculty_unavailable' (see problem_loader) and in
+        unavailable are blocked as well. batches overrides the parameters.
+        """
+        batches = batches or self.batches()
+        constraints = {key: self.params[key] for key in
+                       ('avoid_back_to_back', 'lab_after_theory', 'avoid_friday_labs') if key in self.params}
+
+        blocked = {}
+        index = self.params.get('constraint_index')
+        if index is not None:
+            for config in (c for batch in batches for c in batch['subject_configs']):
+                if not index.can_teach_by_name(config.get('faculty'), config['code']):
+                    logger.warning("%s is not registered to teach %s", config.get('faculty'), config['code'])
+            if self.params.get('respect_faculty_availability', True):
+                blocked = index.unavailable_slots_by_name(self.days, self.period_times)
+        for extra in (self.params.get('faculty_unavailable'), unavailable):
+            for name, bits in (extra or {}).items():
+                blocked[name] = blocked.get(name, 0) | bits
+
+        return TimetableProblem(
+            self.days, self.period_times, batches,
+            max_periods_per_day=self.params.get('max_periods_per_day', 6),
+            max_classes_per_faculty=self.params.get('max_classes_per_faculty', 5),
+            constraints=constraints,
+            faculty_unavailable=blocked,
+            rooms=self.params.get('rooms'),
+            constraint_index=index,
+        )
+
+    def solver_inputs(self, problem: TimetableProblem, solver: Dict[str, Any]) -> Dict[str, Any]:
+        """Everything that determines a solver result, as plain data (the solver cache key)"""
+        return {
+            'days': self.days,
+            'period_times': self.period_times,
+            'batches': self.batches(),
+            'rooms': self.params.get('rooms'),
+            # Which room each session got (the constraint index can change it)
+            'session_rooms': problem.session_room.tolist(),
+            'constraints': problem.constraints,
+            'max_periods_per_day': problem.max_periods_per_day,
+            'max_classes_per_faculty': problem.max_classes_per_faculty,
+            'unavailable': dict(zip(problem.faculty_names, problem.faculty_busy_bits)),
+            'solver': solver,
+        }
+
+    def generate_timetable(self, pop_size=10, ngen=5, seed=None, islands=None, algorithm=None,
+                           progress: Optional[Callable[[Dict[str, Any]], None]] = None, cancel=None,
+                           time_budget: Optional[float] = None, stagnation: Optional[int] = None,
+                           problem: Optional[TimetableProblem] = None):
+        """Generate timetable with flexible time structure.
+
+        Returns the TimetableGrid of the first batch and its fitness (see
+        timetables() for the others).
+
+        algorithm selects the backend: 'ga' (default) or 'sa' for simulated
+        annealing (see local_search), which gets the same evaluation budget
+        of pop_size * ngen moves. With islands > 1 the GA population budget
+        is split across that many worker processes (see island_model).
+
+        With a SolverCache in the 'cache' parameter (see solver_cache), a
+        seeded run whose full input was solved before returns the stored
+        result instead of solving again.
+
+        progress, if given, receives {'generation', 'total', 'best_fitness',
+        'elapsed', 'eta'} after every generation (every few thousand moves
+        for annealing, every epoch for islands). Setting the cancel event
+        (a threading.Event) stops the run early with the best timetable
+        found so far.
+
+        The run is anytime: it stops after time_budget seconds, or once the
+        best penalty has not improved for `stagnation` generations (for
+        annealing, pop_size moves count as one generation), and returns
+        the best timetable found. ngen=None removes the generation limit
+        when one of these is set. last_run['stop_reason'] is a key of
+        STOP_REASONS; last_run['first_feasible'] is the time (and
+        'first_feasible_generation' the generation) at which the best
+        timetable first broke no hard constraint, if it did (not tracked
+        for islands).
+
+        problem, a compiled problem such as a loaded snapshot, is solved
+        instead of building one from the parameters (and is never cached).
+        """
+        start = time.perf_counter()
+        if seed is None:
+            seed = self.params.get('seed')
+        if islands is None:
+            islands = self.params.get('islands', 1)
+        algorithm = algorithm or self.params.get('algorithm', 'ga')
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {', '.join(ALGORITHMS)}")
+        if time_budget is None:
+            time_budget = self.params.get('time_budget')
+        if stagnation is None:
+            stagnation = self.params.get('stagnation')
+        if ngen is None and not (time_budget or stagnation):
+            raise ValueError("An unlimited run (ngen=None) needs a time_budget or a stagnation limit")
+        if ngen is not None and ngen < 1:
+            raise ValueError(f"ngen must be at least 1 (or None for an unlimited run), got {ngen}")
+
+        self.problem = problem if problem is not None else self.build_problem()
+        evaluator = FitnessEvaluator(self.problem, profiler=self.profiler)
+        settings = {
+            'crossover_rate': self.params.get('crossover_rate', 0.7),
+            'mutation_rate': self.params.get('mutation_rate', 0.1),
+        }
+
+        # Unseeded runs are meant to differ, so only seeded ones are cached
+        cache = self.params.get('cache') if seed is not None and problem is None else None
+        if cache is not None:
+            from solver_cache import content_key
+            key = content_key(self.solver_inputs(self.problem, {
+                'pop_size': pop_size, 'ngen': ngen, 'seed': seed, 'islands': islands, 'algorithm': algorithm,
+                'time_budget': time_budget, 'stagnation': stagnation,
+                'migration_interval': self.params.get('migration_interval', 20),
+                'migrants': self.params.get('migrants', 2), **settings}))
+            cached = cache.get(key)
+            if cached is not None:
+                self.best_genome = cached[0].reshape(self.problem.shape)
+                self.last_run = dict(cached[1], cached=True, elapsed=time.perf_counter() - start)
+                logger.info("Reusing cached %s result %s", ALGORITHMS[algorithm], key[:12])
+                return self.problem.to_grid(self.best_genome), fitness_from_penalty(self.last_run['penalty'])
+
+        # Progress is counted in moves for annealing and in generations otherwise
+        unit = pop_size if algorithm == 'sa' else 1
+        total = ngen * unit if ngen is not None else None
+        best = {'penalty': float('inf'), 'at': 0, 'feasible': None}
+        stop = {}
+
+        def report(done, penalty, genome=None):
+            """Publish progress and decide whether the solver stops; genome() gives the best timetable"""
+            elapsed = time.perf_counter() - start
+            if penalty < best['penalty']:
+                best['penalty'], best['at'] = penalty, done
+                # Feasibility only changes with the best timetable, so only improvements are checked
+                if genome is not None and best['feasible'] is None:
+                    counts = evaluator.breakdown(genome())
+                    if not any(counts.get(name, 0) for name in HARD_CONSTRAINTS):
+                        best['feasible'] = (elapsed, done / unit)
+            if progress is not None:
+                fraction = max(done / total if total else 0.0, elapsed / time_budget if time_budget else 0.0)
+                progress({'generation': done, 'total': total, 'best_fitness': fitness_from_penalty(penalty),
+                          'elapsed': elapsed, 'fraction': min(1.0, fraction),
+                          'eta': elapsed * (1 - fraction) / fraction if fraction else None})
+            if cancel is not None and cancel.is_set():
+                stop['reason'] = 'cancelled'
+            elif penalty <= evaluator.constant_penalty:
+                stop['reason'] = 'optimal'
+            elif time_budget and elapsed >= time_budget:
+                stop['reason'] = 'time_budget'
+            elif stagnation and done - best['at'] >= stagnation * unit:
+                stop['reason'] = 'stagnation'
+            return bool(stop)
+
+        if algorithm == 'sa':
+            from local_search import SimulatedAnnealing
+            annealer = SimulatedAnnealing(self.problem, evaluator, np.random.default_rng(seed))
+            # The cooling schedule needs a length; without ngen it is what fits in the budget
+            if total:
+                moves = total
+            elif time_budget:
+                moves = max(1, int(time_budget / annealer.move_seconds))
+            else:
+                moves = stagnation * unit * 100
+            annealer.run(moves, callback=lambda a: report(a.iterations, a.best_penalty, lambda: a.best_genome))
+            best_genome, best_penalty = annealer.best_genome, annealer.best_penalty
+            generations, evaluations = annealer.iterations, annealer.iterations
+        elif islands > 1:
+            from island_model import run_islands
+            best_genome, best_penalty, generations = run_islands(
+                self.problem, pop_size, ngen, seed, islands,
+                migration_interval=self.params.get('migration_interval', 20),
+                migrants=self.params.get('migrants', 2), callback=report, profiler=self.profiler, **settings)
+            evaluations = pop_size * (generations // islands + 1)
+        else:
+            engine = GeneticEngine(self.problem, evaluator, pop_size, np.random.default_rng(seed), **settings)
+            engine.run(ngen, callback=lambda e: report(e.generation, e.best_penalty, lambda: e.best_genome))
+            best_genome, best_penalty, generations = engine.best_genome, engine.best_penalty, engine.generation
+            evaluations = engine.pop_size * (engine.generation + 1)
+
+        if 'reason' not in stop:
+            stop['reason'] = 'optimal' if best_penalty <= evaluator.constant_penalty else 'generations'
+
+        self.best_genome = best_genome
+        fitness = fitness_from_penalty(best_penalty)
+        elapsed = time.perf_counter() - start
+        self.last_run = {
+            'algorithm': algorithm,
+            'generations': generations,
+            'evaluations': evaluations,
+            'islands': max(1, islands) if algorithm == 'ga' else 1,
+            'elapsed': elapsed,
+            'penalty': best_penalty,
+            'violations': evaluator.breakdown(self.best_genome),
+            'cancelled': stop['reason'] == 'cancelled',
+            'stop_reason': stop['reason'],
+            'first_feasible': best['feasible'][0] if best['feasible'] else None,
+            'first_feasible_generation': best['feasible'][1] if best['feasible'] else None,
+        }
+        logger.info("%s finished %d iterations in %.3fs (fitness %.1f, %s)",
+                    ALGORITHMS[algorithm], generations, elapsed, fitness, STOP_REASONS[stop['reason']].lower())
+        # A cancelled run is not the answer to its inputs
+        if cache is not None and not self.last_run['cancelled']:
+            cache.put(key, self.best_genome, self.last_run)
+            self.last_run['cached'] = False
+        # Kept out of the cached metadata: the counters span every run of this scheduler
+        if self.profiler.enabled:
+            self.last_run['profile'] = self.profiler.to_dict()
+
+        return self.problem.to_grid(self.best_genome), fitness
+
+    def timetables(self) -> Dict[str, TimetableGrid]:
+        """Every batch of the last generated timetable, keyed by batch name"""
+        return {name: self.problem.to_grid(self.best_genome, b)
+                for b, name in enumerate(self.problem.batch_names)}
+
+    def repair_timetable(self, approved, on_leave: Dict[str, Optional[List[str]]],
+                         alternates: List[Dict[str, Any]] = None, frozen: List[Dict[str, Any]] = None,
+                         max_moves: int = 200):
+        """Repair an approved timetable for faculty leave with as few changed slots as possible.
+
+        approved is the approved timetable as a TimetableGrid or in display
+        form (one batch, or {batch name: timetable} as returned by
+        timetables()), e.g. Timetable.generated_data. on_leave maps faculty names to the days
+        they are away (None for the whole week). alternates are
+        FacultyAlternate-style dicts (see repair.load_alternates) and frozen
+        lists slots that must not move ({'day', 'period', 'subject'} plus a
+        'batch' name or 'batch_id' when there are several batches), e.g. the
+        TimetableEntry.is_fixed rows (see repair.load_frozen_slots); a slot
+        of an unknown batch raises ValueError. Returns the repaired timetable of the
+        first batch and its fitness; last_run lists the changed cells and
+        the substitutions made.
+        """
+        from repair import (DISRUPTION_WEIGHT, RepairSearch, changed_cells, choose_substitutes, leave_bits,
+                            with_substitutes)
+        start = time.perf_counter()
+
+        batches = [dict(batch, fixed_slots=list(batch.get('fixed_slots', []))) for batch in self.batches()]
+        names = [batch.get('name', f"Batch {i + 1}") for i, batch in enumerate(batches)]
+        batch_ids = [batch.get('batch_id') for batch in batches]
+        for slot in frozen or []:
+            if slot.get('batch') in names:
+                b = names.index(slot['batch'])
+            elif slot.get('batch_id') is not None and slot['batch_id'] in batch_ids:
+                b = batch_ids.index(slot['batch_id'])
+            elif slot.get('batch') is None and slot.get('batch_id') is None and len(batches) == 1:
+                b = 0
+            else:
+                raise ValueError(f"Frozen slot {slot} belongs to no batch being repaired")
+            batches[b]['fixed_slots'].append({key: slot[key] for key in ('day', 'period', 'subject')})
+        if isinstance(approved, TimetableGrid) or set(approved) <= set(self.days):
+            approved = {names[0]: approved}
+        approved = {name: grid if isinstance(grid, TimetableGrid) else
+                    TimetableGrid.from_display(grid, self.period_times) for name, grid in approved.items()}
+
+        base = self.build_problem(batches)
+        leave = {name: leave_bits(base, days) for name, days in on_leave.items()}
+        original = genome_from_timetables(base, approved)
+
+        # Alternates who don't teach here yet are only known to the constraint index
+        unavailable = list(zip(base.faculty_names, base.faculty_busy_bits)) + list(leave.items())
+        index = self.params.get('constraint_index')
+        if index is not None and self.params.get('respect_faculty_availability', True):
+            unavailable += list(index.unavailable_slots_by_name(self.days, self.period_times).items())
+        substitutes = choose_substitutes(base, original, list(on_leave), alternates or [], unavailable)
+
+        # Covering a subject for the whole week can disrupt more than moving
+        # the few affected classes, so both plans are repaired and compared
+        best = None
+        for plan in [{}] + ([substitutes] if substitutes else []):
+            problem = self.build_problem(with_substitutes(batches, plan, base.faculty_names), leave)
+            evaluator = FitnessEvaluator(problem)
+            search = RepairSearch(problem, evaluator, original)
+            search.run(max_moves)
+            changes = changed_cells(problem, search.state.genome, approved)
+            cost = search.state.penalty + DISRUPTION_WEIGHT * len(changes)
+            if best is None or cost < best[0]:
+                best = (cost, plan, problem, evaluator, search, changes)
+        _, substitutes, self.problem, evaluator, search, changes = best
+        self.best_genome = search.state.genome
+        best_penalty = search.state.penalty
+
+        elapsed = time.perf_counter() - start
+        violations = evaluator.breakdown(self.best_genome)
+        self.last_run = {
+            'algorithm': 'repair',
+            'generations': search.moves,
+            'evaluations': search.evaluations,
+            'islands': 1,
+            'elapsed': elapsed,
+            'penalty': best_penalty,
+            'violations': violations,
+            'changes': changes,
+            'substitutions': {f"{self.problem.batch_names[b]} {code}": name
+                              for (b, code), name in substitutes.items()},
+        }
+        unresolved = sum(violations.get(name, 0) for name in HARD_CONSTRAINTS)
+        logger.info("Repair changed %d slots with %d moves in %.3fs (%d hard violations left)",
+                    len(changes), search.moves, elapsed, unresolved)
+        return self.problem.to_grid(self.best_genome), fitness_from_penalty(best_penalty)
 
 # Alias for compatibility
 AdvancedTimetableScheduler = FlexibleTimetableScheduler
@@ -147,17 +1327,19 @@ AdvancedTimetableScheduler = FlexibleTimetableScheduler
 if __name__ == "__main__":
     print("Testing Flexible Timetable Scheduler...")
     scheduler = FlexibleTimetableScheduler()
-    
+
     start_time = time.time()
-    timetable, fitness = scheduler.generate_timetable()
+    timetable, fitness = scheduler.generate_timetable(pop_size=50, ngen=2000, seed=42)
     end_time = time.time()
-    
-    print(f"Generated in {end_time - start_time:.2f} seconds")
+
+    print(f"Generated in {end_time - start_time:.2f} seconds "
+          f"({scheduler.last_run['generations'] / (end_time - start_time):.0f} generations/s)")
     print(f"Fitness: {fitness}")
-    
+    print(f"Violations: {scheduler.last_run['violations']}")
+
     # Display the timetable with proper time labels
-    for day, periods in timetable.items():
+    for day, labels in zip(timetable.days, timetable.labels()):
         print(f"\n{day}:")
-        for period, classes in periods.items():
+        for period, label in enumerate(labels):
             start, end, name = scheduler.period_times[period]
-            print(f"  {start}-{end}: {classes[0]}")
\ No newline at end of file
+            print(f"  {start}-{end}: {label}")
@@ -0,0 +1,72 @@
+# generation_worker.py - BACKGROUND TIMETABLE GENERATION
+"""Runs generate_timetable on a daemon thread so the Streamlit script never blocks.
+
+The page keeps the GenerationJob in its session state, reads `progress`
+on every rerun and may call cancel(). The solver stops at its next
+progress report and returns the best timetable found so far.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJob:
+    """One timetable generation running in the background"""
+
+    def __init__(self, scheduler, **kwargs):
+        self.scheduler = scheduler
+        self.kwargs = kwargs
+        self.status = 'pending'
+        self.progress: Dict[str, Any] = {}
+        self.result = None
+        self.error: Optional[str] = None
+        self.started_at = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="timetable-generation", daemon=True)
+
+    def start(self) -> 'GenerationJob':
+        self.started_at = time.time()
+        self.status = 'running'
+        self._thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self.status in ('pending', 'running')
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.scheduler.params
+
+    @property
+    def last_run(self) -> Dict[str, Any]:
+        return getattr(self.scheduler, 'last_run', {})
+
+    def timetables(self) -> Dict[str, Any]:
+        """Display timetables of every batch, keyed by batch name"""
+        return self.scheduler.timetables() if hasattr(self.scheduler, 'timetables') else {}
+
+    def cancel(self):
+        """Ask the solver to stop at its next progress report"""
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; False if it is still running after timeout"""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _update(self, progress: Dict[str, Any]):
+        # Replacing the dict keeps readers on other threads from seeing a half-written one
+        self.progress = dict(progress)
+
+    def _run(self):
+        try:
+            self.result = self.scheduler.generate_timetable(progress=self._update, cancel=self._cancel, **self.kwargs)
+            self.status = 'cancelled' if self._cancel.is_set() else 'done'
+        except Exception as e:
+            logger.exception("Timetable generation failed")
+            self.error = str(e)
+            self.status = 'failed'
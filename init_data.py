@@ -134,7 +134,8 @@ def initialize_sample_data():
                 code=code,
                 name=name,
                 credits=credits,
-                total_hours=total_hours
+                total_hours=total_hours,
+                department_id=ece_department.id
             )
             session.add(subject)
             subject_objects.append(subject)
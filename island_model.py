@@ -0,0 +1,101 @@
+# island_model.py - PARALLEL ISLAND GA
+"""Island-model GA: one sub-population per worker process with ring migration.
+
+Islands only exchange individuals at epoch boundaries, and each island owns
+its random generator, so a run depends on the seed and island count alone,
+never on how the operating system schedules the workers.
+
+The compiled problem reaches the workers as a memory-mapped snapshot (see
+problem_snapshot), so they start without unpickling or rebuilding it and
+share its arrays instead of holding a copy each.
+
+With a profiler, every worker profiles its islands while the profiler is
+enabled and sends its counters back with each epoch's results, where they
+are merged into the profiler.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from ga_scheduler import FitnessEvaluator, GeneticEngine, TimetableProblem
+from problem_snapshot import load_problem, save_problem
+from profiling import SolverProfiler
+
+logger = logging.getLogger(__name__)
+
+# Smallest sub-population an island is allowed to run with
+MIN_ISLAND_SIZE = 4
+
+# Problem and evaluator compiled once per worker process
+_worker = {}
+
+
+def _init_worker(snapshot: str):
+    problem = load_problem(snapshot)
+    _worker['problem'] = problem
+    _worker['evaluator'] = FitnessEvaluator(problem, profiler=SolverProfiler())
+
+
+def _evolve_island(task):
+    """Run one island for an epoch and hand back its state, best individuals and profile counters"""
+    population, rng, generations, immigrants, migrants, settings, profile = task
+    profiler = _worker['evaluator'].profiler
+    profiler.enabled = profile
+    engine = GeneticEngine(_worker['problem'], _worker['evaluator'], len(population), rng,
+                           population=population, **settings)
+    engine.immigrate(immigrants)
+    engine.run(generations)
+    counters = profiler.take() if profile else None
+    return engine.population, engine.rng, engine.emigrants(migrants), engine.best_penalty, counters
+
+
+def run_islands(problem: TimetableProblem, pop_size: int, ngen: int, seed, islands: int,
+                migration_interval: int = 20, migrants: int = 2,
+                callback: Optional[Callable[[int, float], bool]] = None,
+                profiler: Optional[SolverProfiler] = None, **settings) -> Tuple[np.ndarray, float, int]:
+    """Evolve `islands` sub-populations in parallel for `ngen` generations each (None: until stopped).
+
+    pop_size is the total population across all islands. After every epoch
+    callback(generations done, best penalty) may stop the run by returning
+    True. Epochs run while profiler.enabled is set add the islands'
+    operator and constraint counters to profiler. Returns the best genome,
+    its penalty and the total number of generations run.
+    """
+    island_size = max(MIN_ISLAND_SIZE, pop_size // islands)
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(islands)]
+    populations = [problem.random_population(island_size, rng) for rng in rngs]
+    incoming = [populations[0][:0]] * islands
+
+    handle, snapshot = tempfile.mkstemp(suffix='.ttp')
+    os.close(handle)
+    try:
+        save_problem(problem, snapshot)
+        with ProcessPoolExecutor(max_workers=islands, initializer=_init_worker, initargs=(snapshot,)) as pool:
+            done = 0
+            while True:
+                epoch = migration_interval if ngen is None else min(migration_interval, ngen - done)
+                profile = profiler is not None and profiler.enabled
+                tasks = [(populations[i], rngs[i], epoch, incoming[i], migrants, settings, profile)
+                         for i in range(islands)]
+                results = list(pool.map(_evolve_island, tasks))
+                for counters in (r[4] for r in results if r[4] is not None):
+                    profiler.merge(counters)
+                populations = [r[0] for r in results]
+                rngs = [r[1] for r in results]
+                best = [(r[3], r[2][0]) for r in results]
+                # Ring topology: every island receives the best of its predecessor
+                incoming = [results[i - 1][2] for i in range(islands)]
+                done += epoch
+                logger.debug("Island epoch done at generation %d, best penalties %s", done, [b[0] for b in best])
+                if (ngen is not None and done >= ngen) or \
+                        (callback is not None and callback(done, min(b[0] for b in best))):
+                    break
+    finally:
+        os.remove(snapshot)
+
+    penalty, genome = min(best, key=lambda b: b[0])
+    return genome, penalty, done * islands
@@ -0,0 +1,389 @@
+# job_queue.py - PERSISTENT GENERATION JOB QUEUE
+"""SQLite-backed queue of timetable generation jobs drained by a fixed worker pool.
+
+Jobs live in the `jobs` table (models.TimetableJob), so every Streamlit
+session and process sees one queue and pending work survives restarts.
+Workers claim the highest-priority pending job with a conditional UPDATE
+that only one claimant can win, and write the result straight into
+Timetable and TimetableEntry. Identical pending or running requests are
+answered by the job already queued for them.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from constraint_index import ConstraintIndex
+from ga_scheduler import FlexibleTimetableScheduler, TimetableProblem, normalize_name
+from models import (DEFAULT_DB_URL, ApprovalStatus, Faculty, JobStatus, Room, SessionType, Subject, Timetable,
+                    TimetableJob, User, POOL_SIZE, bulk_insert_entries, get_session_factory)
+from solver_cache import content_key, default_cache
+from timetable_grid import SessionTable, TimetableGrid
+
+logger = logging.getLogger(__name__)
+
+# Concurrent solves; more workers than cores only makes every job slower, and the
+# solves are CPU-bound Python threads, so the pool is kept for the UI's own reads
+DEFAULT_WORKERS = int(os.environ.get("TIMETABLE_WORKERS", max(1, min((os.cpu_count() or 1) // 2, POOL_SIZE))))
+
+# Scheduler parameters that are live objects, not data, and never stored with a job
+EXCLUDED_PARAMS = ('cache', 'constraint_index')
+
+# Statuses of jobs that still answer a new identical request
+ACTIVE_STATUSES = (JobStatus.PENDING, JobStatus.RUNNING)
+
+# Seconds between progress writes of a running job
+PROGRESS_INTERVAL = 1.0
+
+# Seconds an idle worker waits before looking for new jobs
+POLL_INTERVAL = 0.5
+
+# A running job not updated for this long lost its worker and is queued again
+STALE_AFTER = timedelta(minutes=5)
+
+
+def _json_safe(value):
+    return json.loads(json.dumps(value, default=lambda v: v.item() if hasattr(v, 'item') else str(v)))
+
+
+def submit_job(session, params: Dict[str, Any], period_times: Dict[int, tuple], solver_settings: Dict[str, Any],
+               name: str = None, department_id: int = None, academic_year: str = None, semester: int = None,
+               priority: int = 0, submitted_by: int = None) -> TimetableJob:
+    """Queue a generation, or return the active job that already covers the same input.
+
+    solver_settings are generate_timetable keyword arguments (pop_size,
+    ngen, seed, islands, algorithm, time_budget, stagnation). Higher
+    priorities run first; a duplicate request can raise the priority of
+    the pending job it joins.
+    """
+    params = _json_safe({key: value for key, value in params.items() if key not in EXCLUDED_PARAMS})
+    period_times = {str(period): list(times) for period, times in period_times.items()}
+    solver_settings = _json_safe(solver_settings)
+    input_hash = content_key({'parameters': params, 'period_times': period_times, 'solver': solver_settings})
+
+    existing = (session.query(TimetableJob)
+                .filter(TimetableJob.input_hash == input_hash, TimetableJob.status.in_(ACTIVE_STATUSES))
+                .order_by(TimetableJob.id).first())
+    if existing is not None:
+        if existing.status == JobStatus.PENDING and priority > (existing.priority or 0):
+            existing.priority = priority
+            session.commit()
+        logger.info("Request matches active job %d", existing.id)
+        return existing
+
+    job = TimetableJob(name=name, department_id=department_id, academic_year=academic_year, semester=semester,
+                       priority=priority, input_hash=input_hash, parameters=params, period_times=period_times,
+                       solver_settings=solver_settings, submitted_by=submitted_by)
+    session.add(job)
+    session.commit()
+    logger.info("Queued job %d (priority %d)", job.id, priority)
+    return job
+
+
+def claim_next_job(session, worker: str) -> Optional[TimetableJob]:
+    """Mark the highest-priority pending job as running for this worker and return it"""
+    while True:
+        candidate = (session.query(TimetableJob.id).filter(TimetableJob.status == JobStatus.PENDING)
+                     .order_by(TimetableJob.priority.desc(), TimetableJob.id).first())
+        if candidate is None:
+            return None
+        now = datetime.utcnow()
+        # Only one worker can flip the row from pending; the others retry with the next job
+        claimed = (session.query(TimetableJob)
+                   .filter(TimetableJob.id == candidate.id, TimetableJob.status == JobStatus.PENDING)
+                   .update({'status': JobStatus.RUNNING, 'started_at': now, 'updated_at': now, 'worker': worker},
+                           synchronize_session=False))
+        session.commit()
+        if claimed:
+            return session.get(TimetableJob, candidate.id)
+
+
+def requeue_stale_jobs(session) -> int:
+    """Send running jobs whose worker stopped reporting back to the queue"""
+    count = (session.query(TimetableJob)
+             .filter(TimetableJob.status == JobStatus.RUNNING,
+                     TimetableJob.updated_at < datetime.utcnow() - STALE_AFTER)
+             .update({'status': JobStatus.PENDING, 'worker': None}, synchronize_session=False))
+    session.commit()
+    if count:
+        logger.warning("Requeued %d stale jobs", count)
+    return count
+
+
+def cancel_job(session, job_id: int):
+    """Cancel a pending job outright, or ask the worker of a running one to stop"""
+    job = session.get(TimetableJob, job_id)
+    if job is None:
+        return
+    if job.status == JobStatus.PENDING:
+        job.status = JobStatus.CANCELLED
+        job.finished_at = datetime.utcnow()
+    elif job.status == JobStatus.RUNNING:
+        job.cancel_requested = True
+    session.commit()
+
+
+def save_timetable(session, scheduler: FlexibleTimetableScheduler, job: TimetableJob, fitness: float) -> Timetable:
+    """Store the scheduler's last result for a job as a draft Timetable (see store_timetable)"""
+    return store_timetable(session, scheduler.problem, scheduler.best_genome, fitness, name=job.name,
+                           department_id=job.department_id, academic_year=job.academic_year,
+                           semester=job.semester, generated_by=job.submitted_by,
+                           batch_ids=[batch.get('batch_id') for batch in scheduler.batches()])
+
+
+def store_timetable(session, problem: TimetableProblem, genome: np.ndarray, fitness: float,
+                    batch_ids: Optional[List[Optional[int]]] = None, **details) -> Timetable:
+    """Store a timetable of problem as a draft Timetable with one TimetableEntry per class.
+
+    The entries go in with one bulk insert inside the caller's transaction.
+    details are further Timetable columns (name, department_id, ...).
+
+    Subjects, faculty (by display name) and rooms are matched to their
+    database rows; batch_ids gives each batch's row, if it has one.
+    """
+    genome = np.asarray(genome).reshape(-1)
+    subjects = dict(session.query(Subject.code, Subject.id).all())
+    faculty = {normalize_name(name): faculty_id for faculty_id, name in
+               session.query(Faculty.id, User.full_name).join(User, Faculty.user_id == User.id).all()}
+    rooms = dict(session.query(Room.code, Room.id).all())
+    batch_ids = batch_ids or [None] * problem.n_batches
+
+    timetable = Timetable(status=ApprovalStatus.DRAFT,
+                          generated_data={name: problem.to_grid(genome, b).to_display()
+                                          for b, name in enumerate(problem.batch_names)},
+                          fitness_score=float(fitness), **details)
+    session.add(timetable)
+    session.flush()
+
+    # Resolve database ids once per faculty, room and session rather than once per class
+    faculty_ids = [faculty.get(normalize_name(name)) for name in problem.faculty_names]
+    room_ids = [rooms.get(code) for code in problem.room_codes] + [None]
+    columns = [{
+        'subject_id': subjects.get(s['subject']),
+        'faculty_id': faculty_ids[s['faculty']],
+        'room_id': room_ids[s['room']],
+        'batch_id': batch_ids[s['batch']],
+        'session_type': SessionType.LAB if s['kind'] == 'lab' else SessionType.THEORY,
+    } for s in problem.sessions]
+
+    cells = np.flatnonzero(genome >= 0)
+    rows = [dict(columns[s], timetable_id=timetable.id, day_of_week=day, time_slot=period,
+                 is_fixed=cell in problem.pinned_cells)
+            for cell, s, day, period in zip(cells.tolist(), genome[cells].tolist(),
+                                            problem.cell_day[cells].tolist(), problem.cell_period[cells].tolist())]
+    bulk_insert_entries(session, rows)
+    return timetable
+
+
+def run_job(Session, job_id: int):
+    """Solve a claimed job and record its outcome.
+
+    Sessions come from Session and are only held while the job is read or
+    written, never during the solve, so a running job keeps no pooled
+    connection between progress writes.
+    """
+    cancel = threading.Event()
+    last_write = [0.0]
+
+    def progress(info):
+        now = time.monotonic()
+        if now - last_write[0] < PROGRESS_INTERVAL:
+            return
+        last_write[0] = now
+        with Session() as session:
+            session.query(TimetableJob).filter(TimetableJob.id == job_id).update(
+                {'progress': _json_safe(info), 'updated_at': datetime.utcnow()}, synchronize_session=False)
+            # Reads a cancel request made by any session
+            if session.query(TimetableJob.cancel_requested).filter(TimetableJob.id == job_id).scalar():
+                cancel.set()
+            session.commit()
+
+    with Session() as session:
+        try:
+            job = session.get(TimetableJob, job_id)
+            period_times = {int(period): tuple(times) for period, times in job.period_times.items()}
+            params = dict(job.parameters or {}, cache=default_cache())
+            settings = job.solver_settings or {}
+            scheduler = FlexibleTimetableScheduler(params)
+            scheduler.update_time_structure(period_times)
+            # Compiled from the current tables on every run, so availability edits made after submission count
+            scheduler.params['constraint_index'] = ConstraintIndex.from_session(session, scheduler.days,
+                                                                                period_times)
+            session.commit()
+            session.close()
+
+            _, fitness = scheduler.generate_timetable(progress=progress, cancel=cancel, **settings)
+
+            job = session.get(TimetableJob, job_id)
+            timetable = save_timetable(session, scheduler, job, fitness)
+            job.timetable_id = timetable.id
+            job.last_run = _json_safe(scheduler.last_run)
+            job.status = JobStatus.CANCELLED if cancel.is_set() else JobStatus.DONE
+        except Exception as e:
+            logger.exception("Job %d failed", job_id)
+            session.rollback()
+            job = session.get(TimetableJob, job_id)
+            job.status = JobStatus.FAILED
+            job.error = str(e)[:500]
+        job.finished_at = job.updated_at = datetime.utcnow()
+        session.commit()
+
+
+class JobQueue:
+    """Fixed pool of worker threads draining the jobs table"""
+
+    def __init__(self, db_url: str = DEFAULT_DB_URL, workers: int = DEFAULT_WORKERS):
+        self.db_url = db_url
+        self.workers = max(1, workers)
+        # Workers open a short-lived session per claim and per progress write
+        self.Session = get_session_factory(db_url)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> 'JobQueue':
+        with self.Session() as session:
+            requeue_stale_jobs(session)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(index,), name=f"timetable-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming new jobs and wait for the running ones to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, params, period_times, solver_settings, **details) -> 'QueuedJob':
+        with self.Session() as session:
+            return QueuedJob(self, submit_job(session, params, period_times, solver_settings, **details).id)
+
+    def cancel(self, job_id: int):
+        with self.Session() as session:
+            cancel_job(session, job_id)
+
+    def _work(self, index):
+        worker = f"{socket.gethostname()}:{os.getpid()}:{index}"
+        while not self._stop.is_set():
+            with self.Session() as session:
+                job = claim_next_job(session, worker)
+                job_id = job.id if job is not None else None
+            if job_id is None:
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            logger.info("%s running job %d", worker, job_id)
+            run_job(self.Session, job_id)
+
+
+class QueuedJob:
+    """generation_worker.GenerationJob-style handle on a queued job, read back from the database"""
+
+    # Seconds a row snapshot is reused before it is read again
+    REFRESH_INTERVAL = 0.2
+
+    def __init__(self, queue: JobQueue, job_id: int):
+        self.queue = queue
+        self.job_id = job_id
+        self._row: Dict[str, Any] = {}
+        self._read_at = None
+
+    def _snapshot(self) -> Dict[str, Any]:
+        if self._read_at is None or time.monotonic() - self._read_at > self.REFRESH_INTERVAL:
+            with self.queue.Session() as session:
+                job = session.get(TimetableJob, self.job_id)
+                self._row = {
+                    'status': job.status.value,
+                    'progress': job.progress or {},
+                    'error': job.error,
+                    'parameters': job.parameters or {},
+                    'last_run': job.last_run or {},
+                    'timetable_id': job.timetable_id,
+                    'position': (session.query(TimetableJob)
+                                 .filter(TimetableJob.status == JobStatus.PENDING,
+                                         (TimetableJob.priority > job.priority)
+                                         | ((TimetableJob.priority == job.priority) & (TimetableJob.id < job.id)))
+                                 .count() + 1) if job.status == JobStatus.PENDING else 0,
+                }
+            self._read_at = time.monotonic()
+        return self._row
+
+    @property
+    def status(self) -> str:
+        return self._snapshot()['status']
+
+    @property
+    def running(self) -> bool:
+        return self.status in (JobStatus.PENDING.value, JobStatus.RUNNING.value)
+
+    @property
+    def progress(self) -> Dict[str, Any]:
+        return self._snapshot()['progress']
+
+    @property
+    def position(self) -> int:
+        """Place in the queue (1 = next), 0 once the job has started"""
+        return self._snapshot()['position']
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._snapshot()['error']
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self._snapshot()['parameters']
+
+    @property
+    def last_run(self) -> Dict[str, Any]:
+        return self._snapshot()['last_run']
+
+    @property
+    def timetable_id(self) -> Optional[int]:
+        """Draft Timetable holding the result, once there is one"""
+        return self._snapshot()['timetable_id']
+
+    def cancel(self):
+        self.queue.cancel(self.job_id)
+        self._read_at = None
+
+    def timetables(self) -> Dict[str, TimetableGrid]:
+        """Every batch of the stored result, keyed by batch name"""
+        timetable_id = self._snapshot()['timetable_id']
+        if timetable_id is None:
+            return {}
+        with self.queue.Session() as session:
+            data = session.get(Timetable, timetable_id).generated_data or {}
+            # JSON turned the period keys into strings
+            stored = session.get(TimetableJob, self.job_id).period_times
+        period_times = {int(p): tuple(times) for p, times in stored.items()}
+        sessions = SessionTable()
+        return {name: TimetableGrid.from_display(grid, period_times, sessions) for name, grid in data.items()}
+
+    @property
+    def result(self):
+        """(grid of the first batch, fitness), like generate_timetable"""
+        timetables = self.timetables()
+        if not timetables:
+            return None
+        with self.queue.Session() as session:
+            fitness = session.get(Timetable, self._snapshot()['timetable_id']).fitness_score
+        return next(iter(timetables.values())), fitness
+
+
+_default_queue: Optional[JobQueue] = None
+_default_lock = threading.Lock()
+
+
+def default_queue() -> JobQueue:
+    """Process-wide queue on the app database, started on first use"""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue().start()
+        return _default_queue
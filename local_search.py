@@ -0,0 +1,101 @@
+# local_search.py - SIMULATED ANNEALING BACKEND
+"""Simulated annealing over slot swaps and moves.
+
+Each step swaps two cells of the same batch (a move when one of them is
+FREE) and is scored through IncrementalEvaluator, so a step costs a few
+counter updates instead of a full re-score.
+"""
+import logging
+import math
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from ga_scheduler import FitnessEvaluator, IncrementalEvaluator, TimetableProblem
+
+logger = logging.getLogger(__name__)
+
+# Random numbers are drawn in blocks of this many steps
+CHUNK = 4096
+
+
+class SimulatedAnnealing:
+    """Single-solution annealer with geometric cooling"""
+
+    def __init__(self, problem: TimetableProblem, evaluator: FitnessEvaluator, rng: np.random.Generator,
+                 initial: Optional[np.ndarray] = None, start_temperature: Optional[float] = None,
+                 end_temperature: float = 0.05):
+        self.problem = problem
+        self.rng = rng
+        if initial is None:
+            initial = problem.random_population(1, rng)[0]
+        self.state = IncrementalEvaluator(evaluator, initial)
+        self.penalty = self.state.penalty
+        self.best_penalty = self.penalty
+        self.best_grid = list(self.state.grid)
+        self.floor = evaluator.constant_penalty
+        self.profiler = evaluator.profiler
+        # Seconds per move, measured while sampling moves for the start temperature
+        self.move_seconds = 2e-5
+        self.start_temperature = start_temperature or self._estimate_temperature()
+        self.end_temperature = min(end_temperature, self.start_temperature)
+        self.iterations = 0
+
+    @property
+    def best_genome(self) -> np.ndarray:
+        return np.array(self.best_grid, dtype=np.int16).reshape(self.problem.shape)
+
+    def _random_moves(self, count):
+        """Pairs of movable cells that share a batch"""
+        p = self.problem
+        first = self.rng.integers(p.n_movable, size=count)
+        batch = p.movable_batch[first]
+        second = p.segment_start[batch] + (self.rng.random(count) * p.segment_length[batch]).astype(np.int64)
+        return p.movable_cells[first].tolist(), p.movable_cells[second].tolist()
+
+    def _estimate_temperature(self, samples: int = 200) -> float:
+        """Start hot enough to accept a typical worsening move about half the time"""
+        started = time.perf_counter()
+        worse = [d for d in map(self.state.delta_swap, *self._random_moves(samples)) if d > 0]
+        # A sampled move is tried and undone, about what one annealing step costs
+        self.move_seconds = max((time.perf_counter() - started) / samples, 1e-7)
+        return (sum(worse) / len(worse)) / math.log(2) if worse else 1.0
+
+    def run(self, iterations: int, callback: Optional[Callable[['SimulatedAnnealing'], bool]] = None):
+        """Anneal for up to `iterations` moves, stopping early at a perfect timetable.
+
+        callback(annealer) is called after every CHUNK moves and stops the
+        run by returning True.
+        """
+        state = self.state
+        cooling = (self.end_temperature / self.start_temperature) ** (1.0 / max(1, iterations))
+        temperature = self.start_temperature
+        done = 0
+        while done < iterations and self.best_penalty > self.floor:
+            count = min(CHUNK, iterations - done)
+            firsts, seconds = self._random_moves(count)
+            thresholds = (-np.log(self.rng.random(count))).tolist()
+            chunk_start = done
+            chunk_started = time.perf_counter()
+            for a, b, threshold in zip(firsts, seconds, thresholds):
+                penalty = state.swap(a, b)
+                delta = penalty - self.penalty
+                # Metropolis rule: accept when delta < -T * ln(u)
+                if delta <= 0 or delta < temperature * threshold:
+                    self.penalty = penalty
+                    if penalty < self.best_penalty:
+                        self.best_penalty = penalty
+                        self.best_grid = list(state.grid)
+                else:
+                    state.swap(a, b)
+                temperature *= cooling
+                done += 1
+                if self.best_penalty <= self.floor:
+                    break
+            self.iterations += done - chunk_start
+            if self.profiler is not None and self.profiler.enabled:
+                self.profiler.record_operator('annealing_moves', time.perf_counter() - chunk_started, done - chunk_start)
+            if callback is not None and callback(self):
+                break
+        logger.debug("Annealing ran %d moves, best penalty %.2f", done, self.best_penalty)
@@ -1,10 +1,15 @@
 # models.py - FIXED VERSION
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Enum
+from sqlalchemy import (create_engine, event, insert, inspect, text, Column, Integer, String, Float, Boolean, DateTime,
+                        ForeignKey, JSON, Enum, Index)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.pool import StaticPool
+from contextlib import contextmanager
 from datetime import datetime
 import enum
 import json
+import os
+import threading
 
 Base = declarative_base()
 
@@ -32,6 +37,13 @@ class ApprovalStatus(enum.Enum):
     APPROVED = "approved"
     REJECTED = "rejected"
 
+class JobStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -134,6 +146,8 @@ class Subject(Base):
     credits = Column(Integer)
     total_hours = Column(Integer)
     difficulty_level = Column(Integer, default=3)
+    # Offering department; subjects without one are common to every department
+    department_id = Column(Integer, ForeignKey('departments.id'), nullable=True)
     
     # Relationships
     faculty = relationship("FacultySubject", back_populates="subject")
@@ -194,6 +208,12 @@ class Timetable(Base):
 
 class TimetableEntry(Base):
     __tablename__ = 'timetable_entries'
+    # Slot lookups per timetable and clash checks per faculty or room are index seeks
+    __table_args__ = (
+        Index('ix_timetable_entries_timetable_slot', 'timetable_id', 'day_of_week', 'time_slot'),
+        Index('ix_timetable_entries_faculty_slot', 'faculty_id', 'day_of_week', 'time_slot'),
+        Index('ix_timetable_entries_room_slot', 'room_id', 'day_of_week', 'time_slot'),
+    )
     
     id = Column(Integer, primary_key=True)
     timetable_id = Column(Integer, ForeignKey('timetables.id'))
@@ -213,6 +233,37 @@ class TimetableEntry(Base):
     room = relationship("Room")
     batch = relationship("Batch")
 
+class TimetableJob(Base):
+    __tablename__ = 'jobs'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100))
+    department_id = Column(Integer, ForeignKey('departments.id'), nullable=True)
+    academic_year = Column(String(9))
+    semester = Column(Integer)
+    status = Column(Enum(JobStatus), default=JobStatus.PENDING, index=True)
+    priority = Column(Integer, default=0)
+    input_hash = Column(String(64), index=True)
+    parameters = Column(JSON)
+    period_times = Column(JSON)
+    solver_settings = Column(JSON)
+    progress = Column(JSON, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    last_run = Column(JSON, nullable=True)
+    error = Column(String(500), nullable=True)
+    worker = Column(String(100), nullable=True)
+    submitted_by = Column(Integer, ForeignKey('users.id'), nullable=True)
+    submitted_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    timetable_id = Column(Integer, ForeignKey('timetables.id'), nullable=True)
+    
+    # Relationships
+    department = relationship("Department")
+    submitter = relationship("User")
+    timetable = relationship("Timetable")
+
 class TimetableApproval(Base):
     __tablename__ = 'timetable_approvals'
     
@@ -244,11 +295,104 @@ class SystemConfiguration(Base):
         return config.value if config else default
 
 # Database initialization
-def init_db(db_url="sqlite:///timetable_scheduler.db"):
-    engine = create_engine(db_url)
+def enable_sqlite_wal(engine):
+    """Put SQLite databases in WAL mode so readers don't wait for the writer"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Durable at every checkpoint; WAL makes per-commit fsyncs unnecessary
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+def create_schema(engine):
+    """Create missing tables, nullable columns and indexes"""
     Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    # create_all leaves tables that already exist alone, so add their new nullable columns and indexes here
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    connection.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                                            f"{column.type.compile(engine.dialect)}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+def bulk_insert_entries(session, rows):
+    """Insert TimetableEntry rows (dicts of column values) with one executemany in the session's transaction"""
+    if rows:
+        # A Core insert on the table skips the ORM's per-row bookkeeping
+        session.execute(insert(TimetableEntry.__table__), rows)
+    return len(rows)
+
+# Application database, shared by the app, the job queue and the scripts
+DEFAULT_DB_URL = os.environ.get("TIMETABLE_DB_URL", "sqlite:///timetable_scheduler.db")
+
+# Connections each engine keeps open, and how many more it may open under load
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+# Seconds after which a pooled connection is replaced (servers drop idle ones)
+POOL_RECYCLE = 1800
+
+_engines = {}
+_session_factories = {}
+_engine_lock = threading.Lock()
+
+def _create_engine(db_url):
+    if db_url.startswith("sqlite"):
+        if db_url in ("sqlite://", "sqlite:///:memory:"):
+            # An in-memory database lives in one connection, which every thread must share
+            engine = create_engine(db_url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+        else:
+            engine = create_engine(db_url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                                   connect_args={"check_same_thread": False})
+        enable_sqlite_wal(engine)
+        return engine
+    return create_engine(db_url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                         pool_pre_ping=True, pool_recycle=POOL_RECYCLE)
+
+def get_engine(db_url=DEFAULT_DB_URL):
+    """Process-wide engine for db_url; the schema is created when it is first asked for"""
+    with _engine_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = _engines[db_url] = _create_engine(db_url)
+            create_schema(engine)
+        return engine
+
+def get_session_factory(db_url=DEFAULT_DB_URL):
+    """Process-wide sessionmaker for db_url; every call makes an independent session"""
+    engine = get_engine(db_url)
+    with _engine_lock:
+        factory = _session_factories.get(db_url)
+        if factory is None:
+            factory = _session_factories[db_url] = sessionmaker(bind=engine)
+        return factory
+
+@contextmanager
+def session_scope(db_url=DEFAULT_DB_URL):
+    """Session that commits when the block succeeds, rolls back when it raises, and is always closed"""
+    session = get_session_factory(db_url)()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def init_db(db_url=DEFAULT_DB_URL):
+    """New session on the shared engine (the caller closes it)"""
+    return get_session_factory(db_url)()
 
 # Password hashing utility
 def hash_password(password):
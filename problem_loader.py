@@ -0,0 +1,133 @@
+# problem_loader.py - DEPARTMENT PROBLEM LOADER
+"""Builds FlexibleTimetableScheduler parameters for a department from the database.
+
+Walking Faculty.subjects, Subject.sessions and the unavailability and
+alternate tables through lazy relationships costs a query per row. The
+loader instead fetches everything with eager loading in a fixed number of
+round trips (eight, however many faculty, subjects and batches there
+are) and compiles the results into plain scheduler parameters:
+
+    with session_scope() as session:
+        params = load_department_params(session, department_id, days, period_times)
+    scheduler = FlexibleTimetableScheduler(params)
+
+The schema does not record which subjects a batch takes, so every batch
+of the department gets the same subject configs: the given subject codes,
+or the department's own subjects (Subject.department_id) plus those
+common to every department, as long as they have sessions.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from constraint_index import period_bits
+from ga_scheduler import time_to_minutes
+from models import (Department, Faculty, FacultyAlternate, FacultySubject, FacultyUnavailability, Room,
+                    SessionType, Subject)
+
+logger = logging.getLogger(__name__)
+
+
+def load_department_params(session, department_id: int, days: List[str], period_times: Dict[int, tuple],
+                           subject_codes: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Scheduler parameters for every batch of a department.
+
+    Returns 'batches', 'rooms' (the department's and shared ones),
+    'faculty_unavailable' (week-slot bitmasks by faculty name, for the
+    given time structure) and 'alternates' (see repair.load_alternates),
+    restricted to the faculty teaching the loaded subjects.
+    """
+    department = session.scalars(
+        select(Department).where(Department.id == department_id)
+        .options(selectinload(Department.batches))).one_or_none()
+    if department is None:
+        raise ValueError(f"No department with id {department_id}")
+
+    rooms = session.scalars(
+        select(Room).where(or_(Room.department_id == department_id, Room.department_id.is_(None)))
+        .order_by(Room.id)).all()
+
+    query = (select(Subject)
+             .options(selectinload(Subject.sessions),
+                      selectinload(Subject.faculty).joinedload(FacultySubject.faculty).joinedload(Faculty.user))
+             .order_by(Subject.id))
+    if subject_codes is not None:
+        query = query.where(Subject.code.in_(list(subject_codes)))
+    else:
+        query = query.where(or_(Subject.department_id == department_id, Subject.department_id.is_(None)))
+    subjects = [s for s in session.scalars(query).all() if s.sessions]
+
+    subject_configs = [_subject_config(subject) for subject in subjects]
+    faculty = {link.faculty.id: link.faculty for subject in subjects for link in subject.faculty if link.faculty}
+    names = {faculty_id: _faculty_name(member) for faculty_id, member in faculty.items()}
+
+    # Only recurring unavailability shapes a weekly timetable
+    unavailable: Dict[str, int] = {}
+    for row in session.scalars(
+            select(FacultyUnavailability)
+            .where(FacultyUnavailability.faculty_id.in_(list(faculty)),
+                   FacultyUnavailability.is_recurring.is_(True))).all():
+        name = names.get(row.faculty_id)
+        if not name or row.day_of_week is None or not 0 <= row.day_of_week < len(days):
+            continue
+        bits = period_bits(period_times, time_to_minutes(row.start_time or "00:00"),
+                           time_to_minutes(row.end_time or "23:59"))
+        unavailable[name] = unavailable.get(name, 0) | bits << (row.day_of_week * len(period_times))
+
+    subject_ids = {subject.id for subject in subjects}
+    alternates = session.scalars(
+        select(FacultyAlternate)
+        .where(FacultyAlternate.primary_faculty_id.in_(list(faculty)))
+        .options(joinedload(FacultyAlternate.alternate_faculty).joinedload(Faculty.user),
+                 joinedload(FacultyAlternate.subject))
+        .order_by(FacultyAlternate.priority)).all()
+
+    params = {
+        'batches': [{
+            'name': f"{department.code} Sem {batch.semester} - {batch.section}",
+            'batch_id': batch.id,
+            'department': department.code,
+            'strength': batch.strength,
+            'subject_configs': [dict(config) for config in subject_configs],
+            'fixed_slots': [],
+        } for batch in sorted(department.batches, key=lambda b: (b.semester or 0, b.section or '', b.id))],
+        'rooms': [{
+            'code': room.code,
+            'room_type': room.room_type.value if room.room_type else None,
+            'capacity': room.capacity,
+            'department': department.code if room.department_id is not None else None,
+        } for room in rooms if room.is_available is not False],
+        'faculty_unavailable': unavailable,
+        'alternates': [{
+            'faculty': names[alt.primary_faculty_id],
+            'alternate': _faculty_name(alt.alternate_faculty),
+            'subject': alt.subject.code if alt.subject else None,
+            'priority': alt.priority,
+        } for alt in alternates
+            if alt.alternate_faculty is not None and (alt.subject_id is None or alt.subject_id in subject_ids)],
+    }
+    logger.info("Loaded %s: %d batches, %d subjects, %d faculty, %d rooms",
+                department.code, len(params['batches']), len(subjects), len(faculty), len(params['rooms']))
+    return params
+
+
+def _subject_config(subject: Subject) -> Dict[str, Any]:
+    """Subject config of a subject; lab sessions count towards lab_classes"""
+    theory = lab = 0
+    preferred_days: List[str] = []
+    for s in subject.sessions:
+        if s.requires_lab or s.session_type == SessionType.LAB:
+            lab += s.weekly_frequency or 0
+        else:
+            theory += s.weekly_frequency or 0
+            preferred_days += [day for day in s.preferred_days or [] if day not in preferred_days]
+    primary = sorted(subject.faculty, key=lambda link: (not link.is_primary, -(link.proficiency_level or 0), link.id))
+    return {'code': subject.code, 'theory_classes': theory, 'lab_classes': lab,
+            'preferred_days': preferred_days, 'avoid_day': None,
+            'faculty': _faculty_name(primary[0].faculty) if primary and primary[0].faculty else None}
+
+
+def _faculty_name(faculty: Faculty) -> Optional[str]:
+    return (faculty.user.full_name if faculty.user else None) or faculty.employee_id
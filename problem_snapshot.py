@@ -0,0 +1,126 @@
+# problem_snapshot.py - BINARY SNAPSHOTS OF COMPILED PROBLEMS
+"""Versioned binary files holding a compiled TimetableProblem.
+
+Every NumPy array of the problem (masks, matrices, session tables) is
+written as raw aligned bytes; the remaining small Python state (names,
+period times, the SessionTable) is pickled into the same file. Loading
+memory-maps the file read-only, so worker processes start without
+rebuilding the problem or unpickling its arrays, and the operating system
+shares the pages between them instead of copying them per process.
+
+Layout: MAGIC, a little-endian uint32 header length, a JSON header
+(version, array dtypes/shapes/offsets, state location, metadata), then the
+data section with every block aligned to ALIGNMENT bytes.
+
+Snapshots also keep a problem exactly as it was solved, for offline
+benchmarking (see benchmark.py --save-problems / --problems).
+"""
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ga_scheduler import TimetableProblem
+
+logger = logging.getLogger(__name__)
+
+# Bump when TimetableProblem's attributes or the file layout change
+SNAPSHOT_VERSION = 1
+
+# First bytes of every snapshot file
+MAGIC = b"TTPSNAP\n"
+
+# Byte alignment of every array block (cache line, and enough for any dtype)
+ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_problem(problem: TimetableProblem, path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Write problem to path (atomically) and return the path"""
+    arrays, state = {}, {}
+    for name, value in vars(problem).items():
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            arrays[name] = np.ascontiguousarray(value)
+        else:
+            state[name] = value
+    state_bytes = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({'version': SNAPSHOT_VERSION, 'arrays': layout, 'state': [offset, len(state_bytes)],
+                         'metadata': metadata or {}}).encode()
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name][2])
+                f.write(array.tobytes())
+            f.seek(data_start + offset)
+            f.write(state_bytes)
+        # Workers opening the path only ever see complete files
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+    logger.debug("Saved problem snapshot %s (%d arrays, %d bytes)", path, len(arrays), data_start + offset +
+                 len(state_bytes))
+    return path
+
+
+def _read_header(buffer) -> Dict[str, Any]:
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a problem snapshot")
+    (length,) = struct.unpack('<I', buffer[len(MAGIC):len(MAGIC) + 4])
+    header = json.loads(bytes(buffer[len(MAGIC) + 4:len(MAGIC) + 4 + length]))
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Problem snapshot version {header.get('version')} is not supported "
+                         f"(expected {SNAPSHOT_VERSION})")
+    header['data_start'] = _aligned(len(MAGIC) + 4 + length)
+    return header
+
+
+def load_problem(path: str, mmap_mode: bool = True) -> TimetableProblem:
+    """TimetableProblem of a snapshot.
+
+    With mmap_mode its arrays are read-only views of the memory-mapped
+    file, otherwise private writable copies.
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if mmap_mode else f.read()
+    header = _read_header(buffer)
+    start = header['data_start']
+    state_offset, state_length = header['state']
+
+    problem = TimetableProblem.__new__(TimetableProblem)
+    problem.__dict__.update(pickle.loads(buffer[start + state_offset:start + state_offset + state_length]))
+    for name, (dtype, shape, offset) in header['arrays'].items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape, dtype=np.int64))
+        array = np.frombuffer(buffer, dtype, count, start + offset) if count else np.empty(0, dtype)
+        setattr(problem, name, array.reshape(shape) if mmap_mode else array.reshape(shape).copy())
+    return problem
+
+
+def snapshot_metadata(path: str) -> Dict[str, Any]:
+    """Metadata stored with a snapshot, without loading the problem"""
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC) + 4)
+        if head[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a problem snapshot")
+        (length,) = struct.unpack('<I', head[len(MAGIC):])
+        return _read_header(head + f.read(length))['metadata']
@@ -0,0 +1,147 @@
+# profiling.py - SOLVER INSTRUMENTATION
+"""Per-operator and per-constraint timings for the solvers.
+
+A SolverProfiler hangs off the FitnessEvaluator. While it is disabled the
+solvers pay one attribute check per generation (per chunk of moves for
+annealing); `enabled` can be flipped at any time, also from another thread
+while a run is in progress. Counters are cumulative across runs until
+reset(), like Prometheus counters. Worker processes profile into their own
+SolverProfiler and send take() back to be merge()d (see island_model).
+"""
+import json
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Per-generation operator breakdowns kept for the JSON export
+HISTORY_LENGTH = 1000
+
+
+class SolverProfiler:
+    """Cumulative operator timings and constraint check statistics"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.generations = 0
+            # name -> [calls, seconds]
+            self.operators: Dict[str, list] = {}
+            # name -> [checks (timetables scored), seconds, violations, violating timetables]
+            self.constraints: Dict[str, list] = {}
+            self.history = deque(maxlen=HISTORY_LENGTH)
+
+    def record_generation(self, timings: Dict[str, float]):
+        """One GA generation, as seconds per operator"""
+        with self._lock:
+            self.generations += 1
+            for name, seconds in timings.items():
+                entry = self.operators.setdefault(name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+            self.history.append(timings)
+
+    def record_operator(self, name: str, seconds: float, calls: int = 1):
+        """Time outside the generation loop, such as a chunk of annealing moves"""
+        with self._lock:
+            entry = self.operators.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def record_constraint(self, name: str, checks: int, seconds: float, counts):
+        """One constraint term scored on `checks` timetables; counts holds their violations"""
+        with self._lock:
+            entry = self.constraints.setdefault(name, [0, 0.0, 0, 0])
+            entry[0] += checks
+            entry[1] += seconds
+            entry[2] += int(counts.sum())
+            entry[3] += int((counts > 0).sum())
+
+    def take(self) -> Dict[str, Any]:
+        """Counters gathered since the last take() or reset(), and reset them (for merge() elsewhere)"""
+        with self._lock:
+            counters = {'generations': self.generations, 'operators': self.operators,
+                        'constraints': self.constraints, 'history': list(self.history)}
+        self.reset()
+        return counters
+
+    def merge(self, counters: Dict[str, Any]):
+        """Add counters from take() on another profiler, e.g. one in an island worker process"""
+        with self._lock:
+            self.generations += counters['generations']
+            for name, (calls, seconds) in counters['operators'].items():
+                entry = self.operators.setdefault(name, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+            for name, values in counters['constraints'].items():
+                entry = self.constraints.setdefault(name, [0, 0.0, 0, 0])
+                for i, value in enumerate(values):
+                    entry[i] += value
+            self.history.extend(counters['history'])
+
+    # ----- export -----
+    def to_dict(self, history: bool = False) -> Dict[str, Any]:
+        """Plain summary; constraints are sorted by the time they cost"""
+        with self._lock:
+            generations = self.generations
+            operators = {name: {'calls': calls, 'seconds': seconds,
+                                'per_generation_ms': 1000 * seconds / generations if generations else None}
+                         for name, (calls, seconds) in self.operators.items()}
+            constraints = {name: {'checks': checks, 'seconds': seconds,
+                                  'us_per_check': 1e6 * seconds / checks if checks else None,
+                                  'violations': violations, 'violating': violating,
+                                  'violation_rate': violating / checks if checks else None}
+                           for name, (checks, seconds, violations, violating)
+                           in sorted(self.constraints.items(), key=lambda item: -item[1][1])}
+            summary = {'enabled': self.enabled, 'generations': generations,
+                       'operators': operators, 'constraints': constraints}
+            if history:
+                summary['history'] = list(self.history)
+        return summary
+
+    def to_json(self, history: bool = True, **kwargs) -> str:
+        return json.dumps(self.to_dict(history), **kwargs)
+
+    def to_prometheus(self, prefix: str = 'timetable_solver', labels: Optional[Dict[str, str]] = None) -> str:
+        return prometheus_text(self.to_dict(), prefix, labels)
+
+
+def prometheus_text(summary: Dict[str, Any], prefix: str = 'timetable_solver',
+                    labels: Optional[Dict[str, str]] = None) -> str:
+    """A SolverProfiler.to_dict() summary in Prometheus text exposition format (all counters)"""
+    base = ','.join(f'{key}="{_escape(value)}"' for key, value in (labels or {}).items())
+
+    def sample(name, value, **extra):
+        pairs = ([base] if base else []) + [f'{key}="{_escape(v)}"' for key, v in extra.items()]
+        return f"{prefix}_{name}{{{','.join(pairs)}}} {value}" if pairs else f"{prefix}_{name} {value}"
+
+    metrics = [
+        ('generations_total', "GA generations profiled",
+         [sample('generations_total', summary['generations'])]),
+        ('operator_seconds_total', "Time spent in each solver operator",
+         [sample('operator_seconds_total', op['seconds'], operator=name)
+          for name, op in summary['operators'].items()]),
+        ('operator_calls_total', "Calls of each solver operator",
+         [sample('operator_calls_total', op['calls'], operator=name)
+          for name, op in summary['operators'].items()]),
+        ('constraint_checks_total', "Timetables each constraint was checked on",
+         [sample('constraint_checks_total', c['checks'], constraint=name)
+          for name, c in summary['constraints'].items()]),
+        ('constraint_seconds_total', "Time spent checking each constraint",
+         [sample('constraint_seconds_total', c['seconds'], constraint=name)
+          for name, c in summary['constraints'].items()]),
+        ('constraint_violations_total', "Violations found by each constraint",
+         [sample('constraint_violations_total', c['violations'], constraint=name)
+          for name, c in summary['constraints'].items()]),
+    ]
+    lines = []
+    for name, help_text, samples in metrics:
+        lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter"] + samples
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,243 @@
+# repair.py - MINIMAL-DISRUPTION REPAIR
+"""Warm-start repair of an approved timetable.
+
+The approved timetable is the starting point. Frozen entries stay pinned.
+Each subject of a faculty member on leave goes to the FacultyAlternate
+with the fewest clashes at the existing slots, with ties broken by
+priority. A local search then moves only cells that still break a hard
+constraint. Every cell that ends up different from the approved timetable
+costs DISRUPTION_WEIGHT, so the search stops at a small set of changes
+that makes the timetable valid again.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import aliased
+
+from ga_scheduler import (FREE, FitnessEvaluator, IncrementalEvaluator, TimetableProblem, genome_from_timetables,
+                          normalize_name)
+from models import Batch, Department, Faculty, FacultyAlternate, Subject, TimetableEntry, User
+from timetable_grid import FREE_LABEL, TimetableGrid
+
+logger = logging.getLogger(__name__)
+
+# Penalty per cell whose content differs from the approved timetable
+DISRUPTION_WEIGHT = 3.0
+
+# Wall-clock budget of one repair search, in seconds
+TIME_LIMIT = 0.5
+
+
+def choose_substitutes(problem: TimetableProblem, genome: np.ndarray, on_leave: List[str],
+                       alternates: List[Dict[str, Any]],
+                       unavailable: List[Tuple[str, int]]) -> Dict[Tuple[int, str], str]:
+    """Alternate faculty for every subject taught by someone on leave.
+
+    alternates are FacultyAlternate-style dicts with 'faculty', 'alternate',
+    'subject' (None for any subject) and 'priority' (lower comes first).
+    Each candidate is scored by how many of the subject's current slots it
+    is already busy in, across all batches. unavailable lists (faculty
+    name, week-slot bitmask) pairs. Returns {(batch, subject code): name}.
+    """
+    away = {normalize_name(name) for name in on_leave}
+    grid = np.asarray(genome).reshape(-1)
+    busy: Dict[str, int] = {}
+    for name, bits in unavailable:
+        busy[normalize_name(name)] = busy.get(normalize_name(name), 0) | bits
+    for cell in np.flatnonzero(grid >= 0):
+        key = normalize_name(problem.faculty_names[problem.session_faculty[grid[cell]]])
+        busy[key] = busy.get(key, 0) | (1 << int(problem.cell_slot[cell]))
+
+    substitutes = {}
+    for group, (batch, code) in enumerate(problem.group_keys):
+        sessions = [i for i, s in enumerate(problem.sessions) if s['group'] == group]
+        faculty = problem.faculty_names[problem.session_faculty[sessions[0]]] if sessions else None
+        if faculty is None or normalize_name(faculty) not in away:
+            continue
+        slots = [int(problem.cell_slot[cell]) for cell in np.flatnonzero(np.isin(grid, sessions))]
+        options = sorted((row for row in alternates
+                          if normalize_name(row.get('faculty')) == normalize_name(faculty)
+                          and row.get('subject') in (None, code)
+                          and normalize_name(row.get('alternate')) not in away),
+                         key=lambda row: (row.get('priority') or 1, row.get('subject') is None))
+        best = None
+        for rank, row in enumerate(options):
+            bits = busy.get(normalize_name(row['alternate']), 0)
+            clashes = sum((bits >> slot) & 1 for slot in slots)
+            if best is None or (clashes, rank) < best[0]:
+                best = ((clashes, rank), row['alternate'])
+        if best is None:
+            logger.warning("No alternate available for %s (%s)", code, faculty)
+            continue
+        substitutes[(batch, code)] = best[1]
+        # Later subjects see the slots this alternate has just taken over
+        key = normalize_name(best[1])
+        busy[key] = busy.get(key, 0) | sum(1 << slot for slot in set(slots))
+    return substitutes
+
+
+def with_substitutes(batches: List[Dict[str, Any]], substitutes: Dict[Tuple[int, str], str],
+                     faculty_names: List[str]) -> List[Dict[str, Any]]:
+    """Copies of the batches with substituted subjects handed to their alternates.
+
+    An alternate who already teaches here keeps the spelling the timetable
+    uses for them, so both spellings map to one faculty.
+    """
+    spelling = {normalize_name(name): name for name in faculty_names}
+    return [dict(batch, subject_configs=[
+        dict(config, faculty=spelling.get(normalize_name(substitutes[(b, config['code'])]),
+                                          substitutes[(b, config['code'])]))
+        if (b, config['code']) in substitutes else config
+        for config in batch['subject_configs']]) for b, batch in enumerate(batches)]
+
+
+def changed_cells(problem: TimetableProblem, genome: np.ndarray,
+                  approved: Dict[str, TimetableGrid]) -> List[Dict[str, Any]]:
+    """Teaching cells whose label differs from the approved grids"""
+    changes = []
+    for b, name in enumerate(problem.batch_names):
+        before = approved.get(name)
+        after = problem.to_grid(genome, b)
+        for d, day in enumerate(problem.days):
+            row = before.days.index(day) if before is not None and day in before.days else None
+            for period in range(problem.n_periods):
+                if period in problem.break_periods:
+                    continue
+                old = before.label(row, period) if row is not None else FREE_LABEL
+                new = after.label(d, period)
+                if old != new:
+                    changes.append({'batch': name, 'day': day, 'period': period, 'before': old, 'after': new})
+    return changes
+
+
+class RepairSearch:
+    """Best-improvement search that only moves cells breaking a hard constraint.
+
+    The objective is the timetable penalty plus DISRUPTION_WEIGHT for each
+    cell that differs from `original`. A move is a swap of two cells in the
+    same batch. When no single swap improves, a chain of two swaps is
+    tried: the session displaced by the first swap moves on to a third
+    cell.
+    """
+
+    def __init__(self, problem: TimetableProblem, evaluator: FitnessEvaluator, genome: np.ndarray,
+                 original: Optional[np.ndarray] = None, disruption_weight: float = DISRUPTION_WEIGHT):
+        self.problem = problem
+        self.state = IncrementalEvaluator(evaluator, genome)
+        self.original = np.asarray(genome if original is None else original).reshape(-1).tolist()
+        self.weight = disruption_weight
+        self.segments = [problem.movable_cells[start:start + length].tolist()
+                         for start, length in zip(problem.segment_start, problem.segment_length)]
+        self.movable = set(problem.movable_cells.tolist())
+        self.cell_batch = problem.cell_batch.tolist()
+        self.moves = 0
+        self.evaluations = 0
+
+    @property
+    def changed(self) -> int:
+        """Cells that differ from the original timetable"""
+        return sum(g != o for g, o in zip(self.state.grid, self.original))
+
+    @property
+    def objective(self) -> float:
+        return self.state.penalty + self.weight * self.changed
+
+    def _disruption(self, a, b):
+        """Change in the number of differing cells if a and b were swapped"""
+        grid, original = self.state.grid, self.original
+        before = (grid[a] != original[a]) + (grid[b] != original[b])
+        after = (grid[b] != original[a]) + (grid[a] != original[b])
+        return after - before
+
+    def _gain(self, a, b):
+        self.evaluations += 1
+        return self.state.delta_swap(a, b) + self.weight * self._disruption(a, b)
+
+    def _best_swap(self, cells):
+        best, move = -1e-9, None
+        grid = self.state.grid
+        for a in cells:
+            for b in self.segments[self.cell_batch[a]]:
+                if grid[a] != grid[b]:
+                    gain = self._gain(a, b)
+                    if gain < best:
+                        best, move = gain, [(a, b)]
+        return move
+
+    def _best_chain(self, cells, deadline):
+        best, move = -1e-9, None
+        grid = self.state.grid
+        for a in cells:
+            if time.perf_counter() > deadline:
+                break
+            segment = self.segments[self.cell_batch[a]]
+            for b in segment:
+                if grid[a] == grid[b]:
+                    continue
+                first = self._gain(a, b)
+                self.state.swap(a, b)
+                # The session that sat in b now occupies a; try moving it on
+                for c in segment:
+                    if c != b and grid[a] != grid[c]:
+                        gain = first + self._gain(a, c)
+                        if gain < best:
+                            best, move = gain, [(a, b), (a, c)]
+                self.state.swap(a, b)
+        return move
+
+    def run(self, max_moves: int = 200, time_limit: float = TIME_LIMIT):
+        """Move conflicting cells until none is left, nothing improves or the budget runs out"""
+        deadline = time.perf_counter() + time_limit
+        while self.moves < max_moves and time.perf_counter() < deadline:
+            cells = [cell for cell in self.state.conflicted_cells() if cell in self.movable]
+            if not cells:
+                break
+            move = self._best_swap(cells) or self._best_chain(cells, deadline)
+            if move is None:
+                break
+            for a, b in move:
+                self.state.swap(a, b)
+            self.moves += 1
+        logger.debug("Repair made %d moves (%d evaluations), %d cells changed",
+                     self.moves, self.evaluations, self.changed)
+
+
+def leave_bits(problem: TimetableProblem, days: Optional[List[str]]) -> int:
+    """Week-slot bitmask covering the given days (the whole week for None)"""
+    full_day = (1 << problem.n_periods) - 1
+    return sum(full_day << (d * problem.n_periods) for d, day in enumerate(problem.days)
+               if days is None or day in days)
+
+
+def load_alternates(session) -> List[Dict[str, Any]]:
+    """FacultyAlternate rows as dicts of display names, highest priority first"""
+    primary, alternate = aliased(Faculty), aliased(Faculty)
+    primary_user, alternate_user = aliased(User), aliased(User)
+    rows = (session.query(primary_user.full_name, alternate_user.full_name, Subject.code, FacultyAlternate.priority)
+            .join(primary, FacultyAlternate.primary_faculty_id == primary.id)
+            .join(primary_user, primary.user_id == primary_user.id)
+            .join(alternate, FacultyAlternate.alternate_faculty_id == alternate.id)
+            .join(alternate_user, alternate.user_id == alternate_user.id)
+            .outerjoin(Subject, FacultyAlternate.subject_id == Subject.id)
+            .order_by(FacultyAlternate.priority).all())
+    return [{'faculty': faculty, 'alternate': alternate_name, 'subject': code, 'priority': priority}
+            for faculty, alternate_name, code, priority in rows]
+
+
+def load_frozen_slots(session, timetable_id: int, days: List[str]) -> List[Dict[str, Any]]:
+    """TimetableEntry.is_fixed rows of a timetable as fixed-slot dicts with their 'batch' name and 'batch_id'
+
+    Batch names follow problem_loader ("ECE Sem 3 - A"); entries without a batch have neither.
+    """
+    rows = (session.query(TimetableEntry.day_of_week, TimetableEntry.time_slot, Subject.code, TimetableEntry.batch_id,
+                          Department.code, Batch.semester, Batch.section)
+            .join(Subject, TimetableEntry.subject_id == Subject.id)
+            .outerjoin(Batch, TimetableEntry.batch_id == Batch.id)
+            .outerjoin(Department, Batch.department_id == Department.id)
+            .filter(TimetableEntry.timetable_id == timetable_id, TimetableEntry.is_fixed.is_(True)).all())
+    return [{'day': days[day], 'period': period, 'subject': code, 'batch_id': batch_id,
+             'batch': f"{department} Sem {semester} - {section}" if batch_id is not None and department else None}
+            for day, period, code, batch_id, department, semester, section in rows
+            if day is not None and 0 <= day < len(days)]
@@ -0,0 +1,220 @@
+# schedule_all.py - HEADLESS TIMETABLE GENERATION
+"""Generate draft timetables for every department from the database, without the UI.
+
+Each department's batches are loaded as one problem with the department's
+own subjects (see problem_loader). Departments whose batches share a faculty member have to be solved
+together, so they are merged into one problem; the resulting independent
+problems are solved side by side in a process pool, one per worker. Each
+result is stored as a draft Timetable as soon as it arrives (see
+job_queue.store_timetable), then every draft is checked for clashes with
+the approved timetables and with the other drafts, since shared rooms are
+the one resource independent problems can still have in common.
+
+    python schedule_all.py --academic-year 2025-2026 --semester 3 --time-budget 120
+
+--subjects ECE=U24EC311,U24EC323 overrides which subjects a department's
+batches take.
+
+Prints one line per problem and a timing summary; exits non-zero if any
+problem failed.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from clash_detection import ClashIndex
+from ga_scheduler import ALGORITHMS, HARD_CONSTRAINTS, FlexibleTimetableScheduler
+from job_queue import store_timetable
+from models import DEFAULT_DB_URL, Department, session_scope
+from problem_loader import load_department_params
+
+logger = logging.getLogger(__name__)
+
+# Solver settings used unless given on the command line
+DEFAULT_SETTINGS = {'pop_size': 50, 'ngen': 500, 'seed': 42}
+
+
+def _solve(task) -> Dict[str, Any]:
+    """Solve one problem in a worker process"""
+    params, period_times, settings = task
+    started = time.perf_counter()
+    scheduler = FlexibleTimetableScheduler(params)
+    scheduler.update_time_structure(period_times)
+    _, fitness = scheduler.generate_timetable(**settings)
+    return {'problem': scheduler.problem, 'genome': scheduler.best_genome, 'fitness': fitness,
+            'last_run': scheduler.last_run, 'batch_ids': [batch.get('batch_id') for batch in scheduler.batches()],
+            'seconds': time.perf_counter() - started}
+
+
+def _faculty(params: Dict[str, Any]) -> set:
+    return {config['faculty'] for batch in params['batches'] for config in batch['subject_configs']
+            if config.get('faculty')}
+
+
+def independent_groups(params: Dict[str, Dict[str, Any]]) -> List[List[str]]:
+    """Department codes grouped so that no two groups share a faculty member"""
+    parent = {code: code for code in params}
+
+    def root(code):
+        while parent[code] != code:
+            parent[code] = parent[parent[code]]
+            code = parent[code]
+        return code
+
+    teaches: Dict[str, str] = {}
+    for code, department in params.items():
+        for name in _faculty(department):
+            if name in teaches:
+                parent[root(code)] = root(teaches[name])
+            else:
+                teaches[name] = code
+    groups: Dict[str, List[str]] = {}
+    for code in params:
+        groups.setdefault(root(code), []).append(code)
+    return list(groups.values())
+
+
+def merge_params(params: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One problem's parameters from several departments' (see problem_loader)"""
+    if len(params) == 1:
+        return params[0]
+    merged = {'batches': [], 'rooms': [], 'faculty_unavailable': {}, 'alternates': []}
+    rooms = set()
+    for department in params:
+        merged['batches'] += department['batches']
+        merged['rooms'] += [room for room in department['rooms'] if room['code'] not in rooms]
+        rooms.update(room['code'] for room in department['rooms'])
+        for name, bits in department['faculty_unavailable'].items():
+            merged['faculty_unavailable'][name] = merged['faculty_unavailable'].get(name, 0) | bits
+        merged['alternates'] += [alt for alt in department['alternates'] if alt not in merged['alternates']]
+    return merged
+
+
+def schedule_departments(session, department_ids: Optional[List[int]] = None, settings: Optional[Dict] = None,
+                         workers: Optional[int] = None, subjects: Optional[Dict[str, List[str]]] = None,
+                         **details) -> List[Dict[str, Any]]:
+    """Solve every department (or those in department_ids) in parallel and store the drafts.
+
+    subjects maps department codes to the subject codes their batches
+    take (by default the department's own and the common subjects, see
+    problem_loader). Departments
+    sharing faculty are solved as one problem (see independent_groups).
+    settings are generate_timetable() arguments;
+    details are further Timetable columns (academic_year, semester,
+    generated_by, ...). Returns one report per problem with 'name' (its
+    department codes), 'status' ('done', 'skipped' with nothing to
+    schedule, or 'failed' with an 'error'), 'timetable_id', 'batches',
+    'fitness', 'violations' (hard constraints broken), 'clashes' and
+    'seconds'.
+    """
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+    defaults = FlexibleTimetableScheduler({})
+    query = session.query(Department.id, Department.code).order_by(Department.id)
+    if department_ids:
+        query = query.filter(Department.id.in_(department_ids))
+
+    # Everything is read before the pool starts; workers never touch the database
+    ids, loaded = {}, {}
+    for department_id, code in query.all():
+        ids[code] = department_id
+        loaded[code] = load_department_params(session, department_id, defaults.days, defaults.period_times,
+                                              (subjects or {}).get(code))
+
+    groups = independent_groups(loaded)
+    if len(groups) == 1 and len(loaded) > 1:
+        logger.warning("All %d departments share faculty, so they are solved as one problem without any "
+                       "parallelism; link subjects to their departments (Subject.department_id) or pass "
+                       "--subjects to split them", len(loaded))
+    reports, tasks = [], {}
+    for group in groups:
+        params = merge_params([loaded[code] for code in group])
+        report = {'name': "+".join(group), 'department_id': ids[group[0]] if len(group) == 1 else None,
+                  'status': 'failed', 'timetable_id': None, 'batches': len(params['batches']), 'fitness': None,
+                  'violations': {}, 'clashes': 0, 'seconds': 0.0, 'error': None}
+        reports.append(report)
+        if not any(batch['subject_configs'] for batch in params['batches']):
+            report['status'] = 'skipped'
+            continue
+        tasks[len(reports) - 1] = (params, defaults.period_times, settings)
+    logger.info("Solving %d independent problems from %d departments", len(tasks), len(loaded))
+
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, max(1, len(tasks)))) as pool:
+        futures = {pool.submit(_solve, task): i for i, task in tasks.items()}
+        for future in as_completed(futures):
+            report = reports[futures[future]]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.exception("Scheduling %s failed", report['name'])
+                report['error'] = str(e)[:500]
+                continue
+            timetable = store_timetable(session, result['problem'], result['genome'], result['fitness'],
+                                        result['batch_ids'], department_id=report['department_id'],
+                                        name=f"{report['name']} (generated)", **details)
+            session.commit()
+            violations = result['last_run'].get('violations') or {}
+            report.update(status='done', timetable_id=timetable.id, fitness=result['fitness'],
+                          seconds=result['seconds'],
+                          violations={name: violations[name] for name in HARD_CONSTRAINTS if violations.get(name)})
+            logger.info("%s stored as draft %d (fitness %.1f, %.1fs)", report['name'], timetable.id,
+                        result['fitness'], result['seconds'])
+
+    # Drafts are checked in order against the approved timetables and the drafts before them
+    index = ClashIndex.from_session(session)
+    for report in reports:
+        if report['status'] == 'done':
+            report['clashes'] = len(index.check_timetable(session, report['timetable_id']))
+            index.add_timetable(session, report['timetable_id'])
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate draft timetables for every department")
+    parser.add_argument('--db', default=DEFAULT_DB_URL, help="database URL")
+    parser.add_argument('--department-id', type=int, action='append', help="only these departments (repeatable)")
+    parser.add_argument('--subjects', action='append', default=[], metavar='DEPT=CODE,...',
+                        help="subject codes a department's batches take (repeatable; default: its own subjects)")
+    parser.add_argument('--academic-year')
+    parser.add_argument('--semester', type=int)
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--algorithm', choices=list(ALGORITHMS), default='ga')
+    parser.add_argument('--pop-size', type=int, default=DEFAULT_SETTINGS['pop_size'])
+    parser.add_argument('--generations', type=int, default=DEFAULT_SETTINGS['ngen'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_SETTINGS['seed'])
+    parser.add_argument('--time-budget', type=float, help="seconds per department")
+    parser.add_argument('--stagnation', type=int, help="stop after this many generations without improvement")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+
+    settings = {'algorithm': args.algorithm, 'pop_size': args.pop_size, 'ngen': args.generations,
+                'seed': args.seed, 'time_budget': args.time_budget, 'stagnation': args.stagnation}
+    subjects = {code: codes.split(',') for code, codes in (item.split('=', 1) for item in args.subjects)}
+    started = time.perf_counter()
+    with session_scope(args.db) as session:
+        reports = schedule_departments(session, args.department_id, settings, args.workers, subjects,
+                                       academic_year=args.academic_year, semester=args.semester)
+    wall = time.perf_counter() - started
+
+    print(f"{'Problem':<12} {'Batches':>7} {'Fitness':>8} {'Seconds':>8} {'Clashes':>7}  Result")
+    for r in reports:
+        if r['status'] != 'done':
+            result = "nothing to schedule" if r['status'] == 'skipped' else f"FAILED: {r['error']}"
+            print(f"{r['name']:<12} {r['batches']:>7} {'-':>8} {'-':>8} {'-':>7}  {result}")
+            continue
+        broken = ", ".join(f"{name} {count}" for name, count in r['violations'].items())
+        print(f"{r['name']:<12} {r['batches']:>7} {r['fitness']:>8.1f} {r['seconds']:>8.1f} "
+              f"{r['clashes']:>7}  draft {r['timetable_id']}" + (f" ({broken})" if broken else ""))
+    solved = [r for r in reports if r['status'] == 'done']
+    solve_time = sum(r['seconds'] for r in solved)
+    # With one problem there is nothing to run side by side
+    speedup = f", {solve_time / wall:.1f}x parallel speedup" if len(solved) > 1 and wall else ""
+    print(f"Generated {len(solved)} of {len(reports)} problems in {wall:.1f}s ({solve_time:.1f}s of solving{speedup})")
+    return 1 if any(r['status'] == 'failed' for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# schedule_index.py - PER-FACULTY SCHEDULE INDEX
+"""Inverted index of approved timetables: faculty -> the classes they teach.
+
+The index is built from the approved TimetableEntry rows with one query
+and then kept current by approve_timetable() (and withdraw_timetable()),
+which only load the entries of the timetable that changed. Approvals made
+elsewhere (csv_import, schedule_all, queue workers, other app processes)
+are picked up by refresh_index(), which default_schedule_index() runs on
+every call: it compares approval times by id and reloads only the
+timetables approved, re-approved or withdrawn since. A faculty
+member's weekly schedule across every batch is a dict lookup plus a sort
+of their own few dozen classes, never a scan of every timetable.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from ga_scheduler import normalize_name
+from models import (DEFAULT_DB_URL, ApprovalStatus, Faculty, Room, Subject, Timetable, TimetableEntry, User,
+                    session_scope)
+
+logger = logging.getLogger(__name__)
+
+# Fields of one indexed class, in tuple order
+SLOT_FIELDS = ('timetable_id', 'timetable', 'day', 'period', 'subject', 'kind', 'room', 'batch_id')
+
+
+def _entry_query(session):
+    return (session.query(TimetableEntry.faculty_id, User.full_name, TimetableEntry.timetable_id, Timetable.name,
+                          TimetableEntry.day_of_week, TimetableEntry.time_slot, Subject.code,
+                          TimetableEntry.session_type, Room.code, TimetableEntry.batch_id)
+            .join(Timetable, TimetableEntry.timetable_id == Timetable.id)
+            .join(Faculty, TimetableEntry.faculty_id == Faculty.id)
+            .outerjoin(User, Faculty.user_id == User.id)
+            .outerjoin(Subject, TimetableEntry.subject_id == Subject.id)
+            .outerjoin(Room, TimetableEntry.room_id == Room.id))
+
+
+class FacultyScheduleIndex:
+    """faculty id -> sorted (timetable_id, timetable, day, period, subject, kind, room, batch_id) tuples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: Dict[int, List[tuple]] = {}
+        self._by_name: Dict[str, int] = {}
+        self._timetables: Dict[int, set] = {}
+        # Approval time of every timetable indexed as approved (see refresh_index)
+        self.approved: Dict[int, Optional[datetime]] = {}
+
+    @classmethod
+    def from_session(cls, session) -> 'FacultyScheduleIndex':
+        """Index of every approved timetable"""
+        index = cls()
+        index.approved = approved_timetables(session)
+        index._add(_entry_query(session).filter(Timetable.status == ApprovalStatus.APPROVED).all())
+        logger.info("Indexed %d approved timetables for %d faculty", len(index._timetables), len(index._slots))
+        return index
+
+    def add_timetable(self, session, timetable_id: int):
+        """Index (or re-index) one timetable's entries"""
+        rows = _entry_query(session).filter(TimetableEntry.timetable_id == timetable_id).all()
+        with self._lock:
+            self._remove(timetable_id)
+        self._add(rows)
+
+    def remove_timetable(self, timetable_id: int):
+        with self._lock:
+            self._remove(timetable_id)
+
+    def _add(self, rows):
+        with self._lock:
+            touched = set()
+            for faculty_id, name, timetable_id, timetable, day, period, subject, kind, room, batch_id in rows:
+                if day is None or period is None:
+                    continue
+                self._slots.setdefault(faculty_id, []).append(
+                    (timetable_id, timetable, day, period, subject, kind.value if kind else None, room, batch_id))
+                self._timetables.setdefault(timetable_id, set()).add(faculty_id)
+                if name:
+                    self._by_name[normalize_name(name)] = faculty_id
+                touched.add(faculty_id)
+            for faculty_id in touched:
+                self._slots[faculty_id].sort(key=lambda slot: (slot[2], slot[3], slot[0]))
+
+    def _remove(self, timetable_id):
+        for faculty_id in self._timetables.pop(timetable_id, ()):
+            slots = [slot for slot in self._slots.get(faculty_id, []) if slot[0] != timetable_id]
+            if slots:
+                self._slots[faculty_id] = slots
+            else:
+                self._slots.pop(faculty_id, None)
+
+    # ----- lookups -----
+    def schedule(self, faculty_id: int) -> List[Dict[str, Any]]:
+        """Classes of one faculty member, by day and period"""
+        with self._lock:
+            slots = list(self._slots.get(faculty_id, ()))
+        return [dict(zip(SLOT_FIELDS, slot)) for slot in slots]
+
+    def schedule_by_name(self, name: str) -> List[Dict[str, Any]]:
+        """schedule() by display name, however it is punctuated"""
+        faculty_id = self._by_name.get(normalize_name(name))
+        return self.schedule(faculty_id) if faculty_id is not None else []
+
+    def weekly_schedule(self, faculty_id: int, days: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """schedule() grouped under day names (day_of_week indexes days)"""
+        week = {day: [] for day in days}
+        for slot in self.schedule(faculty_id):
+            if 0 <= slot['day'] < len(days):
+                week[days[slot['day']]].append(slot)
+        return week
+
+    def faculty_id(self, name: str) -> Optional[int]:
+        return self._by_name.get(normalize_name(name))
+
+
+def approved_timetables(session) -> Dict[int, Optional[datetime]]:
+    """Approval time of every approved timetable, by id"""
+    return dict(session.query(Timetable.id, Timetable.approved_at)
+                .filter(Timetable.status == ApprovalStatus.APPROVED).all())
+
+
+def refresh_index(session, index) -> int:
+    """Bring a schedule or clash index up to date with approvals made anywhere.
+
+    Only timetables approved (or re-approved) or withdrawn since the index
+    last saw them are reloaded. Returns how many changed.
+    """
+    current = approved_timetables(session)
+    known = dict(index.approved)
+    withdrawn = [timetable_id for timetable_id in known if timetable_id not in current]
+    changed = [timetable_id for timetable_id, approved_at in current.items()
+               if timetable_id not in known or known[timetable_id] != approved_at]
+    for timetable_id in withdrawn:
+        index.remove_timetable(timetable_id)
+    for timetable_id in changed:
+        index.add_timetable(session, timetable_id)
+    index.approved = current
+    if withdrawn or changed:
+        logger.info("Refreshed index: %d timetables approved, %d withdrawn elsewhere", len(changed), len(withdrawn))
+    return len(withdrawn) + len(changed)
+
+
+def approve_timetable(session, timetable_id: int, approved_by: Optional[int] = None,
+                      index: Optional[FacultyScheduleIndex] = None, clash_index=None) -> Timetable:
+    """Mark a timetable approved, commit, and add its entries to the schedule and clash indexes.
+
+    Clashes are not checked here; see clash_detection.ClashIndex.check_timetable().
+    """
+    timetable = session.get(Timetable, timetable_id)
+    if timetable is None:
+        raise ValueError(f"No timetable with id {timetable_id}")
+    timetable.status = ApprovalStatus.APPROVED
+    timetable.approved_by = approved_by
+    timetable.approved_at = datetime.utcnow()
+    timetable.rejection_reason = None
+    session.commit()
+    for target in (index, clash_index):
+        if target is not None:
+            target.add_timetable(session, timetable_id)
+            target.approved[timetable_id] = timetable.approved_at
+    return timetable
+
+
+def withdraw_timetable(session, timetable_id: int, reason: Optional[str] = None,
+                       index: Optional[FacultyScheduleIndex] = None, clash_index=None) -> Timetable:
+    """Send a timetable back (rejected), commit, and drop it from the schedule and clash indexes"""
+    timetable = session.get(Timetable, timetable_id)
+    if timetable is None:
+        raise ValueError(f"No timetable with id {timetable_id}")
+    timetable.status = ApprovalStatus.REJECTED
+    timetable.rejection_reason = reason
+    session.commit()
+    for target in (index, clash_index):
+        if target is not None:
+            target.remove_timetable(timetable_id)
+            target.approved.pop(timetable_id, None)
+    return timetable
+
+
+_indexes: Dict[str, FacultyScheduleIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def default_schedule_index(db_url: str = DEFAULT_DB_URL) -> FacultyScheduleIndex:
+    """Process-wide index of the approved timetables in db_url, built on first use and refreshed on every call"""
+    with _indexes_lock, session_scope(db_url) as session:
+        index = _indexes.get(db_url)
+        if index is None:
+            index = _indexes[db_url] = FacultyScheduleIndex.from_session(session)
+        else:
+            refresh_index(session, index)
+        return index
@@ -0,0 +1,181 @@
+# solver_cache.py - CONTENT-ADDRESSED SOLVER RESULT CACHE
+"""Two-tier cache of solver results keyed by a hash of the full solver input.
+
+The memory tier is a small LRU for repeats within one process. The disk
+tier keeps one .npz file per result under a size cap, evicting the least
+recently used files first, so results survive Streamlit restarts.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when a solver change makes old results stale
+CACHE_VERSION = 1
+
+# Where results are kept between runs
+DEFAULT_CACHE_DIR = os.environ.get("TIMETABLE_CACHE_DIR", ".solver_cache")
+
+# Results held in memory
+DEFAULT_MEMORY_ENTRIES = 32
+
+# Disk budget in bytes
+DEFAULT_DISK_BYTES = 64 * 1024 * 1024
+
+
+def _plain(value):
+    """JSON fallback for NumPy scalars and arrays"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def content_key(inputs: Dict[str, Any]) -> str:
+    """Stable SHA-256 of solver inputs (dict order and tuple vs list don't matter)"""
+    payload = json.dumps({'version': CACHE_VERSION, 'inputs': inputs}, sort_keys=True, default=_plain)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SolverCache:
+    """Memory LRU in front of a size-capped directory of results"""
+
+    def __init__(self, directory: Optional[str] = DEFAULT_CACHE_DIR, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self._memory: 'OrderedDict[str, Tuple[np.ndarray, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'memory_evictions': 0, 'disk_evictions': 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        lookups = hits + self.stats['misses']
+        return hits / lookups if lookups else 0.0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """(genome, metadata) stored under key, or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                genome, meta = self._memory[key]
+                return genome.copy(), dict(meta)
+            entry = self._read(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, entry)
+            return entry[0].copy(), dict(entry[1])
+
+    def put(self, key: str, genome: np.ndarray, meta: Dict[str, Any]):
+        """Store a result in both tiers"""
+        entry = (np.array(genome, dtype=np.int16), json.loads(json.dumps(meta, default=_plain)))
+        with self._lock:
+            self._remember(key, entry)
+            self._write(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            for name in self._files():
+                os.remove(os.path.join(self.directory, name))
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters plus current tier sizes, for the stats panel"""
+        with self._lock:
+            files = self._files()
+            disk = sum(os.path.getsize(os.path.join(self.directory, name)) for name in files)
+            return dict(self.stats, hit_rate=self.hit_rate, memory_entries=len(self._memory),
+                        disk_entries=len(files), disk_bytes=disk)
+
+    # ----- tiers -----
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats['memory_evictions'] += 1
+
+    def _files(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if name.endswith('.npz')]
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                genome = data['genome']
+                meta = json.loads(data['meta'].tobytes().decode())
+            # The modification time doubles as the disk tier's recency
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Dropping unreadable cache entry %s: %s", path, e)
+            os.remove(path)
+            return None
+        return genome, meta
+
+    def _write(self, key, entry):
+        if not self.directory:
+            return
+        genome, meta = entry
+        handle, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as f:
+            np.savez(f, genome=genome, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8))
+        # Readers in other sessions only ever see complete files
+        os.replace(temp, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in self._files():
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats['disk_evictions'] += 1
+
+
+_default_cache: Optional[SolverCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> SolverCache:
+    """Process-wide cache in DEFAULT_CACHE_DIR, shared by every Streamlit session"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SolverCache()
+        return _default_cache
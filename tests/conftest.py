@@ -0,0 +1,99 @@
+# conftest.py - SHARED TEST FIXTURES
+"""Small problems and throwaway databases for the tests.
+
+The modules live at the repository root, which is put on the import path
+here so the tests run with a plain `python -m pytest` from there.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ga_scheduler import FlexibleTimetableScheduler, TimetableProblem  # noqa: E402
+
+
+@pytest.fixture
+def scheduler():
+    return FlexibleTimetableScheduler({})
+
+
+@pytest.fixture
+def problem(scheduler):
+    """Two sections sharing faculty and rooms, so every penalty term can fire.
+
+    One section has avoided and preferred days, and one lecturer is
+    unavailable on Tuesdays.
+    """
+    configs = scheduler.default_subject_configs()
+    varied = [dict(config, avoid_day='Monday' if i % 2 else None,
+                   preferred_days=['Monday', 'Tuesday'] if i % 3 else [])
+              for i, config in enumerate(configs)]
+    batches = [{'name': 'A', 'strength': 60, 'subject_configs': varied,
+                'fixed_slots': [{'day': 'Monday', 'period': 0, 'subject': 'APTITUDE'}]},
+               {'name': 'B', 'strength': 60, 'subject_configs': configs}]
+    # One room of each kind for both sections, so they compete for it
+    rooms = [{'code': 'R-101', 'room_type': 'theory_room', 'capacity': 60},
+             {'code': 'LAB-1', 'room_type': 'lab_room', 'capacity': 60}]
+    periods = len(scheduler.period_times)
+    # Tuesday blocked for one lecturer
+    unavailable = {configs[1]['faculty']: ((1 << periods) - 1) << (1 * periods)}
+    return TimetableProblem(scheduler.days, scheduler.period_times, batches,
+                            max_periods_per_day=5, max_classes_per_faculty=5,
+                            faculty_unavailable=unavailable, rooms=rooms)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    """URL of a new, empty SQLite database with the full schema"""
+    pytest.importorskip("sqlalchemy")
+    from models import get_engine
+    url = f"sqlite:///{tmp_path / 'timetable.db'}"
+    get_engine(url)
+    return url
+
+
+# Subjects named so that the tokens of the exported CSVs resolve (EMF by alias, EDC and PRP by acronym)
+SUBJECTS = [('U24EC311', "Electromagnetic Fields"), ('U24EC312', "Electronic Devices and Circuits"),
+            ('U24EC313', "Signals and Systems"), ('U24GE301', "Aptitude"),
+            ('U24MA301', "Probability and Random Processes")]
+
+
+@pytest.fixture
+def subjects_db(db_url):
+    """db_url with SUBJECTS in it"""
+    from models import Subject, session_scope
+    with session_scope(db_url) as session:
+        session.add_all(Subject(code=code, name=name) for code, name in SUBJECTS)
+    return db_url
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Writes an exported grid CSV (a list of rows) under tmp_path and returns its path"""
+    def write(name, rows):
+        path = tmp_path / name
+        path.write_text("\n".join(",".join(row) for row in rows) + "\n")
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def staffed_db(subjects_db):
+    """subjects_db with one lecturer, 'Ms. A. Teacher', as primary faculty of every subject"""
+    from models import Faculty, FacultySubject, Subject, User, UserRole, session_scope
+    with session_scope(subjects_db) as session:
+        user = User(username='teacher', password_hash='-', role=UserRole.FACULTY, full_name='Ms. A. Teacher')
+        faculty = Faculty(user=user, employee_id='F001')
+        session.add(faculty)
+        session.flush()
+        session.add_all(FacultySubject(faculty_id=faculty.id, subject_id=subject_id, is_primary=True)
+                        for (subject_id,) in session.query(Subject.id))
+    return subjects_db
@@ -0,0 +1,34 @@
+# test_clash_detection.py - CLASH DETECTION TESTS
+"""The process-wide clash index follows approvals made outside this process."""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from clash_detection import default_clash_index  # noqa: E402
+from csv_import import import_timetables  # noqa: E402
+from models import ApprovalStatus, Timetable, session_scope  # noqa: E402
+
+GRID = [['', '1', '2', '3', '4', '5', '6', '7', '8'],
+        ['MON', 'EMF', '-1', '-1', '-1', '-1', '-1', '-1', '-1']]
+
+
+def test_default_index_sees_approvals_made_elsewhere(staffed_db, write_csv):
+    with session_scope(staffed_db) as session:
+        [approved] = import_timetables(session, [write_csv('approved.csv', GRID)])
+        [draft] = import_timetables(session, [write_csv('draft.csv', GRID)])
+        # The index is built while neither is approved
+        session.get(Timetable, draft['timetable_id']).status = ApprovalStatus.DRAFT
+        session.get(Timetable, approved['timetable_id']).status = ApprovalStatus.DRAFT
+        session.commit()
+        assert default_clash_index(staffed_db).check_timetable(session, draft['timetable_id']) == []
+
+        # Approved by another process: the same lecturer on Monday P1
+        session.get(Timetable, approved['timetable_id']).status = ApprovalStatus.APPROVED
+        session.commit()
+        clashes = default_clash_index(staffed_db).check_timetable(session, draft['timetable_id'])
+        assert [(clash['type'], clash['other_timetable_id']) for clash in clashes] == \
+            [('faculty', approved['timetable_id'])]
+
+        session.get(Timetable, approved['timetable_id']).status = ApprovalStatus.REJECTED
+        session.commit()
+        assert default_clash_index(staffed_db).check_timetable(session, draft['timetable_id']) == []
@@ -0,0 +1,66 @@
+# test_csv_import.py - CSV IMPORT TESTS
+"""Exported grid CSVs are imported as approved timetables, with every problem reported by row."""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from csv_import import import_timetables, main  # noqa: E402
+from models import ApprovalStatus, Timetable, TimetableEntry, session_scope  # noqa: E402
+
+HEADER = ['', '1', '2', '3', '4', '5', '6', '7', '8']
+MONDAY = ['MON', 'EMF', 'EMF', 'EDC', 'Signals', '-1', 'Aptitude', 'PRP', 'Probability']
+
+
+def test_clean_file_is_imported(subjects_db, write_csv):
+    path = write_csv('good.csv', [HEADER, MONDAY, ['TUE', 'EDC', '-1', '', 'free', 'EMF', 'EMF', 'EMF', 'EMF']])
+    with session_scope(subjects_db) as session:
+        [report] = import_timetables(session, [path], academic_year='2025-2026', semester=3)
+        assert report['errors'] == []
+        assert report['entries'] == 7 + 5
+        timetable = session.get(Timetable, report['timetable_id'])
+        assert timetable.name == 'good' and timetable.status == ApprovalStatus.APPROVED
+        assert session.query(TimetableEntry).filter_by(timetable_id=timetable.id).count() == 12
+
+
+def test_bad_rows_are_reported_by_row(subjects_db, write_csv):
+    path = write_csv('bad.csv', [
+        HEADER,
+        MONDAY,
+        [],                                                                   # blank lines are not counted
+        ['XYZ', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF'],      # row 3
+        ['Monday', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF'],   # row 4
+        ['TUE', 'EMF', 'EDC'],                                                # row 5
+        ['WED', 'Quantum', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF', 'EMF'],  # row 6
+    ])
+    with session_scope(subjects_db) as session:
+        [report] = import_timetables(session, [path])
+    assert report['errors'] == [
+        (3, "Unknown day 'XYZ'"),
+        (4, "Monday appears twice"),
+        (5, "Expected 8 periods, found 2"),
+        (6, "Unknown subject 'Quantum' in period 1"),
+    ]
+    # The valid classes of a file with problems are still imported
+    assert report['timetable_id'] is not None
+    assert report['entries'] == 7 + 2 + 7
+
+
+def test_unusable_files_are_skipped(subjects_db, write_csv):
+    header = write_csv('header.csv', [['day', 'a', 'b'], MONDAY])
+    empty = write_csv('empty.csv', [HEADER, ['MON'] + ['-1'] * 8])
+    with session_scope(subjects_db) as session:
+        reports = import_timetables(session, [header, empty, header + '.missing'])
+        assert session.query(Timetable).count() == 0
+    assert [report['timetable_id'] for report in reports] == [None, None, None]
+    assert reports[0]['errors'][0][0] == 1 and 'period numbers' in reports[0]['errors'][0][1]
+    assert reports[1]['errors'] == [(0, "No valid classes")]
+    assert reports[2]['errors'][0][1].startswith("Unreadable")
+
+
+def test_cli_prints_each_problem(subjects_db, write_csv, capsys):
+    good = write_csv('good.csv', [HEADER, MONDAY])
+    bad = write_csv('bad.csv', [HEADER, MONDAY, ['XYZ', 'EMF']])
+    assert main([good, bad, '--db', subjects_db]) == 0
+    out = capsys.readouterr().out
+    assert f"{bad}: row 3: Unknown day 'XYZ'" in out
+    assert "Imported 2 of 2 files" in out
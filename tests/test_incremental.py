@@ -0,0 +1,57 @@
+# test_incremental.py - INCREMENTAL EVALUATION TESTS
+"""IncrementalEvaluator must always agree with a full FitnessEvaluator re-score."""
+import pytest
+
+from ga_scheduler import FitnessEvaluator, IncrementalEvaluator
+
+
+def _random_swap(problem, rng):
+    """Two movable cells of one batch"""
+    batch = rng.integers(problem.n_batches)
+    start = problem.segment_start[batch]
+    cells = problem.movable_cells[start:start + problem.segment_length[batch]]
+    a, b = rng.choice(cells, 2)
+    return int(a), int(b)
+
+
+def test_initial_penalty_matches_full_score(problem, rng):
+    evaluator = FitnessEvaluator(problem)
+    genome = problem.random_population(1, rng)[0]
+    state = IncrementalEvaluator(evaluator, genome)
+    assert state.penalty == pytest.approx(evaluator.evaluate(genome[None])[0])
+
+
+def test_fixture_breaks_the_clash_constraints(problem, rng):
+    evaluator = FitnessEvaluator(problem)
+    genome = problem.random_population(1, rng)[0]
+    counts = {name: int(values[0]) for name, values in evaluator.violations(genome[None]).items()}
+    for name in ('room_clash', 'faculty_unavailable', 'faculty_clash', 'lab_before_theory'):
+        assert counts[name] > 0, name
+
+
+def test_delta_equals_full_rescore(problem, rng):
+    evaluator = FitnessEvaluator(problem)
+    state = IncrementalEvaluator(evaluator, problem.random_population(1, rng)[0])
+    changed = set()
+    for _ in range(500):
+        counts = dict(state.counts)
+        a, b = _random_swap(problem, rng)
+        before = evaluator.evaluate(state.genome[None])[0]
+        delta = state.delta_swap(a, b)
+        state.swap(a, b)
+        after = evaluator.evaluate(state.genome[None])[0]
+        assert delta == pytest.approx(after - before)
+        assert state.penalty == pytest.approx(after)
+        changed |= {name for name, count in state.counts.items() if count != counts[name]}
+    # Every term's delta was checked, not just its constant contribution
+    assert {name for name, _ in evaluator.terms} <= changed
+
+
+def test_violation_counts_match_full_score(problem, rng):
+    evaluator = FitnessEvaluator(problem)
+    state = IncrementalEvaluator(evaluator, problem.random_population(1, rng)[0])
+    for _ in range(200):
+        state.swap(*_random_swap(problem, rng))
+    full = {name: int(counts[0]) for name, counts in evaluator.violations(state.genome[None]).items()}
+    counts = state.violations()
+    assert {name: counts[name] for name in full} == full
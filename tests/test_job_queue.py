@@ -0,0 +1,121 @@
+# test_job_queue.py - JOB QUEUE TESTS
+"""Identical requests share one job, and every job is claimed by exactly one worker."""
+import threading
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from job_queue import cancel_job, claim_next_job, submit_job  # noqa: E402
+from models import JobStatus, TimetableJob, session_scope  # noqa: E402
+
+SETTINGS = {'pop_size': 6, 'ngen': 2, 'seed': 1}
+
+
+def test_identical_requests_share_a_job(db_url, scheduler):
+    with session_scope(db_url) as session:
+        first = submit_job(session, {}, scheduler.period_times, SETTINGS, priority=1)
+        # Live objects in the parameters are not part of the request
+        again = submit_job(session, {'cache': object()}, scheduler.period_times, SETTINGS, priority=5)
+        other = submit_job(session, {}, scheduler.period_times, dict(SETTINGS, seed=2))
+        assert again.id == first.id
+        assert other.id != first.id
+        # Joining a pending job can raise its priority
+        assert first.priority == 5
+        assert session.query(TimetableJob).count() == 2
+
+
+def test_finished_jobs_are_not_reused(db_url, scheduler):
+    with session_scope(db_url) as session:
+        first = submit_job(session, {}, scheduler.period_times, SETTINGS)
+        cancel_job(session, first.id)
+        assert submit_job(session, {}, scheduler.period_times, SETTINGS).id != first.id
+
+
+def test_claims_follow_priority(db_url, scheduler):
+    with session_scope(db_url) as session:
+        low = submit_job(session, {}, scheduler.period_times, dict(SETTINGS, seed=1), priority=0)
+        high = submit_job(session, {}, scheduler.period_times, dict(SETTINGS, seed=2), priority=3)
+        assert claim_next_job(session, 'w').id == high.id
+        claimed = claim_next_job(session, 'w')
+        assert claimed.id == low.id
+        assert claimed.status == JobStatus.RUNNING and claimed.worker == 'w'
+        assert claim_next_job(session, 'w') is None
+
+
+def test_each_job_is_claimed_once(db_url, scheduler):
+    with session_scope(db_url) as session:
+        ids = {submit_job(session, {}, scheduler.period_times, dict(SETTINGS, seed=seed)).id
+               for seed in range(20)}
+
+    claims, errors = [], []
+
+    def work(name):
+        try:
+            with session_scope(db_url) as session:
+                job = claim_next_job(session, name)
+                while job is not None:
+                    claims.append((job.id, name))
+                    job = claim_next_job(session, name)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert not errors
+    assert sorted(job_id for job_id, _ in claims) == sorted(ids)
+    with session_scope(db_url) as session:
+        owners = dict(session.query(TimetableJob.id, TimetableJob.worker))
+    assert all(owners[job_id] == name for job_id, name in claims)
+
+
+def test_solve_holds_no_connection(db_url, scheduler, monkeypatch):
+    import job_queue
+    from models import get_engine, get_session_factory
+
+    with session_scope(db_url) as session:
+        job_id = submit_job(session, {}, scheduler.period_times, SETTINGS).id
+        claim_next_job(session, 'w')
+    pool = get_engine(db_url).pool
+    checked_out = []
+    solve = job_queue.FlexibleTimetableScheduler.generate_timetable
+
+    def generate(self, progress=None, **settings):
+        checked_out.append(pool.checkedout())
+        progress({'generation': 1})
+        checked_out.append(pool.checkedout())
+        return solve(self, **settings)
+
+    monkeypatch.setattr(job_queue, 'PROGRESS_INTERVAL', 0.0)
+    monkeypatch.setattr(job_queue.FlexibleTimetableScheduler, 'generate_timetable', generate)
+    job_queue.run_job(get_session_factory(db_url), job_id)
+
+    assert checked_out == [0, 0]
+    with session_scope(db_url) as session:
+        job = session.get(TimetableJob, job_id)
+        assert job.status == JobStatus.DONE and job.timetable_id is not None
+        assert job.progress == {'generation': 1}
+
+
+def test_failures_and_cancellation_are_recorded(db_url, scheduler):
+    import job_queue
+    from models import get_session_factory
+
+    Session = get_session_factory(db_url)
+    with session_scope(db_url) as session:
+        failing = submit_job(session, {}, scheduler.period_times, dict(SETTINGS, algorithm='nope')).id
+        cancelled = submit_job(session, {}, scheduler.period_times, dict(SETTINGS, ngen=None, stagnation=10**6)).id
+        claim_next_job(session, 'w')
+        claim_next_job(session, 'w')
+        cancel_job(session, cancelled)
+
+    job_queue.run_job(Session, failing)
+    job_queue.run_job(Session, cancelled)
+    with session_scope(db_url) as session:
+        job = session.get(TimetableJob, failing)
+        assert job.status == JobStatus.FAILED and 'nope' in job.error
+        assert session.get(TimetableJob, cancelled).status == JobStatus.CANCELLED
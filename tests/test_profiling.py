@@ -0,0 +1,29 @@
+# test_profiling.py - SOLVER PROFILING TESTS
+"""Profiles are complete whichever backend runs, including the island workers."""
+from ga_scheduler import FlexibleTimetableScheduler
+from profiling import SolverProfiler
+
+
+def test_take_and_merge_add_up():
+    worker, main = SolverProfiler(enabled=True), SolverProfiler(enabled=True)
+    worker.record_generation({'selection': 0.5, 'crossover': 0.25})
+    main.record_generation({'selection': 1.0})
+    main.merge(worker.take())
+    assert worker.to_dict()['generations'] == 0
+    summary = main.to_dict()
+    assert summary['generations'] == 2
+    assert summary['operators']['selection'] == {'calls': 2, 'seconds': 1.5, 'per_generation_ms': 750.0}
+    assert summary['operators']['crossover']['calls'] == 1
+
+
+def test_island_runs_are_profiled():
+    single = FlexibleTimetableScheduler({'profile': True})
+    single.generate_timetable(pop_size=16, ngen=4, seed=1)
+    islands = FlexibleTimetableScheduler({'profile': True})
+    islands.generate_timetable(pop_size=16, ngen=4, seed=1, islands=2)
+
+    profile = islands.last_run['profile']
+    assert profile['generations'] == 2 * 4
+    assert set(profile['operators']) == set(single.last_run['profile']['operators'])
+    assert set(profile['constraints']) == set(single.last_run['profile']['constraints'])
+    assert all(constraint['checks'] > 0 for constraint in profile['constraints'].values())
@@ -0,0 +1,51 @@
+# test_schedule_index.py - FACULTY SCHEDULE INDEX TESTS
+"""The process-wide schedule index follows approvals made outside this process."""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from csv_import import import_timetables  # noqa: E402
+from models import ApprovalStatus, Timetable, session_scope  # noqa: E402
+from schedule_index import approve_timetable, default_schedule_index, withdraw_timetable  # noqa: E402
+
+GRID = [['', '1', '2', '3', '4', '5', '6', '7', '8'],
+        ['MON', 'EMF', 'EDC', '-1', '-1', '-1', '-1', '-1', '-1']]
+
+
+def _import(db_url, path):
+    """Approve a timetable the way csv_import does, without telling any index"""
+    with session_scope(db_url) as session:
+        [report] = import_timetables(session, [path])
+    return report['timetable_id']
+
+
+def test_default_index_sees_approvals_made_elsewhere(staffed_db, write_csv):
+    index = default_schedule_index(staffed_db)
+    faculty_id = index.faculty_id('Ms. A. Teacher')
+    assert faculty_id is None and index.schedule_by_name('Ms. A. Teacher') == []
+
+    first = _import(staffed_db, write_csv('first.csv', GRID))
+    index = default_schedule_index(staffed_db)
+    assert [(slot['timetable_id'], slot['subject']) for slot in index.schedule_by_name('Ms A Teacher')] == \
+        [(first, 'U24EC311'), (first, 'U24EC312')]
+
+    # Withdrawn by another process
+    with session_scope(staffed_db) as session:
+        session.get(Timetable, first).status = ApprovalStatus.REJECTED
+    assert default_schedule_index(staffed_db).schedule_by_name('Ms. A. Teacher') == []
+
+
+def test_approvals_through_the_index_are_not_reloaded(staffed_db, write_csv):
+    from schedule_index import refresh_index
+
+    timetable_id = _import(staffed_db, write_csv('draft.csv', GRID))
+    with session_scope(staffed_db) as session:
+        session.get(Timetable, timetable_id).status = ApprovalStatus.DRAFT
+        session.commit()
+        index = default_schedule_index(staffed_db)
+        approve_timetable(session, timetable_id, index=index)
+        assert len(index.schedule_by_name('Ms. A. Teacher')) == 2
+        assert refresh_index(session, index) == 0
+        withdraw_timetable(session, timetable_id, index=index)
+        assert index.schedule_by_name('Ms. A. Teacher') == []
+        assert refresh_index(session, index) == 0
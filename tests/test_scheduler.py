@@ -0,0 +1,33 @@
+# test_scheduler.py - GENERATION ARGUMENT TESTS
+"""generate_timetable rejects empty runs and always gives the annealer at least one move."""
+import pytest
+
+from ga_scheduler import FlexibleTimetableScheduler
+
+
+@pytest.mark.parametrize('algorithm', ['ga', 'sa'])
+@pytest.mark.parametrize('ngen', [0, -3])
+def test_empty_runs_are_rejected(algorithm, ngen):
+    with pytest.raises(ValueError, match="ngen must be at least 1"):
+        FlexibleTimetableScheduler({}).generate_timetable(pop_size=5, ngen=ngen, algorithm=algorithm)
+
+
+def test_tiny_time_budget_still_anneals():
+    scheduler = FlexibleTimetableScheduler({})
+    scheduler.generate_timetable(pop_size=5, ngen=None, time_budget=1e-7, algorithm='sa', seed=1)
+    assert scheduler.last_run['generations'] >= 1
+    assert scheduler.last_run['stop_reason'] == 'time_budget'
+
+
+def test_benchmark_unavailability_uses_the_production_bit_layout():
+    from benchmark import unavailable_slots
+    from ga_scheduler import period_bits, time_to_minutes
+
+    scheduler = FlexibleTimetableScheduler({})
+    n = len(scheduler.period_times)
+    # Tuesday 9:00-11:30 covers periods 0, 1 and 3 around the morning break; '9:00' is not zero-padded
+    institution = {'faculty_unavailability': [{'faculty': 'X', 'day_of_week': 1, 'start_time': '9:00',
+                                               'end_time': '11:30', 'is_recurring': True}]}
+    expected = period_bits(scheduler.period_times, time_to_minutes('9:00'), time_to_minutes('11:30')) << n
+    assert expected == 0b1011 << n
+    assert unavailable_slots(institution, scheduler.period_times) == {'X': expected}
@@ -0,0 +1,48 @@
+# test_solver_cache.py - SOLVER CACHE TESTS
+"""A cached result must come back exactly as it was solved."""
+import numpy as np
+
+from ga_scheduler import FlexibleTimetableScheduler
+from solver_cache import SolverCache, content_key
+
+
+def test_round_trip_through_memory_and_disk(tmp_path):
+    genome = np.arange(24, dtype=np.int16).reshape(2, 3, 4)
+    meta = {'fitness': 87.5, 'generations': np.int64(12)}
+    cache = SolverCache(str(tmp_path))
+    cache.put('k', genome, meta)
+
+    stored, stored_meta = cache.get('k')
+    assert np.array_equal(stored, genome)
+    assert stored_meta == {'fitness': 87.5, 'generations': 12}
+
+    # A new cache on the same directory only has the disk tier
+    reopened = SolverCache(str(tmp_path))
+    stored, stored_meta = reopened.get('k')
+    assert np.array_equal(stored, genome)
+    assert stored_meta == {'fitness': 87.5, 'generations': 12}
+    assert reopened.stats['disk_hits'] == 1
+    assert reopened.get('missing') is None
+
+
+def test_content_key_ignores_dict_order():
+    assert content_key({'a': 1, 'b': [1, 2]}) == content_key({'b': [1, 2], 'a': 1})
+    assert content_key({'a': 1}) != content_key({'a': 2})
+
+
+def test_seeded_run_is_reused(tmp_path):
+    cache = SolverCache(str(tmp_path))
+    first = FlexibleTimetableScheduler({'cache': cache})
+    _, fitness = first.generate_timetable(pop_size=6, ngen=3, seed=7)
+    assert first.last_run['cached'] is False
+
+    second = FlexibleTimetableScheduler({'cache': cache})
+    _, cached_fitness = second.generate_timetable(pop_size=6, ngen=3, seed=7)
+    assert second.last_run['cached'] is True
+    assert cached_fitness == fitness
+    assert np.array_equal(second.best_genome, first.best_genome)
+
+    # Any change to the input is a different result
+    third = FlexibleTimetableScheduler({'cache': cache})
+    third.generate_timetable(pop_size=6, ngen=3, seed=8)
+    assert third.last_run['cached'] is False
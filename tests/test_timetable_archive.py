@@ -0,0 +1,70 @@
+# test_timetable_archive.py - TIMETABLE ARCHIVE TESTS
+"""Archived timetables read back as the same rows, and are only ever archived once."""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pyarrow")
+
+from csv_import import import_timetables  # noqa: E402
+from models import Subject, TimetableEntry, session_scope  # noqa: E402
+from timetable_archive import TimetableArchive  # noqa: E402
+
+HEADER = ['', '1', '2', '3', '4', '5', '6', '7', '8']
+GRID = [HEADER,
+        ['MON', 'EMF', 'EMF', 'EDC', 'Signals', '-1', 'Aptitude', 'PRP', 'Probability'],
+        ['FRI', 'EDC', '-1', '-1', 'EMF', 'EMF', 'Signals', 'Signals', '-1']]
+
+
+def _rows(table):
+    return sorted(zip(*(table[column].to_pylist() for column in ('timetable_id', 'day', 'period', 'subject'))))
+
+
+@pytest.fixture
+def approved(subjects_db, write_csv):
+    """Two approved timetables in different academic years"""
+    with session_scope(subjects_db) as session:
+        for year in ('2024-2025', '2025-2026'):
+            import_timetables(session, [write_csv(f'{year}.csv', GRID)], academic_year=year, semester=3)
+    return subjects_db
+
+
+def test_archive_then_query_returns_the_same_rows(approved, tmp_path):
+    archive = TimetableArchive(str(tmp_path / 'archive'))
+    with session_scope(approved) as session:
+        added = archive.archive(session)
+        expected = sorted(session.query(TimetableEntry.timetable_id, TimetableEntry.day_of_week,
+                                        TimetableEntry.time_slot, Subject.code)
+                          .join(Subject, TimetableEntry.subject_id == Subject.id).all())
+    assert added == {'timetables': 2, 'entries': len(expected)}
+    assert _rows(archive.query()) == expected
+
+    # Partition filters only return that year's rows
+    year = archive.query(columns=['timetable_id', 'day', 'period', 'subject', 'academic_year'],
+                         academic_year='2025-2026')
+    assert set(year['academic_year'].to_pylist()) == {'2025-2026'}
+    assert len(_rows(year)) == len(expected) // 2
+
+
+def test_archiving_again_adds_nothing(approved, tmp_path):
+    archive = TimetableArchive(str(tmp_path / 'archive'))
+    with session_scope(approved) as session:
+        archive.archive(session)
+        assert archive.archive(session) == {'timetables': 0, 'entries': 0}
+    assert archive.archived_ids() == {1, 2}
+
+
+def test_counts(approved, tmp_path):
+    archive = TimetableArchive(str(tmp_path / 'archive'))
+    with session_scope(approved) as session:
+        archive.archive(session)
+    # Friday's 4th and 5th teaching periods are slots 4 and 6 (breaks take slots 2 and 5)
+    usage = archive.slot_usage(day='Friday', periods=[4, 6], academic_year='2025-2026').to_pylist()
+    assert [(row['period'], row['classes']) for row in usage] == [(4, 1), (6, 1)]
+    top = archive.count(['subject']).to_pylist()[0]
+    assert (top['subject'], top['classes']) == ('U24EC311', 2 * 4)
+
+
+def test_empty_archive(tmp_path):
+    archive = TimetableArchive(str(tmp_path / 'archive'))
+    assert archive.archived_ids() == set()
+    assert archive.query(columns=['subject']).num_rows == 0
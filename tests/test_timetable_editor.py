@@ -0,0 +1,60 @@
+# test_timetable_editor.py - TIMETABLE EDITOR TESTS
+"""Undo and redo restore the exact timetable and score of every step."""
+import numpy as np
+import pytest
+
+from ga_scheduler import FitnessEvaluator
+from timetable_editor import TimetableEditor
+
+
+def _editable_slots(problem, batch, rng, count):
+    """(day, period) pairs of movable cells of batch"""
+    start = problem.segment_start[batch]
+    cells = problem.movable_cells[start:start + problem.segment_length[batch]]
+    return [(int(problem.cell_day[cell]), int(problem.cell_period[cell])) for cell in rng.choice(cells, count)]
+
+
+def test_undo_and_redo_restore_the_score(problem, rng):
+    editor = TimetableEditor(problem, problem.random_population(1, rng)[0])
+    evaluator = FitnessEvaluator(problem)
+    history = [(editor.genome, editor.penalty)]
+    for _ in range(30):
+        batch = int(rng.integers(problem.n_batches))
+        (day_a, period_a), (day_b, period_b) = _editable_slots(problem, batch, rng, 2)
+        result = editor.swap(batch, day_a, period_a, day_b, period_b)
+        assert result['penalty'] == pytest.approx(evaluator.evaluate(editor.genome[None])[0])
+        history.append((editor.genome, editor.penalty))
+
+    for genome, penalty in reversed(history[:-1]):
+        editor.undo()
+        assert np.array_equal(editor.genome, genome)
+        assert editor.penalty == pytest.approx(penalty)
+    assert not editor.can_undo and editor.undo() is None
+
+    for genome, penalty in history[1:]:
+        editor.redo()
+        assert np.array_equal(editor.genome, genome)
+        assert editor.penalty == pytest.approx(penalty)
+    assert not editor.can_redo
+
+
+def test_new_edit_clears_redo(problem, rng):
+    editor = TimetableEditor(problem, problem.random_population(1, rng)[0])
+    (day_a, period_a), (day_b, period_b) = _editable_slots(problem, 0, rng, 2)
+    editor.swap(0, day_a, period_a, day_b, period_b)
+    editor.undo()
+    assert editor.can_redo
+    editor.swap(0, day_a, period_a, day_b, period_b)
+    assert not editor.can_redo
+
+
+def test_fixed_slots_and_breaks_are_refused(problem, rng):
+    editor = TimetableEditor(problem, problem.random_population(1, rng)[0])
+    before = editor.genome
+    teaching = next(p for p in range(problem.n_periods) if p not in problem.break_periods and p > 0)
+    # Batch A has APTITUDE fixed on Monday P1
+    with pytest.raises(ValueError, match="fixed slot"):
+        editor.swap(0, 0, 0, 1, teaching)
+    with pytest.raises(ValueError, match="break"):
+        editor.swap(0, 1, problem.break_periods[0], 1, teaching)
+    assert np.array_equal(editor.genome, before) and not editor.can_undo
@@ -0,0 +1,235 @@
+# timetable_archive.py - COLUMNAR ARCHIVE OF APPROVED TIMETABLES
+"""Append-only Parquet archive of approved timetable entries for analytics.
+
+Each archived class is one row: timetable, department, batch, day, period,
+subject, faculty, room and session type. Text columns are dictionary-encoded
+(a few hundred distinct values across millions of rows), and files are
+partitioned by academic year and semester in Hive layout:
+
+    archive/academic_year=2025-2026/semester=3/part-<id>-0.parquet
+
+Rows come from the relational TimetableEntry table with joined queries, so
+the Timetable.generated_data JSON blobs are never decoded. Archiving
+only ever adds files; timetables already in the archive are skipped, so
+it can be run after every approval round or nightly:
+
+    python timetable_archive.py archive/
+
+Queries read only the columns they ask for, and academic year and semester
+filters prune whole partitions before any file is opened:
+
+    archive = TimetableArchive('archive')
+    archive.slot_usage(day='Friday', periods=range(5, 9), session_type='lab')
+    archive.faculty_load(academic_year='2025-2026')
+"""
+import argparse
+import logging
+import sys
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from ga_scheduler import FlexibleTimetableScheduler
+from models import (DEFAULT_DB_URL, ApprovalStatus, Batch, Department, Faculty, Room, Subject, Timetable,
+                    TimetableEntry, User, session_scope)
+
+logger = logging.getLogger(__name__)
+
+# Columns whose values repeat across rows and are stored dictionary-encoded
+DICTIONARY_COLUMNS = ('timetable', 'department', 'batch', 'day_name', 'subject', 'subject_name', 'faculty',
+                      'room', 'session_type')
+
+# One row per archived class; academic_year and semester live in the directory names
+SCHEMA = pa.schema([
+    ('timetable_id', pa.int32()),
+    ('timetable', pa.dictionary(pa.int32(), pa.string())),
+    ('department', pa.dictionary(pa.int32(), pa.string())),
+    ('batch', pa.dictionary(pa.int32(), pa.string())),
+    ('day', pa.int8()),
+    ('day_name', pa.dictionary(pa.int32(), pa.string())),
+    ('period', pa.int8()),
+    ('subject', pa.dictionary(pa.int32(), pa.string())),
+    ('subject_name', pa.dictionary(pa.int32(), pa.string())),
+    ('faculty', pa.dictionary(pa.int32(), pa.string())),
+    ('room', pa.dictionary(pa.int32(), pa.string())),
+    ('session_type', pa.dictionary(pa.int32(), pa.string())),
+    ('approved_at', pa.timestamp('us')),
+    ('academic_year', pa.string()),
+    ('semester', pa.int16()),
+])
+
+# Partition columns, outermost first
+PARTITIONING = ds.partitioning(pa.schema([('academic_year', pa.string()), ('semester', pa.int16())]),
+                               flavor='hive')
+
+# Timetables read from the database and written per archive file
+ARCHIVE_CHUNK = 500
+
+# Rows per Parquet row group (the unit of column statistics and skipping)
+ROW_GROUP_ROWS = 128 * 1024
+
+
+def _entry_query(session):
+    return (session.query(TimetableEntry.timetable_id, Timetable.name, Department.code,
+                          Batch.semester, Batch.section, TimetableEntry.batch_id,
+                          TimetableEntry.day_of_week, TimetableEntry.time_slot, Subject.code, Subject.name,
+                          User.full_name, Room.code, TimetableEntry.session_type,
+                          Timetable.approved_at, Timetable.academic_year, Timetable.semester)
+            .join(Timetable, TimetableEntry.timetable_id == Timetable.id)
+            .outerjoin(Department, Timetable.department_id == Department.id)
+            .outerjoin(Subject, TimetableEntry.subject_id == Subject.id)
+            .outerjoin(Faculty, TimetableEntry.faculty_id == Faculty.id)
+            .outerjoin(User, Faculty.user_id == User.id)
+            .outerjoin(Room, TimetableEntry.room_id == Room.id)
+            .outerjoin(Batch, TimetableEntry.batch_id == Batch.id)
+            .order_by(TimetableEntry.timetable_id, TimetableEntry.day_of_week, TimetableEntry.time_slot))
+
+
+def _table(rows, days: List[str]) -> pa.Table:
+    """Arrow table of _entry_query rows in SCHEMA"""
+    columns: Dict[str, List[Any]] = {field.name: [] for field in SCHEMA}
+    for (timetable_id, timetable, department, semester_of_batch, section, batch_id, day, period, subject,
+         subject_name, faculty, room, kind, approved_at, academic_year, semester) in rows:
+        if day is None or period is None:
+            continue
+        batch = (f"{department} Sem {semester_of_batch} - {section}" if section
+                 else f"Batch {batch_id}" if batch_id is not None else None)
+        for name, value in (('timetable_id', timetable_id), ('timetable', timetable), ('department', department),
+                            ('batch', batch), ('day', day),
+                            ('day_name', days[day] if 0 <= day < len(days) else None), ('period', period),
+                            ('subject', subject), ('subject_name', subject_name), ('faculty', faculty),
+                            ('room', room), ('session_type', kind.value if kind else None),
+                            ('approved_at', approved_at), ('academic_year', academic_year),
+                            ('semester', semester)):
+            columns[name].append(value)
+    return pa.Table.from_arrays(
+        [pa.array(columns[field.name], type=field.type.value_type).dictionary_encode()
+         if pa.types.is_dictionary(field.type) else pa.array(columns[field.name], type=field.type)
+         for field in SCHEMA], schema=SCHEMA)
+
+
+def _condition(column: str, value) -> ds.Expression:
+    """Dataset filter of column == value, or isin for a list, range or set"""
+    if isinstance(value, (list, tuple, set, frozenset, range)):
+        return ds.field(column).isin(list(value))
+    return ds.field(column) == value
+
+
+class TimetableArchive:
+    """Parquet dataset of archived timetable entries under root"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def dataset(self) -> Optional[ds.Dataset]:
+        """The archive as one dataset, or None while it is empty"""
+        try:
+            return ds.dataset(self.root, schema=SCHEMA, format='parquet', partitioning=PARTITIONING)
+        except FileNotFoundError:
+            return None
+
+    def archived_ids(self) -> set:
+        """Ids of the timetables already archived (reads one column)"""
+        dataset = self.dataset()
+        if dataset is None:
+            return set()
+        return set(pc.unique(dataset.to_table(columns=['timetable_id'])['timetable_id']).to_pylist())
+
+    # ----- writing -----
+    def append(self, table: pa.Table) -> int:
+        """Write table as new files in its partitions; nothing existing is rewritten"""
+        if not table.num_rows:
+            return 0
+        ds.write_dataset(table, self.root, format='parquet', partitioning=PARTITIONING,
+                         basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                         existing_data_behavior='overwrite_or_ignore',
+                         max_rows_per_group=ROW_GROUP_ROWS,
+                         file_options=ds.ParquetFileFormat().make_write_options(
+                             use_dictionary=list(DICTIONARY_COLUMNS), compression='zstd'))
+        return table.num_rows
+
+    def archive(self, session, days: Optional[List[str]] = None,
+                timetable_ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """Append approved timetables not yet archived (all, or those in timetable_ids).
+
+        days names day_of_week values (the scheduler's days by default).
+        Timetables are read and written ARCHIVE_CHUNK timetables at a time.
+        Returns counts of 'timetables' and 'entries' added.
+        """
+        days = days or FlexibleTimetableScheduler({}).days
+        query = session.query(Timetable.id).filter(Timetable.status == ApprovalStatus.APPROVED)
+        if timetable_ids is not None:
+            query = query.filter(Timetable.id.in_(list(timetable_ids)))
+        done = self.archived_ids()
+        pending = sorted(timetable_id for (timetable_id,) in query if timetable_id not in done)
+
+        timetables = added = 0
+        for start in range(0, len(pending), ARCHIVE_CHUNK):
+            chunk = pending[start:start + ARCHIVE_CHUNK]
+            table = _table(_entry_query(session).filter(TimetableEntry.timetable_id.in_(chunk)), days)
+            # Timetables without entries have nothing to archive
+            timetables += len(pc.unique(table['timetable_id']))
+            added += self.append(table)
+        logger.info("Archived %d timetables (%d entries) to %s", timetables, added, self.root)
+        return {'timetables': timetables, 'entries': added}
+
+    # ----- queries -----
+    def query(self, columns: Optional[List[str]] = None, academic_year=None, semester=None,
+              **filters) -> pa.Table:
+        """Archived rows as an Arrow table, reading only columns and the matching partitions.
+
+        academic_year, semester and any other column in filters take a
+        value or a list of values; call .to_pandas() for a DataFrame (with
+        dictionary columns as categoricals).
+        """
+        dataset = self.dataset()
+        if dataset is None:
+            return SCHEMA.empty_table().select(columns) if columns else SCHEMA.empty_table()
+        conditions = [_condition(column, value) for column, value in
+                      (('academic_year', academic_year), ('semester', semester), *filters.items())
+                      if value is not None]
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return dataset.to_table(columns=columns, filter=expression)
+
+    def count(self, by: List[str], academic_year=None, semester=None, **filters) -> pa.Table:
+        """Number of archived classes per combination of the by columns, most first"""
+        table = self.query(columns=list(by), academic_year=academic_year, semester=semester, **filters)
+        # Group on plain strings; dictionary keys differ between files
+        table = pa.Table.from_arrays([column.cast(column.type.value_type) if pa.types.is_dictionary(column.type)
+                                      else column for column in table.columns], names=table.column_names)
+        counts = table.group_by(list(by)).aggregate([([], 'count_all')])
+        counts = counts.rename_columns(['classes' if name == 'count_all' else name for name in counts.column_names])
+        return counts.select([*by, 'classes']).sort_by([('classes', 'descending')] +
+                                                       [(column, 'ascending') for column in by])
+
+    def faculty_load(self, academic_year=None, semester=None, **filters) -> pa.Table:
+        """Classes per faculty member per academic year and semester"""
+        return self.count(['academic_year', 'semester', 'faculty'], academic_year, semester, **filters)
+
+    def slot_usage(self, day=None, periods=None, session_type=None, academic_year=None, semester=None,
+                   **filters) -> pa.Table:
+        """Classes per semester and period, e.g. Friday afternoon labs with day='Friday', session_type='lab'"""
+        return self.count(['academic_year', 'semester', 'day_name', 'period'], academic_year, semester,
+                          day_name=day, period=periods, session_type=session_type, **filters)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append approved timetables to the Parquet archive")
+    parser.add_argument('root', help="archive directory")
+    parser.add_argument('--db', default=DEFAULT_DB_URL, help="database URL")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+
+    with session_scope(args.db) as session:
+        added = TimetableArchive(args.root).archive(session)
+    print(f"Archived {added['timetables']} timetables, {added['entries']} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
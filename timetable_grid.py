@@ -0,0 +1,216 @@
+# timetable_grid.py - COMPACT TIMETABLE REPRESENTATION
+"""Array-backed timetables with interned session entries.
+
+A TimetableGrid is one batch's week as a (days, periods) int16 array of
+entry ids into a SessionTable. The table interns every distinct (subject,
+kind, faculty, room) once, and all grids of a problem share one table, so
+a grid costs a couple of hundred bytes however many are kept in memory.
+
+Display labels such as "U24EC311 Lab (Ms.X) @ ECE-LAB" are only produced
+at the UI and CSV boundary (label(), labels(), to_display()), and only
+parsed when display data comes back in (from_display(), e.g. from
+Timetable.generated_data).
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Cell values that are not entries; FREE matches ga_scheduler.FREE
+FREE = -1
+BREAK = -2
+
+# Cell kinds, as returned by TimetableGrid.kinds()
+KIND_FREE, KIND_BREAK, KIND_THEORY, KIND_LAB, KIND_ACTIVITY = -1, 0, 1, 2, 3
+
+# Subjects containing one of these words are special sessions rather than classes
+ACTIVITY_WORDS = ('library', 'training', 'meeting')
+
+# Label shown for an empty cell
+FREE_LABEL = "FREE"
+
+
+def is_break_period(name: str) -> bool:
+    """True if a period description marks a break"""
+    lowered = name.lower()
+    return 'break' in lowered or 'lunch' in lowered
+
+
+def parse_label(label: str) -> Tuple[str, str, Optional[str], Optional[str]]:
+    """(subject, 'theory' or 'lab', faculty, room) of a label such as 'U24EC311 Lab (Ms.X) @ ECE-LAB'"""
+    label, _, room = label.partition(' @ ')
+    head, _, rest = label.partition(' (')
+    faculty = rest[:-1] if rest.endswith(')') else None
+    head = head.strip()
+    if head.endswith(' Lab'):
+        return head[:-4].strip(), 'lab', faculty, room or None
+    return head, 'theory', faculty, room or None
+
+
+class SessionTable:
+    """Interned session entries shared by the grids of one problem"""
+
+    __slots__ = ('subjects', 'kinds', 'faculty', 'rooms', 'faculty_names', 'room_codes',
+                 '_entries', '_faculty_index', '_room_index', '_labels', '_kind_codes')
+
+    def __init__(self):
+        self.subjects: List[str] = []
+        self.kinds: List[str] = []
+        # Indexes into faculty_names / room_codes, -1 for none
+        self.faculty: List[int] = []
+        self.rooms: List[int] = []
+        self.faculty_names: List[str] = []
+        self.room_codes: List[str] = []
+        self._entries: Dict[tuple, int] = {}
+        self._faculty_index: Dict[str, int] = {}
+        self._room_index: Dict[str, int] = {}
+        self._labels: List[Optional[str]] = []
+        self._kind_codes: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.subjects)
+
+    def intern(self, subject: str, kind: str, faculty: Optional[str] = None, room: Optional[str] = None) -> int:
+        """Id of the entry, adding it on first sight"""
+        key = (subject, kind, faculty, room)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = len(self.subjects)
+            self.subjects.append(subject)
+            self.kinds.append(kind)
+            self.faculty.append(self._intern_name(faculty, self.faculty_names, self._faculty_index))
+            self.rooms.append(self._intern_name(room, self.room_codes, self._room_index))
+            self._labels.append(None)
+            self._kind_codes = None
+        return entry
+
+    @staticmethod
+    def _intern_name(name, names, index):
+        if name is None:
+            return -1
+        if name not in index:
+            index[name] = len(names)
+            names.append(name)
+        return index[name]
+
+    def intern_label(self, label: str) -> int:
+        return self.intern(*parse_label(label))
+
+    def faculty_name(self, entry: int) -> Optional[str]:
+        f = self.faculty[entry]
+        return self.faculty_names[f] if f >= 0 else None
+
+    def room_code(self, entry: int) -> Optional[str]:
+        r = self.rooms[entry]
+        return self.room_codes[r] if r >= 0 else None
+
+    def label(self, entry: int) -> str:
+        """Display label of an entry (built once, then reused)"""
+        label = self._labels[entry]
+        if label is None:
+            label = self.subjects[entry] + (" Lab" if self.kinds[entry] == 'lab' else "")
+            faculty, room = self.faculty_name(entry), self.room_code(entry)
+            if faculty is not None:
+                label += f" ({faculty})"
+            if room is not None:
+                label += f" @ {room}"
+            self._labels[entry] = label
+        return label
+
+    def kind_codes(self) -> np.ndarray:
+        """KIND_* of every entry"""
+        if self._kind_codes is None or len(self._kind_codes) != len(self):
+            self._kind_codes = np.array([
+                KIND_LAB if kind == 'lab'
+                else KIND_ACTIVITY if any(word in subject.lower() for word in ACTIVITY_WORDS)
+                else KIND_THEORY
+                for subject, kind in zip(self.subjects, self.kinds)], dtype=np.int8)
+        return self._kind_codes
+
+
+class TimetableGrid:
+    """One batch's week: a (days, periods) int16 array of SessionTable entry ids, FREE or BREAK"""
+
+    __slots__ = ('days', 'period_names', 'cells', 'sessions')
+
+    def __init__(self, days, period_names, cells: np.ndarray, sessions: SessionTable):
+        self.days = tuple(days)
+        self.period_names = tuple(period_names)
+        self.cells = np.asarray(cells, dtype=np.int16).reshape(len(self.days), len(self.period_names))
+        self.sessions = sessions
+
+    @classmethod
+    def from_display(cls, data: Dict[str, Dict[Any, List[str]]], period_times: Dict[int, tuple],
+                     sessions: Optional[SessionTable] = None) -> 'TimetableGrid':
+        """Grid of a display timetable {day: {period: [label]}}; period keys may be strings after JSON"""
+        sessions = sessions if sessions is not None else SessionTable()
+        names = [period_times[p][2] for p in sorted(period_times)]
+        days = list(data)
+        cells = np.full((len(days), len(names)), FREE, dtype=np.int16)
+        for d, day in enumerate(days):
+            periods = data[day] or {}
+            for p, name in enumerate(names):
+                if is_break_period(name):
+                    cells[d, p] = BREAK
+                    continue
+                labels = periods.get(p, periods.get(str(p)))
+                if labels and labels[0] != FREE_LABEL:
+                    cells[d, p] = sessions.intern_label(labels[0])
+        return cls(days, names, cells, sessions)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.cells.shape
+
+    def __eq__(self, other):
+        if not isinstance(other, TimetableGrid):
+            return NotImplemented
+        return self.days == other.days and self.labels() == other.labels()
+
+    def copy(self) -> 'TimetableGrid':
+        """Independent cells, shared session table"""
+        return TimetableGrid(self.days, self.period_names, self.cells.copy(), self.sessions)
+
+    def entry(self, day: int, period: int) -> int:
+        return int(self.cells[day, period])
+
+    def label(self, day: int, period: int) -> str:
+        entry = int(self.cells[day, period])
+        if entry >= 0:
+            return self.sessions.label(entry)
+        return self.period_names[period] if entry == BREAK else FREE_LABEL
+
+    def labels(self) -> List[List[str]]:
+        """Display label of every cell, day by day"""
+        return self.label_array().tolist()
+
+    def label_array(self) -> np.ndarray:
+        """Display label of every cell as an object array of shape (days, periods)"""
+        table = self.sessions
+        # FREE and BREAK index the trailing FREE label; breaks are then named after their period
+        entry_labels = np.array([table.label(e) for e in range(len(table))] + [FREE_LABEL], dtype=object)
+        labels = entry_labels[np.where(self.cells >= 0, self.cells, len(table))]
+        breaks = self.cells == BREAK
+        if breaks.any():
+            names = np.broadcast_to(np.array(self.period_names, dtype=object), self.cells.shape)
+            labels[breaks] = names[breaks]
+        return labels
+
+    def digest(self) -> str:
+        """Hash of the cells and the entries they use (a cache key for rendered output)"""
+        used = np.unique(self.cells[self.cells >= 0])
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((self.days, self.period_names)).encode())
+        h.update(self.cells.tobytes())
+        h.update('\0'.join(self.sessions.label(int(e)) for e in used).encode())
+        return h.hexdigest()
+
+    def kinds(self) -> np.ndarray:
+        """KIND_* of every cell, shape (days, periods)"""
+        codes = np.append(self.sessions.kind_codes(), np.array([KIND_BREAK, KIND_FREE], dtype=np.int8))
+        # BREAK and FREE index the two trailing codes
+        return codes[self.cells.astype(np.intp)]
+
+    def to_display(self) -> Dict[str, Dict[int, List[str]]]:
+        """Legacy display form {day: {period: [label]}} for JSON and CSV"""
+        return {day: {p: [label] for p, label in enumerate(row)} for day, row in zip(self.days, self.labels())}